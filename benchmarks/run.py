@@ -0,0 +1,278 @@
+"""
+JSON API Python client 
+https://github.com/qvantel/jsonapi-client
+
+(see JSON API specification in http://jsonapi.org/)
+
+Copyright (c) 2017, Qvantel
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the Qvantel nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL QVANTEL BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+Benchmarks for parsing, validation, attribute access, pagination, relationship
+resolution and commits. Run from the repository root:
+
+    python -m benchmarks.run --resources 1000 --page-size 100 --repeat 20
+"""
+
+import argparse
+import gc
+import itertools
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, NamedTuple, Tuple
+
+from jsonapi_client import Session
+
+from .synthetic import SyntheticApi
+from .transport import InProcessTransport
+
+
+class Scenario(NamedTuple):
+    #: Returns state given to run. Not included in measurements.
+    setup: Callable[[], object]
+    #: The measured operation
+    run: Callable[[object], None]
+    #: Number of items (resources, attributes, relationships...) handled in one run
+    items: int
+
+
+class Result(NamedTuple):
+    name: str
+    runs: int
+    items_per_second: float
+    p50: float
+    p90: float
+    p99: float
+    peak_memory: int
+
+    def as_dict(self) -> dict:
+        return self._asdict()
+
+
+SCENARIOS: Dict[str, Callable[[SyntheticApi], Scenario]] = {}
+
+
+def scenario(name: str):
+    def register(func):
+        SCENARIOS[name] = func
+        return func
+    return register
+
+
+def new_session(api: SyntheticApi, schema: bool=True) -> Session:
+    session = Session(api.server_url, schema=api.schema if schema else None)
+    InProcessTransport(api).install(session)
+    return session
+
+
+def _page_items(page: dict) -> int:
+    return len(page['data']) + len(page.get('included', []))
+
+
+def _read_page(api: SyntheticApi, schema: bool) -> Scenario:
+    # Parsing consumes the source data, so every run gets a fresh copy
+    page = json.dumps(api.page(1))
+    return Scenario(lambda: (new_session(api, schema), json.loads(page)),
+                    lambda state: state[0].read(state[1], api.page_url(1)),
+                    _page_items(json.loads(page)))
+
+
+@scenario('parse')
+def parse(api: SyntheticApi) -> Scenario:
+    """Session.read of one collection page, with schema validation."""
+    return _read_page(api, schema=True)
+
+
+@scenario('parse-no-schema')
+def parse_no_schema(api: SyntheticApi) -> Scenario:
+    """Session.read of one collection page without schema."""
+    return _read_page(api, schema=False)
+
+
+@scenario('validate')
+def validate(api: SyntheticApi) -> Scenario:
+    """Schema validation of the resources of one page."""
+    def setup():
+        return (new_session(api).schema,
+                new_session(api, schema=False).read(api.page(1)).resources)
+
+    def run(state):
+        schema, resources = state
+        for res in resources:
+            schema.validate(res.type, res._attributes)
+
+    return Scenario(setup, run, min(api.page_size, api.resources))
+
+
+@scenario('attributes')
+def attributes(api: SyntheticApi) -> Scenario:
+    """Read every attribute of the resources of one page."""
+    names = api.python_attribute_names
+
+    def setup():
+        return new_session(api).read(api.page(1)).resources
+
+    def run(resources):
+        for res in resources:
+            for name in names:
+                getattr(res, name)
+
+    return Scenario(setup, run, min(api.page_size, api.resources) * len(names))
+
+
+@scenario('iterate')
+def iterate(api: SyntheticApi) -> Scenario:
+    """Session.iterate through all pages of the collection."""
+    def run(session):
+        for _ in session.iterate('articles'):
+            pass
+
+    return Scenario(lambda: new_session(api), run, api.resources)
+
+
+@scenario('resolve')
+def resolve(api: SyntheticApi) -> Scenario:
+    """Resolve author and comments of the articles of one page."""
+    def setup():
+        session = new_session(api)
+        return session.get('articles').resources
+
+    def run(articles):
+        for article in articles:
+            article.author
+            article.comments
+
+    return Scenario(setup, run, min(api.page_size, api.resources) * (1 + api.fan_out))
+
+
+@scenario('commit')
+def commit(api: SyntheticApi) -> Scenario:
+    """Modify the articles of one page and Session.commit them."""
+    name = api.python_attribute_names[0] if api.attributes else None
+    counter = itertools.count()
+
+    def setup():
+        session = new_session(api)
+        value = f'modified {next(counter)}'
+        for article in session.get('articles').resources:
+            if name:
+                setattr(article, name, value)
+            else:
+                article.author = str(next(counter) % api.people)
+        return session
+
+    return Scenario(setup, lambda session: session.commit(),
+                    min(api.page_size, api.resources))
+
+
+def _percentile(timings: List[float], percentile: float) -> float:
+    timings = sorted(timings)
+    index = min(len(timings) - 1, int(round(percentile / 100 * (len(timings) - 1))))
+    return timings[index]
+
+
+def measure(name: str, scenario_: Scenario, repeat: int) -> Result:
+    """
+    Run scenario repeat times and measure latency of each run. Peak memory is
+    measured in a separate run, as tracing memory allocations slows execution.
+    """
+    timings = []
+    for _ in range(repeat):
+        state = scenario_.setup()
+        gc.collect()
+        start = time.perf_counter()
+        scenario_.run(state)
+        timings.append(time.perf_counter() - start)
+
+    state = scenario_.setup()
+    gc.collect()
+    tracemalloc.start()
+    scenario_.run(state)
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return Result(name=name,
+                  runs=repeat,
+                  items_per_second=scenario_.items / statistics.mean(timings),
+                  p50=_percentile(timings, 50),
+                  p90=_percentile(timings, 90),
+                  p99=_percentile(timings, 99),
+                  peak_memory=peak_memory)
+
+
+def format_results(results: List[Result]) -> str:
+    lines = [f'{"scenario":<16}{"runs":>6}{"items/s":>14}{"p50 ms":>10}'
+             f'{"p90 ms":>10}{"p99 ms":>10}{"peak KiB":>11}']
+    for r in results:
+        lines.append(f'{r.name:<16}{r.runs:>6}{r.items_per_second:>14,.0f}'
+                     f'{r.p50 * 1000:>10.2f}{r.p90 * 1000:>10.2f}{r.p99 * 1000:>10.2f}'
+                     f'{r.peak_memory / 1024:>11,.0f}')
+    return '\n'.join(lines)
+
+
+def parse_args(args: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('scenarios', nargs='*', metavar='scenario',
+                        help=f'Scenarios to run: {", ".join(SCENARIOS)} (default: all)')
+    parser.add_argument('--resources', type=int, default=1000,
+                        help='Number of articles in the dataset')
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--fan-out', type=int, default=3,
+                        help='Number of comments in each article')
+    parser.add_argument('--attributes', type=int, default=10,
+                        help='Number of attributes in each article')
+    parser.add_argument('--nesting', type=int, default=1,
+                        help='Depth of nested object attribute')
+    parser.add_argument('--include', action='store_true',
+                        help='Include authors and comments in collection pages')
+    parser.add_argument('--repeat', type=int, default=10,
+                        help='Number of measured runs of each scenario')
+    parser.add_argument('--json', action='store_true', help='Output results as JSON')
+    options = parser.parse_args(args)
+    unknown = [name for name in options.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f'unknown scenarios: {", ".join(unknown)}')
+    return options
+
+
+def main(args: List[str]=None) -> List[Result]:
+    options = parse_args(sys.argv[1:] if args is None else args)
+    api = SyntheticApi(resources=options.resources, page_size=options.page_size,
+                       fan_out=options.fan_out, attributes=options.attributes,
+                       nesting=options.nesting, include=options.include)
+    results = [measure(name, SCENARIOS[name](api), options.repeat)
+               for name in options.scenarios or SCENARIOS]
+    if options.json:
+        print(json.dumps([r.as_dict() for r in results], indent=2))
+    else:
+        print(format_results(results))
+    return results
+
+
+if __name__ == '__main__':
+    main()
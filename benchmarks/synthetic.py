@@ -0,0 +1,255 @@
+"""
+JSON API Python client 
+https://github.com/qvantel/jsonapi-client
+
+(see JSON API specification in http://jsonapi.org/)
+
+Copyright (c) 2017, Qvantel
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the Qvantel nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL QVANTEL BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import random
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse, parse_qsl
+
+from jsonapi_client.common import dejsonify_attribute_name
+
+
+class SyntheticApi:
+    """
+    Synthetic JSON API dataset: articles with a to-one relationship (author) to
+    people and a to-many relationship (comments) to comments. Resources are
+    generated deterministically on demand, so large datasets do not need to be
+    kept in memory.
+
+    :param resources: Number of articles
+    :param page_size: Number of articles in one page of articles collection
+    :param fan_out: Number of comments in each article
+    :param attributes: Number of plain attributes in each article
+    :param nesting: Depth of nested object attribute in each article (0 = none)
+    :param include: Include authors and comments in collection pages (compound
+        documents).
+    :param server_url: Url prefix of the api
+    """
+    def __init__(self, resources: int=1000, page_size: int=100, fan_out: int=3,
+                 attributes: int=10, nesting: int=1, include: bool=False,
+                 server_url: str='http://bench.local/api') -> None:
+        self.resources = resources
+        self.page_size = page_size
+        self.fan_out = fan_out
+        self.attributes = attributes
+        self.nesting = nesting
+        self.include = include
+        self.server_url = server_url.rstrip('/')
+        self.people = max(1, resources // 4)
+        self.attribute_names = [f'attribute-{i}' for i in range(attributes)]
+        self._updates: Dict[Tuple[str, str], dict] = {}
+        self._next_id = resources
+
+    @property
+    def pages(self) -> int:
+        return -(-self.resources // self.page_size)
+
+    @property
+    def python_attribute_names(self) -> List[str]:
+        return [dejsonify_attribute_name(name) for name in self.attribute_names]
+
+    @property
+    def schema(self) -> dict:
+        """
+        Schema of the dataset in the format used by jsonapi_client.Session.
+        """
+        attribute_types = ['string', 'integer', 'number', 'boolean']
+        properties = {name: {'type': attribute_types[i % len(attribute_types)]}
+                      for i, name in enumerate(self.attribute_names)}
+        nested = {'type': 'string'}
+        for level in range(self.nesting):
+            nested = {'type': 'object',
+                      'properties': {'name': {'type': 'string'},
+                                     'level': {'type': 'integer'},
+                                     'child': nested},
+                      'required': ['name', 'level']}
+        if self.nesting:
+            properties['nested'] = nested
+        properties['author'] = {'relation': 'to-one', 'resource': ['people']}
+        properties['comments'] = {'relation': 'to-many', 'resource': ['comments']}
+        return {
+            'articles': {'properties': properties},
+            'people': {'properties': {'first-name': {'type': 'string'},
+                                      'last-name': {'type': 'string'},
+                                      'age': {'type': 'integer'}}},
+            'comments': {'properties': {'body': {'type': 'string'},
+                                        'author': {'relation': 'to-one',
+                                                   'resource': ['people']}}},
+        }
+
+    def url(self, type_: str, id_: str=None, relationship: str=None) -> str:
+        url = f'{self.server_url}/{type_}'
+        if id_ is not None:
+            url = f'{url}/{id_}'
+        if relationship:
+            url = f'{url}/{relationship}'
+        return url
+
+    def _attribute_value(self, rnd: random.Random, i: int):
+        kind = i % 4
+        if kind == 0:
+            return ''.join(rnd.choice('abcdefghij ') for _ in range(20))
+        elif kind == 1:
+            return rnd.randint(0, 10**6)
+        elif kind == 2:
+            return rnd.random()
+        return rnd.random() > 0.5
+
+    def _nested(self, level: int):
+        if level == 0:
+            return 'leaf'
+        return {'name': f'level {level}', 'level': level, 'child': self._nested(level - 1)}
+
+    def _identifier(self, type_: str, id_: int) -> dict:
+        return {'type': type_, 'id': str(id_)}
+
+    def article(self, id_: int) -> dict:
+        rnd = random.Random(id_)
+        attributes = {name: self._attribute_value(rnd, i)
+                      for i, name in enumerate(self.attribute_names)}
+        if self.nesting:
+            attributes['nested'] = self._nested(self.nesting)
+        attributes.update(self._updates.get(('articles', str(id_)), {}))
+        url = self.url('articles', id_)
+        return {
+            'type': 'articles',
+            'id': str(id_),
+            'attributes': attributes,
+            'relationships': {
+                'author': {
+                    'links': {'self': f'{url}/relationships/author',
+                              'related': f'{url}/author'},
+                    'data': self._identifier('people', id_ % self.people),
+                },
+                'comments': {
+                    'links': {'self': f'{url}/relationships/comments',
+                              'related': f'{url}/comments'},
+                    'data': [self._identifier('comments', c)
+                             for c in self.comment_ids(id_)],
+                },
+            },
+            'links': {'self': url},
+        }
+
+    def person(self, id_: int) -> dict:
+        rnd = random.Random(-id_)
+        return {'type': 'people', 'id': str(id_),
+                'attributes': {'first-name': f'First {id_}',
+                               'last-name': f'Last {id_}',
+                               'age': rnd.randint(18, 99)},
+                'links': {'self': self.url('people', id_)}}
+
+    def comment(self, id_: int) -> dict:
+        return {'type': 'comments', 'id': str(id_),
+                'attributes': {'body': f'Comment {id_}'},
+                'relationships': {'author': {
+                    'data': self._identifier('people', id_ % self.people)}},
+                'links': {'self': self.url('comments', id_)}}
+
+    def comment_ids(self, article_id: int) -> range:
+        return range(article_id * self.fan_out, (article_id + 1) * self.fan_out)
+
+    def resource(self, type_: str, id_: str) -> Optional[dict]:
+        try:
+            num = int(id_)
+        except ValueError:
+            return None
+        if type_ == 'articles' and 0 <= num < self._next_id:
+            return self.article(num)
+        elif type_ == 'people' and 0 <= num < self.people:
+            return self.person(num)
+        elif type_ == 'comments' and 0 <= num < self.resources * self.fan_out:
+            return self.comment(num)
+        return None
+
+    def page(self, number: int=1) -> dict:
+        """
+        Return a page (numbered from 1) of articles collection.
+        """
+        first = (number - 1) * self.page_size
+        ids = range(first, min(first + self.page_size, self.resources))
+        doc = {'data': [self.article(i) for i in ids],
+               'links': {'self': self.page_url(number)},
+               'meta': {'total': self.resources}}
+        if number < self.pages:
+            doc['links']['next'] = self.page_url(number + 1)
+        if self.include:
+            people = sorted({i % self.people for i in ids})
+            doc['included'] = ([self.person(i) for i in people] +
+                               [self.comment(c) for i in ids for c in self.comment_ids(i)])
+        return doc
+
+    def page_url(self, number: int) -> str:
+        return f'{self.url("articles")}?page[number]={number}'
+
+    def document(self, url: str) -> Optional[dict]:
+        """
+        Return document for url, or None if url is not found.
+        """
+        parsed_url = urlparse(url)
+        path = parsed_url.path[len(urlparse(self.server_url).path):].strip('/')
+        parts = path.split('/')
+        query = dict(parse_qsl(parsed_url.query))
+        if parts == ['articles']:
+            number = int(query.get('page[number]', 1))
+            return self.page(number) if 1 <= number <= self.pages else None
+        if len(parts) == 2:
+            res = self.resource(*parts)
+            return res and {'data': res}
+        if len(parts) == 3 and parts[0] == 'articles':
+            article = self.resource('articles', parts[1])
+            if article is None or parts[2] not in article['relationships']:
+                return None
+            data = article['relationships'][parts[2]]['data']
+            if isinstance(data, list):
+                return {'data': [self.resource(i['type'], i['id']) for i in data]}
+            return {'data': self.resource(data['type'], data['id'])}
+        return None
+
+    def update(self, type_: str, id_: str, attributes: dict) -> Optional[dict]:
+        """
+        Store attribute changes of a resource and return the updated resource.
+        """
+        if self.resource(type_, id_) is None:
+            return None
+        self._updates.setdefault((type_, id_), {}).update(attributes)
+        return self.resource(type_, id_)
+
+    def create(self, type_: str, attributes: dict) -> Optional[dict]:
+        """
+        Create a new resource and return it. Only articles can be created.
+        """
+        if type_ != 'articles':
+            return None
+        id_ = str(self._next_id)
+        self._next_id += 1
+        self._updates[(type_, id_)] = dict(attributes)
+        return self.resource(type_, id_)
@@ -0,0 +1,124 @@
+"""
+JSON API Python client 
+https://github.com/qvantel/jsonapi-client
+
+(see JSON API specification in http://jsonapi.org/)
+
+Copyright (c) 2017, Qvantel
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the Qvantel nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL QVANTEL BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import gzip
+import json
+import time
+from typing import Dict
+from urllib.parse import urlparse
+
+from .synthetic import SyntheticApi
+
+
+class Response:
+    """
+    Minimal stand-in for requests.Response.
+    """
+    def __init__(self, status_code: int, content: bytes=b'', headers: dict=None) -> None:
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+    def json(self):
+        return json.loads(self.content)
+
+    def close(self):
+        pass
+
+
+class InProcessTransport:
+    """
+    Stand-in for requests.Session that serves SyntheticApi documents in-process,
+    so that benchmarks measure the client instead of network and server.
+
+    Serialized GET responses are cached, so that after the first request only
+    client side work (including JSON decoding) is measured.
+
+    :param api: Dataset to serve
+    :param latency: Optional simulated latency of each request in seconds
+    """
+    def __init__(self, api: SyntheticApi, latency: float=0.) -> None:
+        self.api = api
+        self.latency = latency
+        self.requests = 0
+        self._cache: Dict[str, bytes] = {}
+
+    def install(self, session) -> 'InProcessTransport':
+        """
+        Make sync session send its requests to this transport.
+        """
+        session._http_session = self
+        return self
+
+    def request(self, method: str, url: str, data: bytes=None, headers: dict=None,
+                **kwargs) -> Response:
+        self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if method == 'get':
+            return self._get(url)
+        headers = headers or {}
+        if data and headers.get('Content-Encoding') == 'gzip':
+            data = gzip.decompress(data)
+        path = urlparse(url).path[len(urlparse(self.api.server_url).path):].strip('/')
+        parts = path.split('/')
+        if method == 'delete':
+            return Response(204)
+        resource = json.loads(data)['data'] if data else {}
+        attributes = resource.get('attributes', {})
+        if method == 'post' and len(parts) == 1:
+            result = self.api.create(parts[0], attributes)
+            if result is None:
+                return Response(404)
+            self._cache.clear()
+            return Response(201, json.dumps({'data': result}).encode(),
+                            {'Location': result['links']['self']})
+        if method == 'patch' and len(parts) == 2:
+            result = self.api.update(parts[0], parts[1], attributes)
+            if result is None:
+                return Response(404)
+            self._cache.clear()
+            return Response(200, json.dumps({'data': result}).encode())
+        return Response(405)
+
+    def _get(self, url: str) -> Response:
+        content = self._cache.get(url)
+        if content is None:
+            doc = self.api.document(url)
+            if doc is None:
+                return Response(404, json.dumps({'errors': [{'title': 'Not found'}]})
+                                .encode())
+            content = self._cache[url] = json.dumps(doc).encode()
+        return Response(200, content)
+
+    def close(self):
+        pass
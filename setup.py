@@ -8,7 +8,7 @@ setup(
                       open("CHANGES.rst").read()),
     classifiers=[
         "Programming Language :: Python",
-        "Programming Language :: Python :: 3.6",
+        "Programming Language :: Python :: 3.7",
         "Topic :: Software Development :: Libraries",
         "License :: OSI Approved :: BSD License",
     ],
@@ -17,6 +17,7 @@ setup(
     url="https://github.com/qvantel/jsonapi-client",
     keywords="JSONAPI JSON API client",
     license="BSD-3",
+    python_requires=">=3.7",
     package_dir={"": "src"},
     packages=find_packages("src"),
     include_package_data=True,
@@ -26,4 +27,8 @@ setup(
         "jsonschema",
         "aiohttp",
     ],
+    extras_require={
+        "tracing": ["opentelemetry-api"],
+        "numpy": ["numpy"],
+    },
 )
@@ -32,7 +32,9 @@ SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 import pkg_resources
 
 from .session import Session
-from .filter import Filter, Inclusion, Modifier
+from .filter import (Filter, Inclusion, Modifier, SparseFields, Page, OffsetPage,
+                     CursorPage)
 from .common import ResourceTuple
+from .cache import SharedCache
 
 __version__ = pkg_resources.get_distribution("jsonapi-client").version
@@ -0,0 +1,192 @@
+"""
+JSON API Python client 
+https://github.com/qvantel/jsonapi-client
+
+(see JSON API specification in http://jsonapi.org/)
+
+Copyright (c) 2017, Qvantel
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the Qvantel nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL QVANTEL BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import copy
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Set, Dict, List, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+from .common import normalize_url
+
+logger = logging.getLogger(__name__)
+
+
+class SharedCache:
+    """
+    Cache of raw JSON API documents and resources that can be shared by several
+    Sessions, for example by short-lived sessions of a web application:
+
+        cache = SharedCache(max_size=10000, ttl=60)
+        s = Session('http://localhost:8080/', shared_cache=cache)
+
+    Only raw JSON data is stored. Each Session builds its own ResourceObjects
+    from the shared data, so modifications (dirty state) of one session are never
+    visible to other sessions. Committed resources are dropped from the cache.
+
+    :param max_size: Maximum number of cached entries (documents and resources).
+        Least recently used entries are evicted first.
+    :param ttl: Time to live of cached entries in seconds. None for no expiration.
+    """
+    def __init__(self, max_size: int=1000, ttl: float=None) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[tuple, Tuple[Optional[float], dict]]' = OrderedDict()
+        self._documents_by_resource: Dict[Tuple[str, str], Set[str]] = {}
+        self._resources_by_document: Dict[str, List[Tuple[str, str]]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> dict:
+        return {'size': len(self), 'max_size': self.max_size, 'hits': self.hits,
+                'misses': self.misses, 'evictions': self.evictions,
+                'hit_rate': self.hit_rate}
+
+    def _get(self, key: tuple) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, data = entry
+                if expires is not None and expires < time.monotonic():
+                    self._remove(key)
+                    entry = None
+                else:
+                    self._entries.move_to_end(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        # Caller gets its own copy, which is then consumed by ResourceObjects
+        return copy.deepcopy(data)
+
+    def _put(self, key: tuple, data: dict) -> None:
+        expires = time.monotonic() + self.ttl if self.ttl is not None else None
+        self._entries[key] = expires, data
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            old_key = next(iter(self._entries))
+            self._remove(old_key)
+            self.evictions += 1
+            logger.debug('Evicted %s from shared cache', old_key)
+
+    def _remove(self, key: tuple) -> None:
+        self._entries.pop(key, None)
+        if key[0] == 'resource':
+            # Documents containing this resource could not be invalidated anymore
+            for url in self._documents_by_resource.pop(key[1:], ()):
+                self._remove_document(url)
+        else:
+            self._remove_document(key[1])
+
+    def _remove_document(self, url: str) -> None:
+        """
+        Remove document and its entries in the resource index.
+        """
+        self._entries.pop(('document', url), None)
+        for res_key in self._resources_by_document.pop(url, ()):
+            urls = self._documents_by_resource.get(res_key)
+            if urls is not None:
+                urls.discard(url)
+                if not urls:
+                    del self._documents_by_resource[res_key]
+
+    def get_document(self, url: str) -> Optional[dict]:
+        """
+        Return copy of cached raw document, or None if url is not cached.
+        """
+        return self._get(('document', normalize_url(url)))
+
+    def get_resource(self, type_: str, id_: str) -> Optional[dict]:
+        """
+        Return copy of cached raw resource object, or None if it is not cached.
+        """
+        return self._get(('resource', type_, id_))
+
+    def put_document(self, url: str, json_data: dict) -> None:
+        """
+        Store raw document and the resources it contains. Resources of types
+        fetched with sparse fieldsets (fields[type]) are not complete, so they
+        are not stored separately.
+        """
+        sparse_types = {key[7:-1] for key, _ in parse_qsl(urlsplit(url or '').query,
+                                                          keep_blank_values=True)
+                        if key.startswith('fields[') and key.endswith(']')}
+        url = normalize_url(url)
+        json_data = copy.deepcopy(json_data)
+        data = json_data.get('data')
+        resources = list(data) if isinstance(data, list) else [data] if data else []
+        resources += json_data.get('included', [])
+        resources = [res for res in resources
+                     if isinstance(res, dict) and 'attributes' in res]
+        keys = [(res['type'], res['id']) for res in resources]
+        with self._lock:
+            self._remove_document(url)
+            # Index is updated first, so that evictions below also clean it up
+            self._resources_by_document[url] = keys
+            for key in keys:
+                self._documents_by_resource.setdefault(key, set()).add(url)
+            self._put(('document', url), json_data)
+            for key, res in zip(keys, resources):
+                if key[0] not in sparse_types:
+                    self._put(('resource',) + key, res)
+
+    def invalidate_resource(self, type_: str, id_: str) -> None:
+        """
+        Remove resource and the documents containing it from the cache.
+        """
+        with self._lock:
+            self._remove(('resource', type_, id_))
+
+    def invalidate_document(self, url: str) -> None:
+        """
+        Remove document from the cache.
+        """
+        with self._lock:
+            self._remove(('document', normalize_url(url)))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._documents_by_resource.clear()
+            self._resources_by_document.clear()
@@ -0,0 +1,179 @@
+"""
+JSON API Python client 
+https://github.com/qvantel/jsonapi-client
+
+(see JSON API specification in http://jsonapi.org/)
+
+Copyright (c) 2017, Qvantel
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the Qvantel nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL QVANTEL BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import collections
+import logging
+import threading
+import time
+from typing import Callable, Dict, Hashable, Iterable, List
+
+from .exceptions import CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitState:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+
+class _Circuit:
+    def __init__(self) -> None:
+        self.state = CircuitState.CLOSED
+        self.failures: 'collections.deque[float]' = collections.deque()
+        self.opened_at = 0.
+        self.probes = 0
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for requests made by Session
+    (Session(circuit_breaker=CircuitBreaker(...))).
+
+    Requests are grouped to endpoints by host and resource type (first path
+    component after server url). When an endpoint fails failure_threshold times
+    within window seconds, its circuit is opened and further requests to it fail
+    immediately with CircuitOpenError. After recovery_timeout seconds, at most
+    half_open_max_calls probe requests are let through (half-open state). If they
+    succeed, circuit is closed again, otherwise it is opened again.
+
+    Retryable server errors (failure_statuses), timeouts and connection errors
+    are counted as failures. Other errors, such as cancelled requests, are not.
+
+    :param failure_threshold: Number of failures that opens the circuit.
+    :param window: Time window in seconds in which failures are counted.
+    :param recovery_timeout: Time in seconds that circuit stays open.
+    :param half_open_max_calls: Number of concurrent probe requests in half-open state.
+    :param failure_statuses: Response status codes that are counted as failures.
+    """
+    def __init__(self, failure_threshold: int=5,
+                 window: float=60.,
+                 recovery_timeout: float=30.,
+                 half_open_max_calls: int=1,
+                 failure_statuses: Iterable[int]=(502, 503, 504)) -> None:
+        self.failure_threshold = failure_threshold
+        self.window = window
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.failure_statuses = frozenset(failure_statuses)
+        self._circuits: Dict[Hashable, _Circuit] = collections.defaultdict(_Circuit)
+        self._listeners: List[Callable[[Hashable, str, str], None]] = []
+        self._lock = threading.Lock()
+
+    def add_listener(self, callback: Callable[[Hashable, str, str], None]) -> None:
+        """
+        Register callback(endpoint, old_state, new_state) that is called when
+        state of a circuit changes.
+        """
+        self._listeners.append(callback)
+
+    def state(self, endpoint: Hashable) -> str:
+        with self._lock:
+            return self._current_state(endpoint)
+
+    def states(self) -> Dict[Hashable, str]:
+        """
+        Return current states of all known endpoints.
+        """
+        with self._lock:
+            return {endpoint: self._current_state(endpoint)
+                    for endpoint in list(self._circuits)}
+
+    def _current_state(self, endpoint: Hashable) -> str:
+        circuit = self._circuits[endpoint]
+        if (circuit.state == CircuitState.OPEN
+                and time.monotonic() - circuit.opened_at >= self.recovery_timeout):
+            self._set_state(endpoint, circuit, CircuitState.HALF_OPEN)
+        return circuit.state
+
+    def _set_state(self, endpoint: Hashable, circuit: _Circuit, new_state: str) -> None:
+        old_state, circuit.state = circuit.state, new_state
+        if new_state == CircuitState.OPEN:
+            circuit.opened_at = time.monotonic()
+        elif new_state == CircuitState.CLOSED:
+            circuit.failures.clear()
+        circuit.probes = 0
+        logger.warning('Circuit %s changed from %s to %s', endpoint, old_state, new_state)
+        for callback in self._listeners:
+            try:
+                callback(endpoint, old_state, new_state)
+            except Exception:
+                logger.exception('Circuit breaker listener failed')
+
+    def before_request(self, endpoint: Hashable) -> None:
+        """
+        Raise CircuitOpenError if request to endpoint is not allowed.
+        """
+        with self._lock:
+            state = self._current_state(endpoint)
+            circuit = self._circuits[endpoint]
+            if state == CircuitState.CLOSED:
+                return
+            if state == CircuitState.HALF_OPEN and circuit.probes < self.half_open_max_calls:
+                circuit.probes += 1
+                return
+            retry_after = max(circuit.opened_at + self.recovery_timeout - time.monotonic(),
+                              0.)
+        raise CircuitOpenError(f'Circuit for {endpoint} is {state}',
+                               endpoint=endpoint, retry_after=retry_after)
+
+    def release(self, endpoint: Hashable) -> None:
+        """
+        Request let through by before_request ended without a result (e.g. it was
+        cancelled). Free its probe slot without counting success or failure.
+        """
+        with self._lock:
+            circuit = self._circuits[endpoint]
+            if circuit.state == CircuitState.HALF_OPEN and circuit.probes:
+                circuit.probes -= 1
+
+    def record_success(self, endpoint: Hashable) -> None:
+        with self._lock:
+            circuit = self._circuits[endpoint]
+            if circuit.state == CircuitState.HALF_OPEN:
+                self._set_state(endpoint, circuit, CircuitState.CLOSED)
+
+    def record_failure(self, endpoint: Hashable) -> None:
+        with self._lock:
+            circuit = self._circuits[endpoint]
+            now = time.monotonic()
+            if circuit.state == CircuitState.HALF_OPEN:
+                self._set_state(endpoint, circuit, CircuitState.OPEN)
+                return
+            if circuit.state == CircuitState.OPEN:
+                return
+            circuit.failures.append(now)
+            while circuit.failures and circuit.failures[0] < now - self.window:
+                circuit.failures.popleft()
+            if len(circuit.failures) >= self.failure_threshold:
+                self._set_state(endpoint, circuit, CircuitState.OPEN)
@@ -0,0 +1,144 @@
+"""
+JSON API Python client 
+https://github.com/qvantel/jsonapi-client
+
+(see JSON API specification in http://jsonapi.org/)
+
+Copyright (c) 2017, Qvantel
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the Qvantel nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL QVANTEL BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+Columnar extraction of attributes from JSON API resource data, for analytics.
+Values are read directly from decoded JSON, without building ResourceObjects.
+"""
+
+import logging
+from array import array
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Sequence, Union
+
+from .common import jsonify_attribute_name
+
+if TYPE_CHECKING:
+    from .session import Schema
+
+logger = logging.getLogger(__name__)
+
+Column = Union[array, list, Any]
+
+#: array typecodes of numeric json schema types
+TYPECODES = {'integer': 'q', 'number': 'd', 'boolean': 'b'}
+NUMPY_DTYPES = {'q': 'int64', 'd': 'float64', 'b': 'bool'}
+
+NAN = float('nan')
+
+
+def field_paths(fields: 'Sequence[str]') -> 'List[List[str]]':
+    """
+    Split field names (e.g. 'title', 'author_info.first_name') into jsonified
+    attribute paths.
+    """
+    return [jsonify_attribute_name(field).split('.') for field in fields]
+
+
+def value_at(resource: dict, path: 'List[str]'):
+    """
+    Return value of attribute path of raw resource dictionary, or None if it
+    does not exist. Path ['id'] and ['type'] give id and type of resource.
+    """
+    if len(path) == 1 and path[0] in ('id', 'type'):
+        return resource.get(path[0])
+    value = resource.get('attributes')
+    for name in path:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(name)
+    return value
+
+
+def schema_type(schema: 'Optional[Schema]', resource_type: str, path: 'List[str]') \
+        -> Optional[str]:
+    if schema is None or not resource_type:
+        return None
+    spec = schema.find_spec(resource_type, '.'.join(path))
+    type_ = spec.get('type') if spec else None
+    if isinstance(type_, list):
+        type_ = next((t for t in type_ if t != 'null'), None)
+    return type_
+
+
+def typed_column(values: list, type_: Optional[str], use_numpy: bool=False) -> Column:
+    """
+    Convert list of values into array (or NumPy array) if schema type is numeric.
+    Missing numbers are NaN. Integer and boolean columns with missing values
+    are converted to floats and lists, respectively. Integer columns with
+    values that do not fit (such as 3.0 or very large numbers) are converted to
+    floats, and columns with values of other types are left as lists.
+    """
+    typecode = TYPECODES.get(type_)
+    if typecode is None:
+        return values
+    has_null = any(v is None for v in values)
+    if has_null:
+        if typecode == 'b':
+            return values
+        typecode = 'd'
+        values = [NAN if v is None else v for v in values]
+    try:
+        column = array(typecode, values)
+    except (TypeError, OverflowError):
+        if typecode != 'q':
+            return values
+        typecode = 'd'
+        try:
+            column = array(typecode, values)
+        except (TypeError, OverflowError):
+            return values
+    if use_numpy:
+        import numpy
+        return numpy.frombuffer(column, dtype=NUMPY_DTYPES[typecode])
+    return column
+
+
+def to_columns(resources: 'Iterable[dict]', fields: 'Sequence[str]',
+               schema: 'Schema'=None, resource_type: str='',
+               use_numpy: bool=False) -> 'Dict[str, Column]':
+    """
+    Extract attribute paths of raw resource dictionaries into columns.
+
+    :param resources: Raw resource object dictionaries (with id, type and
+        attributes) of the same resource type.
+    :param fields: Attribute paths (dot or double underscore separated), 'id' or 'type'
+    :param schema: Schema used to find numeric columns, that are returned as arrays
+    :param resource_type: Resource type for schema lookups
+    :param use_numpy: Return numeric columns as NumPy arrays
+    :return: Dictionary from field to column (list, array or NumPy array)
+    """
+    paths = field_paths(fields)
+    values: 'List[list]' = [[] for _ in paths]
+    for res in resources:
+        for column, path in zip(values, paths):
+            column.append(value_at(res, path))
+    return {field: typed_column(column, schema_type(schema, resource_type, path),
+                                use_numpy)
+            for field, path, column in zip(fields, paths, values)}
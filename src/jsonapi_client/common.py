@@ -32,7 +32,12 @@ SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 import asyncio
 import logging
-from typing import Union, TYPE_CHECKING, NamedTuple
+import posixpath
+import weakref
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Union, TYPE_CHECKING, NamedTuple, Optional
+from urllib.parse import parse_qsl, quote, unquote, urlsplit, urlunsplit
 
 if TYPE_CHECKING:
     from .session import Session
@@ -54,6 +59,7 @@ class HttpStatus:
 
 
 class HttpMethod:
+    GET = 'get'
     POST = 'post'
     PATCH = 'patch'
     DELETE = 'delete'
@@ -68,6 +74,9 @@ class AbstractJsonObject:
     """
     Base for all JSON API specific objects
     """
+    #: Generation of Session when this object was added to its cache
+    _generation: Optional[int] = None
+
     def __init__(self, session: 'Session', data: Union[dict, list]) -> None:
         self._invalid = False
         self._session = session
@@ -93,6 +102,15 @@ class AbstractJsonObject:
     def url(self) -> str:
         raise NotImplementedError
 
+    @property
+    def is_invalid(self) -> bool:
+        """
+        True if this object has been marked invalid, or if Session has been
+        invalidated after this object was cached.
+        """
+        return self._invalid or (self._generation is not None and
+                                 self._generation != self._session._generation)
+
     def mark_invalid(self):
         self._invalid = True
 
@@ -179,6 +197,153 @@ class AttributeProxy:
             raise AttributeError
 
 
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+@lru_cache(maxsize=10000)
+def normalize_url(url: str) -> str:
+    """
+    Normalize url for use as a cache key: scheme and host are lowercased, default
+    port is removed, path is normalized (dot segments, duplicate and trailing
+    slashes), query parameters are sorted and percent-encoding is normalized.
+    Fragment is dropped.
+    """
+    if not url or not isinstance(url, str):
+        return url
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    netloc = parts.netloc.lower()
+    try:
+        port = parts.port
+    except ValueError:  # Invalid port, keep netloc as it is
+        port = netloc = None
+    if netloc:
+        netloc = parts.hostname or ''
+        if ':' in netloc:
+            netloc = f'[{netloc}]'
+        if port is not None and port != DEFAULT_PORTS.get(scheme):
+            netloc = f'{netloc}:{port}'
+        if parts.username is not None:
+            userinfo = parts.username
+            if parts.password is not None:
+                userinfo = f'{userinfo}:{parts.password}'
+            netloc = f'{userinfo}@{netloc}'
+    path = parts.path
+    if path:
+        path = posixpath.normpath('/' + path.lstrip('/') if path.startswith('/') else path)
+        path = '' if path == '.' else quote(unquote(path), safe="/:@!$&'()*+,;=")
+    query = '&'.join(f'{quote(key, safe="[].")}={quote(value, safe=",")}'
+                     for key, value in sorted(parse_qsl(parts.query,
+                                                        keep_blank_values=True)))
+    return urlunsplit((scheme, parts.netloc.lower() if netloc is None else netloc,
+                       path, query, ''))
+
+
+class NormalizedUrlMixin:
+    """
+    Mapping mixin that normalizes url keys with normalize_url on every read and
+    write, so that different spellings of the same url find the same entry.
+    """
+    def __getitem__(self, url):
+        return super().__getitem__(normalize_url(url))
+
+    def __setitem__(self, url, value):
+        super().__setitem__(normalize_url(url), value)
+
+    def __delitem__(self, url):
+        super().__delitem__(normalize_url(url))
+
+    def __contains__(self, url):
+        return super().__contains__(normalize_url(url))
+
+    def get(self, url, default=None):
+        return super().get(normalize_url(url), default)
+
+    def pop(self, url, *default):
+        return super().pop(normalize_url(url), *default)
+
+    def setdefault(self, url, default=None):
+        url = normalize_url(url)
+        if url not in self:
+            self[url] = default
+        return self[url]
+
+    def update(self, *args, **kwargs):
+        for url, value in dict(*args, **kwargs).items():
+            self[url] = value
+
+
+class NormalizedUrlDict(NormalizedUrlMixin, dict):
+    """
+    Dictionary keyed by urls, see NormalizedUrlMixin.
+    """
+
+
+class WeakValueCache(weakref.WeakValueDictionary):
+    """
+    Dictionary that holds weak references to its values, and strong references
+    to the most recently used values. Values stay in the dictionary as long as
+    they are used elsewhere or recently used here.
+
+    :param strong_size: Number of recently used values kept alive
+    """
+    def __init__(self, strong_size: int=1000) -> None:
+        super().__init__()
+        self.strong_size = strong_size
+        self._recent: 'OrderedDict' = OrderedDict()
+
+    def _touch(self, key, value) -> None:
+        recent = self._recent
+        recent[key] = value
+        recent.move_to_end(key)
+        if len(recent) > self.strong_size:
+            recent.popitem(last=False)
+
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        self._touch(key, value)
+        return value
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._touch(key, value)
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._recent.pop(key, None)
+
+    def pop(self, key, *default):
+        self._recent.pop(key, None)
+        return super().pop(key, *default)
+
+    def setdefault(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            self[key] = default
+            return default
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def clear(self) -> None:
+        super().clear()
+        self._recent.clear()
+
+
+class NormalizedUrlWeakValueCache(NormalizedUrlMixin, WeakValueCache):
+    """
+    WeakValueCache keyed by urls, see NormalizedUrlMixin.
+    """
+
+
 class ResourceTuple(NamedTuple):
     id: str
     type: str
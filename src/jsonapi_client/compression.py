@@ -0,0 +1,90 @@
+"""
+JSON API Python client 
+https://github.com/qvantel/jsonapi-client
+
+(see JSON API specification in http://jsonapi.org/)
+
+Copyright (c) 2017, Qvantel
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the Qvantel nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL QVANTEL BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import gzip
+import threading
+
+
+def accept_encoding() -> str:
+    """
+    Value for Accept-Encoding header. Brotli is accepted if it can be decoded,
+    i.e. brotli (or brotlicffi) package is installed.
+    """
+    encodings = ['gzip', 'deflate']
+    try:
+        import brotli  # noqa
+    except ImportError:
+        try:
+            import brotlicffi  # noqa
+        except ImportError:
+            return ', '.join(encodings)
+    encodings.append('br')
+    return ', '.join(encodings)
+
+
+def compress(data: bytes) -> bytes:
+    """
+    Compress request body with gzip.
+    """
+    return gzip.compress(data, compresslevel=6)
+
+
+class TransferStats:
+    """
+    Counters of bytes transferred by Session. Sent and received byte counts are
+    given both as transferred (possibly compressed) and uncompressed.
+    """
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.bytes_out = 0
+        self.bytes_out_uncompressed = 0
+        self.bytes_in = 0
+        self.bytes_in_uncompressed = 0
+
+    def record_out(self, transferred: int, uncompressed: int) -> None:
+        with self._lock:
+            self.bytes_out += transferred
+            self.bytes_out_uncompressed += uncompressed
+
+    def record_in(self, transferred: int, uncompressed: int) -> None:
+        with self._lock:
+            self.bytes_in += transferred
+            self.bytes_in_uncompressed += uncompressed
+
+    def as_dict(self) -> dict:
+        return {'bytes_out': self.bytes_out,
+                'bytes_out_uncompressed': self.bytes_out_uncompressed,
+                'bytes_in': self.bytes_in,
+                'bytes_in_uncompressed': self.bytes_in_uncompressed}
+
+    def __str__(self):
+        return str(self.as_dict())
@@ -0,0 +1,120 @@
+"""
+JSON API Python client 
+https://github.com/qvantel/jsonapi-client
+
+(see JSON API specification in http://jsonapi.org/)
+
+Copyright (c) 2017, Qvantel
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the Qvantel nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL QVANTEL BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import asyncio
+import contextvars
+import logging
+import time
+from typing import Optional
+
+from .exceptions import DeadlineExceeded
+
+logger = logging.getLogger(__name__)
+
+_deadline: 'contextvars.ContextVar[Optional[float]]' = \
+    contextvars.ContextVar('jsonapi_client_deadline', default=None)
+
+
+def remaining() -> Optional[float]:
+    """
+    Return remaining time in seconds of the current deadline, or None if there
+    is no deadline. Raise DeadlineExceeded if deadline has already expired.
+    """
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    left = deadline - time.monotonic()
+    if left <= 0:
+        raise DeadlineExceeded('Deadline exceeded')
+    return left
+
+
+class Deadline:
+    """
+    Context manager that bounds the total time of all requests made within it,
+    including pagination, relationship fetches and commits:
+
+        with session.deadline(5):
+            for res in session.iterate('articles'):
+                ...
+
+        async with session.deadline(5):
+            ...
+
+    Each request gets at most the remaining time as its timeout, and
+    DeadlineExceeded is raised when no time is left. In async mode the task
+    that entered the context is cancelled when deadline expires, cancelling
+    also all outstanding work awaited by it. Nested deadlines can only
+    shorten the outer deadline.
+    """
+    def __init__(self, seconds: float) -> None:
+        self.seconds = seconds
+        self._token = None
+        self._timer: asyncio.TimerHandle = None
+        self._task: asyncio.Task = None
+        self._expired = False
+
+    def _enter(self) -> 'Deadline':
+        deadline = time.monotonic() + self.seconds
+        outer = _deadline.get()
+        if outer is not None:
+            deadline = min(deadline, outer)
+        self.expires_at = deadline
+        self._token = _deadline.set(deadline)
+        return self
+
+    def __enter__(self) -> 'Deadline':
+        return self._enter()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        _deadline.reset(self._token)
+
+    async def __aenter__(self) -> 'Deadline':
+        self._enter()
+        self._task = asyncio.current_task()
+        loop = asyncio.get_event_loop()
+        self._timer = loop.call_at(loop.time() + self.expires_at - time.monotonic(),
+                                   self._expire)
+        return self
+
+    def _expire(self) -> None:
+        logger.warning('Deadline exceeded, cancelling outstanding requests')
+        self._expired = True
+        self._task.cancel()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self._timer.cancel()
+        _deadline.reset(self._token)
+        if exc_type is asyncio.CancelledError and self._expired:
+            if hasattr(self._task, 'uncancel'):
+                self._task.uncancel()
+            raise DeadlineExceeded('Deadline exceeded') from exc_val
@@ -31,8 +31,13 @@ SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 """
 
 import logging
-from typing import TYPE_CHECKING, Iterator, AsyncIterator, List
+import weakref
+from itertools import chain
+from typing import (TYPE_CHECKING, Iterator, AsyncIterator, Dict, List, Optional, Set,
+                    Sequence)
+from urllib.parse import parse_qsl, urlparse
 
+from .columns import to_columns
 from .common import AbstractJsonObject
 from .exceptions import ValidationError, DocumentError
 from .objects import Meta, Links
@@ -40,6 +45,8 @@ from .resourceobject import ResourceObject
 
 if TYPE_CHECKING:
     from .session import Session
+    from .filter import Page
+    from .columns import Column
 
 
 logger = logging.getLogger(__name__)
@@ -78,16 +85,32 @@ class Document(AbstractJsonObject):
                            '.resources!', self)
         return self.resources[0]
 
+    def _sparse_fields(self) -> 'Dict[str, Set[str]]':
+        """
+        Sparse fieldsets (fields[type]=a,b) requested in url of this Document.
+        """
+        if not self._url or 'fields' not in self._url:
+            return {}
+        return {key[7:-1]: set(filter(None, value.split(',')))
+                for key, value in parse_qsl(urlparse(self._url).query,
+                                            keep_blank_values=True)
+                if key.startswith('fields[') and key.endswith(']')}
+
     def _handle_data(self, json_data):
         data = json_data.get('data')
+        sparse = self._sparse_fields()
+
+        def make_resource(data):
+            return ResourceObject(self.session, data, sparse.get(data.get('type')))
 
         self.resources = []
+        self._single = not isinstance(data, list)
 
         if data:
             if isinstance(data, list):
-                self.resources.extend([ResourceObject(self.session, i) for i in data])
+                self.resources.extend([make_resource(i) for i in data])
             elif isinstance(data, dict):
-                self.resources.append(ResourceObject(self.session, data))
+                self.resources.append(make_resource(data))
 
         self.errors = json_data.get('errors')
         if [data, self.errors] == [None]*2:
@@ -102,40 +125,78 @@ class Document(AbstractJsonObject):
         if self.errors:
             raise DocumentError(f'Error document was fetched. Details: {self.errors}',
                                 errors=self.errors)
-        self.included = [ResourceObject(self.session, i)
-                         for i in json_data.get('included', [])]
+        self.included = [make_resource(i) for i in json_data.get('included', [])]
+        ref = weakref.ref(self)
+        for res in chain(self.resources, self.included):
+            res._document_ref = ref
         if not self._no_cache:
             self.session.add_resources(*self.resources, *self.included)
 
     def __str__(self):
         return f'{self.resources}' if self.resources else f'{self.errors}'
 
-    def _iterator_sync(self) -> 'Iterator[ResourceObject]':
-        yield from self.resources
-        if self.links.next:
-            next_doc = self.links.next.fetch()
-            yield from next_doc.iterator()
-
-    async def _iterator_async(self) -> 'AsyncIterator[ResourceObject]':
-        for res in self.resources:
-            yield res
+    def next_url(self, page: 'Page'=None) -> 'Optional[str]':
+        """
+        Return url of the next page, or None if this is the last page.
 
-        if self.links.next:
-            next_doc = await self.links.next.fetch()
-            async for res in next_doc.iterator():
+        :param page: Page modifier used to find the next page (e.g. CursorPage).
+            By default, links.next is followed.
+        """
+        if page is not None:
+            return page.next_url(self)
+        return self.links.next.url if self.links.next else None
+
+    def _iterator_sync(self, page: 'Page'=None) -> 'Iterator[ResourceObject]':
+        doc = self
+        while True:
+            yield from doc.resources
+            url = doc.next_url(page)
+            if not url:
+                break
+            doc = self.session.fetch_document_by_url(url)
+
+    async def _iterator_async(self, page: 'Page'=None) -> 'AsyncIterator[ResourceObject]':
+        doc = self
+        while True:
+            for res in doc.resources:
                 yield res
+            url = doc.next_url(page)
+            if not url:
+                break
+            doc = await self.session.fetch_document_by_url_async(url)
 
-    def iterator(self):
+    def iterator(self, page: 'Page'=None):
         """
         Iterate through all resources of this Document and follow pagination until
         there's no more resources.
 
         If Session is in async mode, this needs to be used with async for.
+
+        :param page: Page modifier used to find the next pages (e.g. CursorPage to
+            follow cursors from meta). By default, links.next is followed.
         """
         if self.session.enable_async:
-            return self._iterator_async()
+            return self._iterator_async(page)
         else:
-            return self._iterator_sync()
+            return self._iterator_sync(page)
+
+    def to_columns(self, fields: 'Sequence[str]', use_numpy: bool=False) \
+            -> 'Dict[str, Column]':
+        """
+        Return attributes of resources of this Document (not following pagination)
+        as columns. Attribute values are read directly from attribute dictionaries.
+
+        :param fields: Attribute paths (e.g. 'title', 'author_info.first_name'),
+            'id' or 'type'
+        :param use_numpy: Return numeric columns as NumPy arrays instead of arrays
+        :return: Dictionary from field to column. Columns are arrays (array module)
+            if schema says the attribute is numeric, otherwise lists.
+        """
+        resources = [{'id': res.id, 'type': res.type, 'attributes': res._attributes}
+                     for res in self.resources]
+        resource_type = resources[0]['type'] if resources else ''
+        return to_columns(resources, fields, self.session.schema, resource_type,
+                          use_numpy)
 
     def mark_invalid(self):
         """
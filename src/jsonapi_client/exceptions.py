@@ -60,3 +60,45 @@ class DocumentInvalid(JsonApiClientError):
 
 class AsyncError(JsonApiClientError):
     pass
+
+
+class DeadlineExceeded(JsonApiClientError):
+    """
+    Raised when deadline set by Session.deadline has expired.
+    """
+    pass
+
+
+class CircuitOpenError(JsonApiClientError):
+    """
+    Raised when request is not sent because circuit breaker of the endpoint
+    is open. Endpoint is stored in endpoint and time in seconds until next probe
+    request is allowed in retry_after.
+    """
+    def __init__(self, *args, endpoint, retry_after):
+        super().__init__(*args)
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+
+class NPlusOneError(JsonApiClientError):
+    """
+    Raised by NPlusOneDetector in strict mode. Name of the relationship is
+    stored in relationship and the Document in document.
+    """
+    def __init__(self, *args, relationship, document):
+        super().__init__(*args)
+        self.relationship = relationship
+        self.document = document
+
+
+class CommitError(JsonApiClientError):
+    """
+    Raised when parallel commit could not commit all dirty resources.
+    Failed resources are stored in failures as (resource, exception) tuples
+    and successfully committed resources in committed.
+    """
+    def __init__(self, *args, failures, committed):
+        super().__init__(*args)
+        self.failures = failures
+        self.committed = committed
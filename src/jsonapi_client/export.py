@@ -0,0 +1,131 @@
+"""
+JSON API Python client 
+https://github.com/qvantel/jsonapi-client
+
+(see JSON API specification in http://jsonapi.org/)
+
+Copyright (c) 2017, Qvantel
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the Qvantel nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL QVANTEL BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+Streaming export of JSON API collections to NDJSON or CSV files.
+"""
+
+import csv
+import json
+import logging
+from contextlib import contextmanager
+from typing import IO, Iterator, List, Sequence, Union
+
+from .columns import field_paths, value_at
+
+logger = logging.getLogger(__name__)
+
+Output = Union[str, IO[str]]
+
+
+class ExportWriter:
+    """
+    Writes raw resource object dictionaries to a text file.
+
+    :param output: Text file object to write to
+    :param fields: Attribute paths (e.g. 'title', 'author_info.first_name'), 'id'
+        or 'type' to write. None to write whole resource objects (NDJSON only).
+    """
+    def __init__(self, output: 'IO[str]', fields: 'Sequence[str]'=None) -> None:
+        self.output = output
+        self.fields = fields
+        self._paths = field_paths(fields) if fields else None
+        #: Number of resources written
+        self.count = 0
+
+    def row(self, resource: dict) -> list:
+        return [value_at(resource, path) for path in self._paths]
+
+    def write_page(self, resources: 'List[dict]') -> None:
+        raise NotImplementedError
+
+
+class NdjsonWriter(ExportWriter):
+    """
+    Writes one JSON object per line: resource object, or object from field
+    names to values if fields are given.
+    """
+    def write_page(self, resources: 'List[dict]') -> None:
+        dumps = json.dumps
+        if self.fields:
+            lines = [dumps(dict(zip(self.fields, self.row(res)))) for res in resources]
+        else:
+            lines = [dumps(res) for res in resources]
+        if lines:
+            self.output.write('\n'.join(lines) + '\n')
+        self.count += len(lines)
+
+
+class CsvWriter(ExportWriter):
+    """
+    Writes CSV with a header row of field names. If fields are not given, id and
+    attributes of the first resource are written. Dictionaries and lists are
+    written as JSON.
+    """
+    def __init__(self, output: 'IO[str]', fields: 'Sequence[str]'=None) -> None:
+        super().__init__(output, fields)
+        self._writer = csv.writer(output)
+
+    @staticmethod
+    def _cell(value):
+        return json.dumps(value) if isinstance(value, (dict, list)) else value
+
+    def write_page(self, resources: 'List[dict]') -> None:
+        if not resources:
+            return
+        if self._paths is None:
+            self.fields = ['id'] + list(resources[0].get('attributes', {}))
+            self._paths = field_paths(self.fields)
+        if not self.count:
+            self._writer.writerow(self.fields)
+        cell = self._cell
+        self._writer.writerows([cell(value) for value in self.row(res)]
+                               for res in resources)
+        self.count += len(resources)
+
+
+WRITERS = {'ndjson': NdjsonWriter, 'csv': CsvWriter}
+
+
+@contextmanager
+def open_writer(output: 'Output', format: str, fields: 'Sequence[str]'=None) \
+        -> 'Iterator[ExportWriter]':
+    """
+    Open writer for format ('ndjson' or 'csv') to output path or text file object.
+    """
+    writer_cls = WRITERS.get(format)
+    if writer_cls is None:
+        raise ValueError(f'Unknown export format {format}, use one of {list(WRITERS)}')
+    if isinstance(output, str):
+        with open(output, 'w', newline='', encoding='utf-8') as f:
+            yield writer_cls(f, fields)
+    else:
+        yield writer_cls(output, fields)
+
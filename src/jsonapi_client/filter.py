@@ -30,21 +30,68 @@ ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
 SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 """
 
-from typing import TYPE_CHECKING, Union, Dict, Sequence
+from typing import TYPE_CHECKING, Union, Dict, Optional, Sequence
+from urllib.parse import parse_qsl, quote, urlsplit, urlunsplit
+
+from .common import cached_property
 
 if TYPE_CHECKING:
+    from .document import Document
     FilterKeywords = Dict[str, Union[str, Sequence[Union[str, int, float]]]]
     IncludeKeywords = Sequence[str]
+    FieldsKeywords = Union[str, Sequence[str]]
+
+
+def jsonify_key(key: str) -> str:
+    return key.replace('__', '.').replace('_', '-')
+
+
+def encode_key(key: str) -> str:
+    """
+    Jsonify and percent-encode parameter name (e.g. attribute name in filter[name])
+    """
+    return quote(jsonify_key(key), safe='.')
+
+
+def encode_value(value) -> str:
+    """
+    Percent-encode query parameter value. Lists, tuples and sets are sorted
+    and joined with commas.
+    """
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return ','.join(sorted({encode_value(v) for v in value}))
+    if isinstance(value, bool):
+        value = 'true' if value else 'false'
+    return quote(str(value), safe=',')
 
 
 class Modifier:
     """
     Base class for query modifiers.
     You can derive your own class and use it if you have custom syntax.
+
+    Modifiers are immutable and hashable. Query string is built only once, and
+    modifiers that produce the same query are equal.
     """
     def __init__(self, query_str: str='') -> None:
         self._query_str = query_str
 
+    def __setattr__(self, name, value):
+        if '_query' in self.__dict__:
+            raise AttributeError(f'{self.__class__.__name__} is immutable')
+        super().__setattr__(name, value)
+
+    def __eq__(self, other):
+        if not isinstance(other, Modifier):
+            return NotImplemented
+        return self.appended_query() == other.appended_query()
+
+    def __hash__(self):
+        return hash(self.appended_query())
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__}: {self.appended_query()}>'
+
     def url_with_modifiers(self, base_url: str) -> str:
         """
         Returns url with modifiers appended.
@@ -58,6 +105,19 @@ class Modifier:
         return fetch_url
 
     def appended_query(self) -> str:
+        return self._query
+
+    @cached_property
+    def _query(self) -> str:
+        """
+        Memoized query string, see build_query.
+        """
+        return self.build_query()
+
+    def build_query(self) -> str:
+        """
+        Build canonical query string of this modifier. Override this in subclasses.
+        """
         return self._query_str
 
     def __add__(self, other: 'Modifier') -> 'Modifier':
@@ -71,11 +131,17 @@ class Modifier:
 
 
 class ModifierSum(Modifier):
+    """
+    Combination of modifiers. Parameters of query are sorted, so the order of
+    added modifiers does not change the query.
+    """
     def __init__(self, modifiers):
-        self.modifiers = modifiers
+        self.modifiers = tuple(modifiers)
 
-    def appended_query(self) -> str:
-        return '&'.join(m.appended_query() for m in self.modifiers)
+    def build_query(self) -> str:
+        params = {param for m in self.modifiers
+                  for param in m.appended_query().split('&') if param}
+        return '&'.join(sorted(params))
 
 
 class Filter(Modifier):
@@ -100,18 +166,18 @@ class Filter(Modifier):
     def filtered_url(self, base_url: str) -> str:
         return super().url_with_modifiers(base_url)
 
-    def appended_query(self) -> str:
-        return super().appended_query() or self.format_filter_query(**self._filter_kwargs)
+    def build_query(self) -> str:
+        return self._query_str or self.format_filter_query(**self._filter_kwargs)
 
     def format_filter_query(self, **kwargs: 'FilterKeywords') -> str:
         """
         Filter class that implements url filtering scheme according to JSONAPI
         recommendations (http://jsonapi.org/recommendations/)
+
+        Filters are sorted by name and values are percent-encoded.
         """
-        def jsonify_key(key):
-            return key.replace('__', '.').replace('_', '-')
-        return '&'.join(f'filter[{jsonify_key(key)}]={value}'
-                        for key, value in kwargs.items())
+        return '&'.join(sorted(f'filter[{encode_key(key)}]={encode_value(value)}'
+                               for key, value in kwargs.items()))
 
 
 class Inclusion(Modifier):
@@ -122,6 +188,127 @@ class Inclusion(Modifier):
         super().__init__()
         self._include_args = include_args
 
-    def appended_query(self) -> str:
-        includes = ','.join(self._include_args)
+    def build_query(self) -> str:
+        includes = encode_value(self._include_args)
         return f'include={includes}'
+
+
+class SparseFields(Modifier):
+    """
+    Implements sparse fieldsets (fields[type]) for Session.get etc.
+
+    Resources fetched with sparse fieldsets are partially loaded (see
+    ResourceObject.is_partial). Accessing a field that was not fetched loads the
+    remaining fields of the resource, and other partial resources of the same type
+    in the document, in batched requests.
+    """
+    def __init__(self, **fields_kwargs: 'FieldsKeywords') -> None:
+        """
+        :param fields_kwargs: Fields to fetch by resource type.
+            Example: SparseFields(articles=['title', 'author'], people='name')
+        """
+        super().__init__()
+        self._fields_kwargs = fields_kwargs
+
+    def build_query(self) -> str:
+        queries = []
+        for type_, fields in self._fields_kwargs.items():
+            if isinstance(fields, str):
+                fields = [fields]
+            fields = encode_value([jsonify_key(field) for field in fields])
+            queries.append(f'fields[{encode_key(type_)}]={fields}')
+        return '&'.join(sorted(queries))
+
+
+class Page(Modifier):
+    """
+    Implements pagination (page[number], page[size]) for Session.get,
+    Session.iterate etc.
+
+    Page is also the pager that Document.iterator and Session.iterate use to find
+    the url of the next page. By default, links.next of the document is followed.
+    """
+    def __init__(self, number: int=None, size: int=None) -> None:
+        """
+        :param number: Page number
+        :param size: Number of resources on each page
+        """
+        super().__init__()
+        self._page_kwargs = {'number': number, 'size': size}
+
+    def build_query(self) -> str:
+        return '&'.join(sorted(f'page[{encode_key(key)}]={encode_value(value)}'
+                               for key, value in self._page_kwargs.items()
+                               if value is not None))
+
+    def next_url(self, document: 'Document') -> Optional[str]:
+        """
+        Return url of the page that follows document, or None if it is the last page.
+        """
+        return document.links.next.url if document.links.next else None
+
+
+class OffsetPage(Page):
+    """
+    Implements offset based pagination (page[offset], page[limit]).
+    """
+    def __init__(self, offset: int=None, limit: int=None) -> None:
+        """
+        :param offset: Number of resources to skip
+        :param limit: Number of resources on each page
+        """
+        Modifier.__init__(self)
+        self._page_kwargs = {'offset': offset, 'limit': limit}
+
+
+class CursorPage(Page):
+    """
+    Implements cursor based pagination (page[size], page[after], page[before]).
+
+    Cost of each page stays the same however deep the iteration goes. If the
+    document has no links.next, the next page is requested with page[after] set
+    to the next cursor from document meta (page.next-cursor, page.nextCursor or
+    page.next) or the cursor of the last resource (meta page.cursor, as in
+    JSON API cursor pagination profile).
+    """
+    #: Keys of next cursor in page object of document meta
+    next_cursor_keys = ('next-cursor', 'nextCursor', 'next')
+
+    def __init__(self, size: int=None, after: str=None, before: str=None) -> None:
+        """
+        :param size: Number of resources on each page
+        :param after: Cursor after which resources are returned
+        :param before: Cursor before which resources are returned
+        """
+        Modifier.__init__(self)
+        self._page_kwargs = {'size': size, 'after': after, 'before': before}
+
+    def next_cursor(self, document: 'Document') -> Optional[str]:
+        """
+        Find cursor of the next page from document.
+        """
+        page_meta = document.meta['page'] or {}
+        for key in self.next_cursor_keys:
+            if page_meta.get(key) is not None:
+                return str(page_meta[key])
+        if page_meta.get('hasMore', page_meta.get('has-more')) is False:
+            return None
+        if document.resources:
+            cursor = (document.resources[-1].meta['page'] or {}).get('cursor')
+            return None if cursor is None else str(cursor)
+
+    def next_url(self, document: 'Document') -> Optional[str]:
+        url = super().next_url(document)
+        if url or not document.resources:
+            return url
+        cursor = self.next_cursor(document)
+        if cursor is None:
+            return None
+        parts = urlsplit(document.url)
+        query = [(key, value) for key, value in parse_qsl(parts.query,
+                                                          keep_blank_values=True)
+                 if key not in ('page[after]', 'page[before]')]
+        query.append(('page[after]', cursor))
+        query_str = '&'.join(f'{quote(key, safe="[].")}={quote(value, safe=",")}'
+                             for key, value in query)
+        return urlunsplit(parts._replace(query=query_str))
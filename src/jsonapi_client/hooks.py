@@ -0,0 +1,104 @@
+"""
+JSON API Python client 
+https://github.com/qvantel/jsonapi-client
+
+(see JSON API specification in http://jsonapi.org/)
+
+Copyright (c) 2017, Qvantel
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the Qvantel nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL QVANTEL BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import logging
+from typing import Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+
+class Event:
+    """
+    Names of events that Session emits to hooks registered with Session.on.
+
+    Keyword arguments given to callbacks:
+
+    - REQUEST_START: method, url, url_template, attempt
+    - REQUEST_END: method, url, url_template, attempt, status (None if request
+      failed), bytes (response body size), latency (seconds), exception
+    - DOCUMENT_PARSED: url, duration (seconds), resources (number of resources
+      including included resources)
+    - VALIDATE: type, id, duration (seconds)
+    - COMMIT: type, id, method, duration (seconds)
+    - RELATIONSHIP_FETCH: name, type and id (of resource that has the
+      relationship), duration (seconds)
+    - CACHE_HIT, CACHE_MISS: kind ('resource' or 'document'), key
+    - CACHE_EVICTION: kind ('resource' or 'all'), key, count
+    """
+    REQUEST_START = 'request_start'
+    REQUEST_END = 'request_end'
+    DOCUMENT_PARSED = 'document_parsed'
+    VALIDATE = 'validate'
+    COMMIT = 'commit'
+    RELATIONSHIP_FETCH = 'relationship_fetch'
+    CACHE_HIT = 'cache_hit'
+    CACHE_MISS = 'cache_miss'
+    CACHE_EVICTION = 'cache_eviction'
+
+    ALL = (REQUEST_START, REQUEST_END, DOCUMENT_PARSED, VALIDATE, COMMIT,
+           RELATIONSHIP_FETCH, CACHE_HIT, CACHE_MISS, CACHE_EVICTION)
+
+
+class Hooks:
+    """
+    Registry of event callbacks. Evaluates as False when nothing is registered,
+    so that callers can skip collecting event data:
+
+        if session.hooks:
+            session.hooks.emit(Event.CACHE_HIT, kind='document', key=url)
+
+    Callbacks are called as callback(event, **info). Exceptions raised by
+    callbacks are logged and ignored.
+    """
+    def __init__(self) -> None:
+        self._callbacks: Dict[str, List[Callable]] = {}
+
+    def add(self, event: str, callback: Callable) -> None:
+        if event not in Event.ALL:
+            raise ValueError(f'Unknown event {event}. Should be one of {Event.ALL}')
+        self._callbacks.setdefault(event, []).append(callback)
+
+    def remove(self, event: str, callback: Callable) -> None:
+        callbacks = self._callbacks.get(event, [])
+        callbacks.remove(callback)
+        if not callbacks:
+            self._callbacks.pop(event, None)
+
+    def __bool__(self):
+        return bool(self._callbacks)
+
+    def emit(self, event: str, **info) -> None:
+        for callback in self._callbacks.get(event, ()):
+            try:
+                callback(event, **info)
+            except Exception:
+                logger.exception('Hook %s for event %s failed', callback, event)
@@ -0,0 +1,121 @@
+"""
+JSON API Python client 
+https://github.com/qvantel/jsonapi-client
+
+(see JSON API specification in http://jsonapi.org/)
+
+Copyright (c) 2017, Qvantel
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the Qvantel nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL QVANTEL BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import logging
+import threading
+import weakref
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, List, Optional
+
+from .exceptions import NPlusOneError
+
+if TYPE_CHECKING:
+    from .document import Document
+    from .relationships import AbstractRelationship
+
+logger = logging.getLogger(__name__)
+
+#: Number of requests made by the relationship fetch in progress (in a list)
+_current_fetch: 'ContextVar[Optional[List[int]]]' = ContextVar('jsonapi_relationship_fetch',
+                                                               default=None)
+
+
+def count_request() -> None:
+    """
+    Count request made for the relationship fetch in progress, if any.
+    """
+    fetch = _current_fetch.get()
+    if fetch is not None:
+        fetch[0] += 1
+
+
+class NPlusOneDetector:
+    """
+    Detects N+1 relationship access: relationship with the same name being
+    fetched one resource at a time from many resources of the same Document, e.g.
+
+        for article in session.get('articles').resources:
+            article.author.name  # one GET per article
+
+    Only fetches that make requests (i.e. related resources were not included
+    in the document or already cached) are counted.
+
+    :param threshold: Number of fetches from one document that are reported
+    :param strict: Raise NPlusOneError instead of logging a warning
+    """
+    def __init__(self, threshold: int=5, strict: bool=False) -> None:
+        self.threshold = threshold
+        self.strict = strict
+        #: Number of detections by 'resource type.relationship name'
+        self.detections: Counter = Counter()
+        self._fetches: 'weakref.WeakKeyDictionary[Document, Counter]' = \
+            weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def track(self, relationship: 'AbstractRelationship'):
+        """
+        Count requests made while fetching relationship.
+        """
+        fetch = [0]
+        token = _current_fetch.set(fetch)
+        try:
+            yield
+        finally:
+            _current_fetch.reset(token)
+        if fetch[0]:
+            self.record(relationship)
+
+    def record(self, relationship: 'AbstractRelationship') -> None:
+        """
+        Record fetch of relationship that was made with request(s).
+        """
+        parent = relationship.parent
+        document = parent and parent.document
+        if document is None:
+            return
+        name = relationship.name
+        with self._lock:
+            fetches = self._fetches.setdefault(document, Counter())
+            fetches[name] += 1
+            if fetches[name] != self.threshold:
+                return
+            self.detections[f'{parent.type}.{name}'] += 1
+        msg = (f'N+1 relationship access: relationship "{name}" fetched separately for '
+               f'{self.threshold} resources of document {document.url or document}. '
+               f'Use Inclusion({name!r}) when fetching the document or load related '
+               f'resources in a batch.')
+        if self.strict:
+            raise NPlusOneError(msg, relationship=name, document=document)
+        logger.warning(msg)
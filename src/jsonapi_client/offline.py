@@ -0,0 +1,235 @@
+"""
+JSON API Python client 
+https://github.com/qvantel/jsonapi-client
+
+(see JSON API specification in http://jsonapi.org/)
+
+Copyright (c) 2017, Qvantel
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the Qvantel nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL QVANTEL BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+Offline store of saved JSON API documents (pages) for replaying archives
+without a server.
+"""
+
+import glob
+import json
+import logging
+import os
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from urllib.parse import quote, unquote, urlsplit, urlunsplit
+
+from .common import normalize_url
+
+logger = logging.getLogger(__name__)
+
+PathsOrGlob = Union[str, 'os.PathLike', Iterable[Union[str, 'os.PathLike']]]
+
+SUFFIX = '.json'
+
+
+def url_key(url: str) -> str:
+    """
+    Key of url in the store: normalized path and query, without scheme and host.
+    """
+    parts = urlsplit(normalize_url(url))
+    return urlunsplit(('', '', parts.path, parts.query, ''))
+
+
+def filename_for_url(url: str) -> str:
+    """
+    File name for document of url, e.g. /api/articles?page[number]=2 ->
+    %2Fapi%2Farticles%3Fpage%5Bnumber%5D%3D2.json
+    """
+    return quote(url_key(url), safe='') + SUFFIX
+
+
+def url_for_filename(filename: str) -> Optional[str]:
+    """
+    Url key of a file name made with filename_for_url, None for other file names.
+    """
+    if not filename.endswith(SUFFIX) or not filename.startswith('%2F'):
+        return None
+    return unquote(filename[:-len(SUFFIX)])
+
+
+def expand_paths(paths_or_glob: 'PathsOrGlob') -> 'List[str]':
+    """
+    Expand directory (all .json files in it), glob pattern or list of paths
+    into a sorted list of paths.
+    """
+    if isinstance(paths_or_glob, (str, os.PathLike)):
+        path = os.fspath(paths_or_glob)
+        if os.path.isdir(path):
+            return sorted(glob.glob(os.path.join(glob.escape(path), '*' + SUFFIX)))
+        if glob.has_magic(path):
+            return sorted(glob.glob(path, recursive=True))
+        return [path]
+    return [os.fspath(p) for p in paths_or_glob]
+
+
+class OfflineStore:
+    """
+    Store of saved JSON API documents, e.g. archived API dumps. Files are read
+    and decoded only when a document is read, one at a time, and no file is
+    kept open.
+
+    Documents are found by url: files named with filename_for_url (see
+    OfflineStore.save) are found by their name, other files by links.self of
+    the document (or of its resource), which is read when a url is not found
+    otherwise.
+
+    Used by Session.read_many, and by Session(offline_store=...) to read
+    documents (for example pagination links.next) from the store instead of
+    the server.
+
+    :param paths_or_glob: Directory, glob pattern or list of paths of saved
+        documents
+    """
+    def __init__(self, paths_or_glob: 'PathsOrGlob'=()) -> None:
+        self.paths: List[str] = []
+        self._paths_by_key: Dict[str, str] = {}
+        self._keys_by_path: Dict[str, str] = {}
+        self._unindexed: List[str] = []
+        self.add(paths_or_glob)
+
+    def add(self, paths_or_glob: 'PathsOrGlob') -> 'List[str]':
+        """
+        Add saved documents to the store. Return added paths.
+        """
+        paths = [p for p in expand_paths(paths_or_glob) if p not in self._keys_by_path]
+        for path in paths:
+            self.paths.append(path)
+            key = url_for_filename(os.path.basename(path))
+            if key is None:
+                self._keys_by_path[path] = ''
+                self._unindexed.append(path)
+            else:
+                self._index(path, key)
+        return paths
+
+    def _index(self, path: str, key: str) -> None:
+        self._keys_by_path[path] = key
+        self._paths_by_key.setdefault(key, path)
+
+    def _read(self, path: str) -> 'Optional[bytes]':
+        with open(path, 'rb') as f:
+            content = f.read()
+        if not content:
+            logger.warning('Empty file %s in offline store', path)
+            return None
+        return content
+
+    def load(self, path: str) -> 'Optional[dict]':
+        """
+        Decode saved document of path. Each call returns a new dictionary.
+        """
+        content = self._read(path)
+        try:
+            json_data = None if content is None else json.loads(content)
+        except ValueError as exc:
+            logger.warning('Could not decode %s in offline store: %s', path, exc)
+            json_data = None
+        if not isinstance(json_data, dict):
+            # Empty or corrupt files can not be indexed by links.self
+            if path in self._unindexed:
+                self._unindexed.remove(path)
+            return None
+        if not self._keys_by_path.get(path):
+            self._index_document(path, json_data)
+        return json_data
+
+    def _index_document(self, path: str, json_data: dict) -> None:
+        link = (json_data.get('links') or {}).get('self')
+        data = json_data.get('data')
+        if not link and isinstance(data, dict):
+            # Single resource document: use self link of the resource
+            link = (data.get('links') or {}).get('self')
+        if isinstance(link, dict):
+            link = link.get('href')
+        if link:
+            self._index(path, url_key(link))
+        if path in self._unindexed:
+            self._unindexed.remove(path)
+
+    def url(self, path: str) -> str:
+        """
+        Url of saved document of path: url of its file name, links.self if the
+        document has been read, or file url.
+        """
+        return self._keys_by_path.get(path) or f'file://{os.path.abspath(path)}'
+
+    def find(self, url: str) -> 'Optional[str]':
+        """
+        Return path of saved document of url, or None if it is not in the store.
+        """
+        key = url_key(url)
+        path = self._paths_by_key.get(key)
+        while path is None and self._unindexed:
+            self.load(self._unindexed[0])
+            path = self._paths_by_key.get(key)
+        return path
+
+    def get(self, url: str) -> 'Optional[dict]':
+        """
+        Return decoded saved document of url, or None if it is not in the store.
+        """
+        path = self.find(url)
+        return None if path is None else self.load(path)
+
+    def documents(self) -> 'Iterator[Tuple[str, dict]]':
+        """
+        Decode saved documents one at a time, in order of paths. Yields
+        (url, json data) tuples.
+        """
+        for path in list(self.paths):
+            json_data = self.load(path)
+            if json_data is not None:
+                yield self.url(path), json_data
+
+    @staticmethod
+    def save(directory: str, url: str, json_data: dict) -> str:
+        """
+        Save document of url to directory with a file name that the store finds
+        without reading the file. Return path of the file.
+        """
+        path = os.path.join(directory, filename_for_url(url))
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(json_data, f)
+        return path
+
+    def close(self) -> None:
+        """
+        Nothing to release: files are closed as soon as they have been read.
+        Kept for use as a context manager.
+        """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return len(self.paths)
@@ -0,0 +1,232 @@
+"""
+JSON API Python client 
+https://github.com/qvantel/jsonapi-client
+
+(see JSON API specification in http://jsonapi.org/)
+
+Copyright (c) 2017, Qvantel
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the Qvantel nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL QVANTEL BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import cProfile
+import logging
+import pstats
+import threading
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from .hooks import Event
+
+if TYPE_CHECKING:
+    from .session import Session
+
+logger = logging.getLogger(__name__)
+
+#: Upper bounds (seconds) of histogram buckets
+BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1., 2., 5., 10.,
+           float('inf'))
+
+
+class Histogram:
+    """
+    Latency histogram with fixed buckets.
+    """
+    def __init__(self) -> None:
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.total = 0.
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def add(self, value: float) -> None:
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        """
+        Return upper bound of the bucket that contains percentile (0-100),
+        capped to the maximum value seen.
+        """
+        if not self.count:
+            return None
+        rank = percentile / 100 * self.count
+        seen = 0
+        for bound, bucket_count in zip(BUCKETS, self.counts):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                return min(bound, self.max)
+        return self.max
+
+    def as_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'total': self.total,
+            'mean': self.total / self.count if self.count else None,
+            'min': self.min,
+            'max': self.max,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'buckets': {str(bound): n for bound, n in zip(BUCKETS, self.counts) if n},
+        }
+
+
+class Profiler:
+    """
+    Collects timings of a Session using its hooks: request latencies per url
+    template and per resource type, parse and validation time per document
+    (by url template), commit time per resource type and number of lazy
+    relationship fetches. Optionally, parsing is profiled with cProfile.
+
+    :param session: Session to profile
+    :param cprofile: Profile Document parsing with cProfile
+    """
+    def __init__(self, session: 'Session', cprofile: bool=False) -> None:
+        self.session = session
+        self.requests_by_url_template: Dict[str, Histogram] = defaultdict(Histogram)
+        self.requests_by_resource_type: Dict[str, Histogram] = defaultdict(Histogram)
+        self.request_errors: Counter = Counter()
+        self.parse: Dict[str, Histogram] = defaultdict(Histogram)
+        self.validate: Dict[str, Histogram] = defaultdict(Histogram)
+        self.resources_parsed: Counter = Counter()
+        self.commits: Dict[str, Histogram] = defaultdict(Histogram)
+        self.relationship_fetches: Counter = Counter()
+        self.cprofile = cProfile.Profile() if cprofile else None
+        self._lock = threading.Lock()
+        # Validation time of the document being parsed in this thread
+        self._validating = threading.local()
+        self._callbacks = {
+            Event.REQUEST_END: self._request_end,
+            Event.DOCUMENT_PARSED: self._document_parsed,
+            Event.VALIDATE: self._validate,
+            Event.COMMIT: self._commit,
+            Event.RELATIONSHIP_FETCH: self._relationship_fetch,
+        }
+
+    def attach(self) -> 'Profiler':
+        for event, callback in self._callbacks.items():
+            self.session.on(event, callback)
+        return self
+
+    def detach(self) -> None:
+        for event, callback in self._callbacks.items():
+            self.session.off(event, callback)
+
+    @contextmanager
+    def profile_parse(self):
+        """
+        Profile parsing with cProfile, if enabled.
+        """
+        if self.cprofile is None:
+            yield
+            return
+        try:
+            self.cprofile.enable()
+        except ValueError:
+            # Another profiler is active (e.g. parsing in another thread)
+            yield
+            return
+        try:
+            yield
+        finally:
+            self.cprofile.disable()
+
+    def _request_end(self, event, method, url, url_template, status, latency,
+                     exception, **info):
+        resource_type = self.session.endpoint_for_url(url)[1]
+        with self._lock:
+            self.requests_by_url_template[f'{method.upper()} {url_template}'].add(latency)
+            self.requests_by_resource_type[resource_type].add(latency)
+            if exception is not None or status >= 400:
+                self.request_errors[url_template] += 1
+
+    def _validate(self, event, duration, **info):
+        self._validating.duration = getattr(self._validating, 'duration', 0.) + duration
+
+    def _document_parsed(self, event, url, duration, resources, **info):
+        url_template = self.session.url_template(url)
+        validating = getattr(self._validating, 'duration', 0.)
+        self._validating.duration = 0.
+        with self._lock:
+            self.parse[url_template].add(duration)
+            self.validate[url_template].add(validating)
+            self.resources_parsed[url_template] += resources
+
+    def _commit(self, event, type, method, duration, **info):
+        # Validation before commit is part of commit time
+        self._validating.duration = 0.
+        with self._lock:
+            self.commits[f'{method.upper()} {type}'].add(duration)
+
+    def _relationship_fetch(self, event, name, type, **info):
+        with self._lock:
+            self.relationship_fetches[f'{type}.{name}'] += 1
+
+    def cprofile_stats(self, limit: int=20) -> List[dict]:
+        """
+        Return functions that took most cumulative time during parsing.
+        """
+        if self.cprofile is None:
+            return []
+        try:
+            stats = pstats.Stats(self.cprofile).stats
+        except TypeError:
+            # Nothing has been profiled yet
+            return []
+        rows = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+        return [{'function': f'{filename}:{line}({function})',
+                 'calls': calls,
+                 'total_time': total_time,
+                 'cumulative_time': cumulative_time}
+                for (filename, line, function), (_, calls, total_time, cumulative_time, _)
+                in rows]
+
+    def report(self) -> dict:
+        """
+        Return collected data as a dictionary.
+        """
+        with self._lock:
+            return {
+                'requests': {
+                    'by_url_template': {key: h.as_dict() for key, h
+                                        in self.requests_by_url_template.items()},
+                    'by_resource_type': {key: h.as_dict() for key, h
+                                         in self.requests_by_resource_type.items()},
+                    'errors': dict(self.request_errors),
+                },
+                'documents': {
+                    key: {'parse': h.as_dict(),
+                          'validate': self.validate[key].as_dict(),
+                          'resources': self.resources_parsed[key]}
+                    for key, h in self.parse.items()},
+                'commits': {key: h.as_dict() for key, h in self.commits.items()},
+                'relationship_fetches': dict(self.relationship_fetches),
+                'cprofile': self.cprofile_stats(),
+            }
@@ -0,0 +1,160 @@
+"""
+JSON API Python client 
+https://github.com/qvantel/jsonapi-client
+
+(see JSON API specification in http://jsonapi.org/)
+
+Copyright (c) 2017, Qvantel
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the Qvantel nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL QVANTEL BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Tuple, Union
+from urllib.parse import urlparse
+
+from .common import HttpMethod
+
+logger = logging.getLogger(__name__)
+
+Rate = Union[float, Tuple[float, float]]
+
+
+class TokenBucket:
+    """
+    Token bucket that allows rate requests per second on average and bursts of
+    at most burst requests.
+
+    Tokens are reserved in advance, so that the same bucket can be shared by
+    threads and coroutines: reserve() takes a token and tells how long the caller
+    needs to wait before using it.
+    """
+    def __init__(self, rate: float, burst: float=None) -> None:
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, 1.)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Take one token and return time in seconds to wait before it is available.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst,
+                               self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return -self._tokens / self.rate if self._tokens < 0 else 0.
+
+
+class RateLimiter:
+    """
+    Client side rate limiter for requests made by Session
+    (Session(rate_limit=RateLimiter(...))). Sync requests block and async requests
+    await until the request fits into all budgets that apply to it.
+
+    Each budget is given either as requests per second, or as a tuple
+    (requests per second, burst size). Budgets that are None are not limited.
+
+    :param rate: Budget for all requests.
+    :param read_rate: Budget for reads (GET).
+    :param write_rate: Budget for writes (POST, PATCH, DELETE).
+    :param host_rate: Budget for all requests to a single host.
+    :param host_read_rate: Budget for reads from a single host.
+    :param host_write_rate: Budget for writes to a single host.
+    """
+    def __init__(self, rate: Rate=None,
+                 read_rate: Rate=None,
+                 write_rate: Rate=None,
+                 host_rate: Rate=None,
+                 host_read_rate: Rate=None,
+                 host_write_rate: Rate=None) -> None:
+        self._global = {None: self._make_bucket(rate),
+                        True: self._make_bucket(read_rate),
+                        False: self._make_bucket(write_rate)}
+        self._host_rates = {None: host_rate, True: host_read_rate, False: host_write_rate}
+        self._host_buckets: Dict[Tuple[str, Optional[bool]], TokenBucket] = {}
+        self._lock = threading.Lock()
+        #: Total time in seconds that requests have been delayed
+        self.total_wait = 0.
+        #: Number of requests that have been delayed
+        self.delayed = 0
+
+    @staticmethod
+    def _make_bucket(rate: Rate) -> Optional[TokenBucket]:
+        if rate is None:
+            return None
+        if isinstance(rate, tuple):
+            return TokenBucket(*rate)
+        return TokenBucket(rate)
+
+    def _buckets(self, http_method: str, url: str) -> List[TokenBucket]:
+        is_read = http_method.lower() == HttpMethod.GET
+        buckets = [self._global[None], self._global[is_read]]
+        host = urlparse(url).netloc
+        for kind in (None, is_read):
+            if self._host_rates[kind] is None:
+                continue
+            with self._lock:
+                bucket = self._host_buckets.get((host, kind))
+                if bucket is None:
+                    bucket = self._host_buckets[(host, kind)] = \
+                        self._make_bucket(self._host_rates[kind])
+            buckets.append(bucket)
+        return [b for b in buckets if b is not None]
+
+    def reserve(self, http_method: str, url: str) -> float:
+        """
+        Reserve capacity for one request and return time in seconds to wait
+        before sending it.
+        """
+        wait = max((b.reserve() for b in self._buckets(http_method, url)), default=0.)
+        if wait > 0:
+            with self._lock:
+                self.total_wait += wait
+                self.delayed += 1
+            logger.debug('Rate limit reached, delaying %s %s by %.3f s',
+                         http_method.upper(), url, wait)
+        return wait
+
+    def acquire(self, http_method: str, url: str) -> None:
+        """
+        Block until request can be sent.
+        """
+        wait = self.reserve(http_method, url)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, http_method: str, url: str) -> None:
+        """
+        Wait until request can be sent. Async version.
+        """
+        wait = self.reserve(http_method, url)
+        if wait > 0:
+            await asyncio.sleep(wait)
@@ -32,9 +32,13 @@ SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 import collections
 import logging
-from typing import List, Union, Iterable, Dict, Tuple, Awaitable, TYPE_CHECKING
+import time
+from contextlib import contextmanager, nullcontext
+from typing import (List, Union, Iterable, Dict, Tuple, Awaitable, Optional,
+                    TYPE_CHECKING)
 
 from .common import AbstractJsonObject, RelationType, ResourceTuple
+from .hooks import Event
 from .objects import (Meta, Links, ResourceIdentifier, RESOURCE_TYPES)
 from .resourceobject import ResourceObject
 
@@ -46,6 +50,7 @@ if TYPE_CHECKING:
     from .filter import Modifier
     from .document import Document
     from .session import Session
+    from .resourceobject import RelationshipDict
 
 
 class AbstractRelationship(AbstractJsonObject):
@@ -61,12 +66,18 @@ class AbstractRelationship(AbstractJsonObject):
                  session: 'Session',
                  data: dict,
                  resource_types: List[str]=None,
-                 relation_type: str='') -> None:
+                 relation_type: str='',
+                 name: str='',
+                 container: 'RelationshipDict'=None) -> None:
         """
         :param resource_types: List of allowed resource types
         :param relation_type: Relation type, either 'to-one' or 'to-many',
             or not specified (empty string).
+        :param name: Name of this relationship
+        :param container: RelationshipDict of the resource that has this relationship
         """
+        self.name = name
+        self._container = container
         self._resources: Dict[Tuple[str, str], ResourceObject] = None
         self._invalid = False
         self._is_dirty: bool = False
@@ -113,6 +124,8 @@ class AbstractRelationship(AbstractJsonObject):
         Mark this relationship as modified/dirty.
         """
         self._is_dirty = True
+        if self._container is not None:
+            self._container._resource._keep_pending()
 
     async def _fetch_async(self) -> 'List[ResourceObject]':
         raise NotImplementedError
@@ -129,10 +142,52 @@ class AbstractRelationship(AbstractJsonObject):
         .resources is accessed.
         """
         if self.session.enable_async:
-            return self._fetch_async()
+            return self._traced_fetch_async()
         else:
+            return self._traced_fetch_sync()
+
+    @property
+    def resource_identifiers(self) -> 'Optional[List[ResourceIdentifier]]':
+        """
+        Identifiers of related resources, if they are known without fetching.
+        None if related resources can be found only by fetching related link.
+        """
+        return None
+
+    @property
+    def parent(self) -> 'Optional[ResourceObject]':
+        """
+        ResourceObject that has this relationship.
+        """
+        return self._container._resource if self._container is not None else None
+
+    @contextmanager
+    def _fetch_span(self):
+        with self.session.tracer.span('jsonapi.relationship.fetch',
+                                      {'jsonapi.relationship': self.name,
+                                       'jsonapi.relation_type': self._relation_type,
+                                       'jsonapi.types': self._resource_types}):
+            detector = self.session.n_plus_one
+            with detector.track(self) if detector is not None else nullcontext():
+                hooks = self.session.hooks
+                if not hooks:
+                    yield
+                    return
+                start = time.perf_counter()
+                yield
+            parent = self.parent
+            hooks.emit(Event.RELATIONSHIP_FETCH, name=self.name,
+                       type=parent and parent.type, id=parent and parent.id,
+                       duration=time.perf_counter() - start)
+
+    def _traced_fetch_sync(self) -> 'List[ResourceObject]':
+        with self._fetch_span():
             return self._fetch_sync()
 
+    async def _traced_fetch_async(self) -> 'List[ResourceObject]':
+        with self._fetch_span():
+            return await self._fetch_async()
+
     def _handle_data(self, data):
         self.links = Links(self.session, data.get('links', {}))
         self.meta = Meta(self.session, data.get('meta', {}))
@@ -148,7 +203,7 @@ class AbstractRelationship(AbstractJsonObject):
         In async mode, you need to first await .fetch()
         """
         return ((self._resources is not None and list(self._resources.values()))
-                or self._fetch_sync())
+                or self._traced_fetch_sync())
 
     @property
     def resource(self) -> 'ResourceObject':
@@ -243,15 +298,21 @@ class SingleRelationship(AbstractRelationship):
         self.session.assert_sync()
         res_id = self._resource_identifier
         if res_id is None:
-            self._resources = {None: None}
+            resources = {None: None}
         else:
             res = self.session.fetch_resource_by_resource_identifier(res_id)
-            self._resources = {(res.type, res.id): res}
-        return list(self._resources.values())
+            resources = {(res.type, res.id): res}
+        self._resources = resources
+        return list(resources.values())
 
     def __bool__(self):
         return bool(self._resource_identifier)
 
+    @property
+    def resource_identifiers(self) -> 'List[ResourceIdentifier]':
+        res_id = self._resource_identifier
+        return [] if res_id is None else [res_id]
+
     def __str__(self):
         return str(self._resource_identifier)
 
@@ -298,6 +359,10 @@ class MultiRelationship(AbstractRelationship):
     def is_single(self) -> bool:
         return False
 
+    @property
+    def resource_identifiers(self) -> 'List[ResourceIdentifier]':
+        return list(self._resource_identifiers)
+
     async def _fetch_async(self) -> 'List[ResourceObject]':
         self.session.assert_async()
         self._resources = {}
@@ -308,11 +373,14 @@ class MultiRelationship(AbstractRelationship):
 
     def _fetch_sync(self) -> 'List[ResourceObject]':
         self.session.assert_sync()
-        self._resources = {}
+        # Build the result before publishing it, so that other threads never
+        # see partially fetched relationship
+        resources = {}
         for res_id in self._resource_identifiers:
             res = self.session.fetch_resource_by_resource_identifier(res_id)
-            self._resources[(res.type, res.id)] = res
-        return list(self._resources.values())
+            resources[(res.type, res.id)] = res
+        self._resources = resources
+        return list(resources.values())
 
     def __str__(self):
         return str(self._resource_identifiers)
@@ -375,7 +443,7 @@ class LinkRelationship(AbstractRelationship):
     def document(self) -> 'Document':
         doc = getattr(self, '_document', None)
         if doc is None:
-            self._fetch_sync()
+            self._traced_fetch_sync()
         return self._document
 
     @property
@@ -396,11 +464,13 @@ class LinkRelationship(AbstractRelationship):
 
     def _fetch_sync(self) -> 'List[ResourceObject]':
         self.session.assert_sync()
-        self._document = self.session.fetch_document_by_url(self.links.related.url)
+        document = self.session.fetch_document_by_url(self.links.related.url)
+        self._document = document
         if self.session.use_relationship_iterator:
-            return self._document.iterator()
-        self._resources = {(r.type, r.id): r for r in self._document.resources}
-        return list(self._resources.values())
+            return document.iterator()
+        resources = {(r.type, r.id): r for r in document.resources}
+        self._resources = resources
+        return list(resources.values())
 
     def mark_clean(self):
         self._is_dirty = False
@@ -444,4 +514,7 @@ class MetaRelationship(AbstractRelationship):
     Handle relationship manually through meta object. We don't know what to do
     about them as they are custom data.
     """
+    @property
+    def resource_identifiers(self) -> 'List[ResourceIdentifier]':
+        return []
 
@@ -30,14 +30,18 @@ ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
 SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 """
 
+import asyncio
 import logging
+import time
+from contextlib import contextmanager
 from itertools import chain
-from typing import Set, Optional, Awaitable, Union, Iterable, TYPE_CHECKING
+from typing import Set, Optional, Awaitable, Union, Iterable, List, TYPE_CHECKING
 
 from .common import (jsonify_attribute_name, AbstractJsonObject,
                      dejsonify_attribute_names, HttpMethod, HttpStatus, AttributeProxy,
                      cached_property, RelationType)
 from .exceptions import ValidationError, DocumentInvalid
+from .hooks import Event
 
 NOT_FOUND = object()
 
@@ -45,6 +49,7 @@ logger = logging.getLogger(__name__)
 
 if TYPE_CHECKING:
     from .session import Schema, Session
+    from .document import Document
 
 
 class AttributeDict(dict):
@@ -83,10 +88,14 @@ class AttributeDict(dict):
             self._full_name = f'{parent._full_name}.{name}'
 
         specification = self._schema.find_spec(self._resource.type, self._full_name)
+        # Fields that were not fetched (sparse fieldset) are left out
+        sparse_fields = resource._sparse_fields if parent is None else None
 
         # If there's schema for this object, we will use it to construct object.
         if specification:
             for field_name, field_spec in specification['properties'].items():
+                if sparse_fields is not None and field_name not in sparse_fields:
+                    continue
                 if field_spec.get('type') == 'object':
                     _data = data.pop(field_name, {})
                     self[field_name] = AttributeDict(data=_data,
@@ -119,7 +128,7 @@ class AttributeDict(dict):
         self[name] = AttributeDict(data={}, name=name, parent=self, resource=self._resource)
 
     def _check_invalid(self):
-        if self._invalid:
+        if self._invalid or self._resource.is_invalid:
             raise DocumentInvalid('Resource has been invalidated.')
 
     def __getattr__(self, name):
@@ -149,6 +158,8 @@ class AttributeDict(dict):
         self._dirty_attributes.add(name)
         if self._parent:
             self._parent.mark_dirty(self._name)
+        elif self._resource._generation is not None:
+            self._resource._keep_pending()
 
     def mark_clean(self):
         """
@@ -238,17 +249,20 @@ class RelationshipDict(dict):
         self.session = resource.session
         self._schema = schema = resource.session.schema
         model_schema = schema.schema_for_model(resource.type)
+        sparse_fields = resource._sparse_fields
         if model_schema:
             for rel_name, rel_value in model_schema['properties'].items():
                 rel_type = rel_value.get('relation')
                 if not rel_type:
                     continue
+                if sparse_fields is not None and rel_name not in sparse_fields:
+                    continue
 
                 resource_types = rel_value['resource']
-                self[rel_name] = self._make_relationship(data.pop(rel_name, {}), rel_type,
-                                                         resource_types)
+                self[rel_name] = self._make_relationship(rel_name, data.pop(rel_name, {}),
+                                                         rel_type, resource_types)
         else:
-            relationships = {key: self._make_relationship(value)
+            relationships = {key: self._make_relationship(key, value)
                              for key, value in data.items()}
             self.update(relationships)
 
@@ -298,10 +312,10 @@ class RelationshipDict(dict):
         else:
             raise ValidationError('Must have either links, data or meta in relationship')
 
-    def _make_relationship(self, data, relation_type=None, resource_types=None):
+    def _make_relationship(self, name, data, relation_type=None, resource_types=None):
         cls = self._determine_class(data, relation_type)
         return cls(self.session, data, resource_types=resource_types,
-                   relation_type=relation_type)
+                   relation_type=relation_type, name=name, container=self)
 
     def mark_clean(self):
         """
@@ -333,11 +347,33 @@ class ResourceObject(AbstractJsonObject):
     #: Attributes (that are not starting with _) that we want to ignore in __setattr__
     __attributes = ['id', 'type', 'links', 'meta', 'commit_meta']
 
-    def __init__(self, session: 'Session', data: Union[dict, list]) -> None:
+    def __init__(self, session: 'Session', data: Union[dict, list],
+                 fields: 'Set[str]'=None) -> None:
+        """
+        :param fields: Names of fields that were fetched if resource was fetched
+            with sparse fieldset. None if all fields were fetched.
+        """
         self._delete = False
         self._commit_metadata = {}
+        self._document_ref = None
+        self._sparse_fields = fields
         super().__init__(session, data)
 
+    @property
+    def is_partial(self) -> bool:
+        """
+        True if this resource was fetched with sparse fieldset (SparseFields) and
+        it has not been completed yet.
+        """
+        return self._sparse_fields is not None
+
+    @property
+    def document(self) -> 'Optional[Document]':
+        """
+        Document that this resource was read from, if it still exists.
+        """
+        return self._document_ref() if self._document_ref is not None else None
+
     @cached_property
     def fields(self):
         """
@@ -345,6 +381,7 @@ class ResourceObject(AbstractJsonObject):
         """
         class Proxy(AttributeProxy):
             def __getitem__(proxy, item):
+                self._load_field(item)
                 rv = self._attributes.get(item, NOT_FOUND)
                 if rv is NOT_FOUND:
                     return self.relationship_resource[item]
@@ -368,7 +405,12 @@ class ResourceObject(AbstractJsonObject):
         """
         Proxy to all attributes (not relationships)
         """
-        return AttributeProxy(self._attributes)
+        class Proxy(AttributeProxy):
+            def __getitem__(proxy, item):
+                self._load_field(item)
+                return self._attributes[item]
+
+        return Proxy()
 
     @cached_property
     def relationships(self):
@@ -376,11 +418,15 @@ class ResourceObject(AbstractJsonObject):
         Proxy to relationship objects
         """
         class Proxy(AttributeProxy):
+            def __getitem__(proxy, item):
+                self._load_field(item)
+                return self._relationships[item]
+
             def __setitem__(proxy, key, value):
                 rel = self._relationships[key]
                 rel.set(value)
 
-        return Proxy(self._relationships)
+        return Proxy()
 
     @cached_property
     def relationship_resource(self):
@@ -479,7 +525,14 @@ class ResourceObject(AbstractJsonObject):
         Validate our attributes against schema.
         """
         # TODO: what about relationships? Shouldn't we somehow validate those too?
-        self.session.schema.validate(self.type, self._attributes)
+        hooks = self.session.hooks
+        partial = self.is_partial
+        if not hooks:
+            return self.session.schema.validate(self.type, self._attributes, partial)
+        start = time.perf_counter()
+        self.session.schema.validate(self.type, self._attributes, partial)
+        hooks.emit(Event.VALIDATE, type=self.type, id=self.id,
+                   duration=time.perf_counter() - start)
 
     def _commit_data(self, meta: dict = None, full: bool=False) -> dict:
         """
@@ -524,6 +577,7 @@ class ResourceObject(AbstractJsonObject):
         return url
 
     def _post_commit(self, status, result, location):
+        self.session.uncache_shared(self)
         if status in HttpStatus.HAS_RESOURCES:
             self._update_resource(result, location)
 
@@ -534,26 +588,42 @@ class ResourceObject(AbstractJsonObject):
         if status == HttpStatus.ACCEPTED_202:
             return self.session.read(result, location, no_cache=True).resource
 
+    @contextmanager
+    def _commit_span(self):
+        http_method = HttpMethod.DELETE if self._delete else self._http_method
+        with self.session.tracer.span('jsonapi.resource.commit',
+                                      {'jsonapi.type': self.type, 'jsonapi.id': self.id}):
+            hooks = self.session.hooks
+            if not hooks:
+                yield
+                return
+            start = time.perf_counter()
+            yield
+            hooks.emit(Event.COMMIT, type=self.type, id=self.id, method=http_method,
+                       duration=time.perf_counter() - start)
+
     async def _commit_async(self, url: str= '', meta=None) -> None:
         self.session.assert_async()
-        if self._delete:
-            return await self._perform_delete_async(url)
+        with self._commit_span():
+            if self._delete:
+                return await self._perform_delete_async(url)
 
-        url = self._pre_commit(url)
-        status, result, location = await self.session.http_request_async(
-                                                self._http_method, url,
-                                                self._commit_data(meta))
-        return self._post_commit(status, result, location)
+            url = self._pre_commit(url)
+            status, result, location = await self.session.http_request_async(
+                                                    self._http_method, url,
+                                                    self._commit_data(meta))
+            return self._post_commit(status, result, location)
 
     def _commit_sync(self, url: str= '', meta: dict=None) -> 'None':
         self.session.assert_sync()
-        if self._delete:
-            return self._perform_delete(url)
+        with self._commit_span():
+            if self._delete:
+                return self._perform_delete(url)
 
-        url = self._pre_commit(url)
-        status, result, location = self.session.http_request(self._http_method, url,
-                                                             self._commit_data(meta))
-        return self._post_commit(status, result, location)
+            url = self._pre_commit(url)
+            status, result, location = self.session.http_request(self._http_method, url,
+                                                                 self._commit_data(meta))
+            return self._post_commit(status, result, location)
 
     def commit(self, custom_url: str = '', meta: dict = None) \
             -> 'Union[None, ResourceObject, Awaitable[Optional[ResourceObject]]':
@@ -612,11 +682,107 @@ class ResourceObject(AbstractJsonObject):
         else:
             return self._refresh_sync()
 
+    def _load_field(self, name: str) -> None:
+        """
+        If this resource is partially loaded and field name was not fetched,
+        complete this resource.
+        """
+        if (self._sparse_fields is None or name in self._attributes
+                or name in self._relationships):
+            return
+        self.session.assert_sync(f'Field {name} of partially loaded resource {self} '
+                                 f'was not fetched, await .complete() first')
+        self._complete_sync()
+
+    def _partial_batch(self) -> 'List[ResourceObject]':
+        """
+        This resource and other partially loaded resources of the same type in
+        the same document, that are completed together.
+        """
+        batch = {self.id: self}
+        doc = self.document
+        if doc is not None:
+            for res in chain(doc.resources, doc.included):
+                if res.type == self.type and res.is_partial:
+                    batch.setdefault(res.id, res)
+        return list(batch.values())
+
+    def _complete_from(self, full: 'Optional[ResourceObject]') -> None:
+        """
+        Add fields that were not fetched from full version of this resource.
+        Fields that were fetched (and possibly modified) are kept.
+        """
+        self._sparse_fields = None
+        if full is None:
+            logger.warning('Could not complete partially loaded resource %s', self)
+            return
+        for key, value in full._attributes.items():
+            if key not in self._attributes:
+                if isinstance(value, AttributeDict):
+                    value._parent = self._attributes
+                    value.change_resource(self)
+                dict.__setitem__(self._attributes, key, value)
+        for key, value in full._relationships.items():
+            if key not in self._relationships:
+                value._container = self._relationships
+                dict.__setitem__(self._relationships, key, value)
+        self.session.add_resources(self)
+
+    def _complete_batches(self) -> 'Iterable[List[ResourceObject]]':
+        size = self.session.prefetch_batch_size
+        batch = [res for res in self._partial_batch() if res.is_partial]
+        for i in range(0, len(batch), size):
+            yield batch[i:i + size]
+
+    def _complete_sync(self) -> None:
+        from .filter import Filter
+        for batch in self._complete_batches():
+            ids = ','.join(res.id for res in batch)
+            full = {res.id: res for res in self.session._iterate_sync(
+                                                    self.type, Filter(id=ids))}
+            for res in batch:
+                res._complete_from(full.get(res.id))
+
+    async def _complete_async(self) -> None:
+        from .filter import Filter
+
+        async def complete_batch(batch):
+            ids = ','.join(res.id for res in batch)
+            full = {res.id: res async for res in self.session._iterate_async(
+                                                    self.type, Filter(id=ids))}
+            for res in batch:
+                res._complete_from(full.get(res.id))
+
+        await asyncio.gather(*[complete_batch(batch)
+                               for batch in self._complete_batches()])
+
+    def complete(self) -> Optional[Awaitable]:
+        """
+        Fetch fields that were not fetched, if this resource was fetched with
+        sparse fieldset. Other partially loaded resources of the same type in the
+        same document are completed in the same (batched) requests.
+
+        In sync mode this is done automatically when a missing field is accessed.
+        If in async mode, this needs to be awaited.
+        """
+        if self.session.enable_async:
+            return self._complete_async()
+        else:
+            return self._complete_sync()
+
     def delete(self):
         """
         Mark resource to be deleted. Resource will be deleted upon commit.
         """
         self._delete = True
+        self._keep_pending()
+
+    def _keep_pending(self) -> None:
+        """
+        Tell Session that this resource has changes waiting for commit.
+        """
+        if self._generation is not None:
+            self.session.keep_pending(self)
 
     def _perform_delete(self, url=''):
         url = url or self.url
@@ -634,6 +800,7 @@ class ResourceObject(AbstractJsonObject):
         """
         self._attributes.mark_clean()
         self._relationships.mark_clean()
+        self.session.release_pending(self)
 
     def mark_invalid(self):
         """
@@ -0,0 +1,141 @@
+"""
+JSON API Python client 
+https://github.com/qvantel/jsonapi-client
+
+(see JSON API specification in http://jsonapi.org/)
+
+Copyright (c) 2017, Qvantel
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the Qvantel nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL QVANTEL BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+import collections
+import logging
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Iterable, Optional
+
+from .common import HttpMethod
+
+logger = logging.getLogger(__name__)
+
+
+class RetryPolicy:
+    """
+    Retry policy for requests made by Session (Session(retry=RetryPolicy(...))).
+
+    Delay before n:th retry is backoff_factor * 2 ** (n - 1) seconds (at most
+    max_backoff), of which jitter fraction is randomized. If server sends
+    Retry-After header, it is respected instead.
+
+    :param attempts: Maximum number of attempts, including the first one.
+    :param backoff_factor: Delay before the first retry in seconds.
+    :param max_backoff: Maximum delay between attempts in seconds.
+    :param jitter: Fraction (0..1) of the delay that is randomized.
+    :param statuses: Response status codes that are retried.
+    :param methods: HTTP methods that are retried. POST is not idempotent and
+        is retried only if retry_post is set.
+    :param retry_post: Allow retrying POST requests.
+    :param respect_retry_after: Use delay given in Retry-After response header.
+    :param max_retry_after: Maximum delay accepted from Retry-After header.
+    """
+    def __init__(self, attempts: int=3,
+                 backoff_factor: float=0.5,
+                 max_backoff: float=30.,
+                 jitter: float=1.,
+                 statuses: Iterable[int]=(429, 502, 503, 504),
+                 methods: Iterable[str]=(HttpMethod.GET, HttpMethod.PATCH,
+                                         HttpMethod.DELETE),
+                 retry_post: bool=False,
+                 respect_retry_after: bool=True,
+                 max_retry_after: float=120.) -> None:
+        self.attempts = attempts
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.statuses = frozenset(statuses)
+        self.methods = frozenset(m.lower() for m in methods)
+        if retry_post:
+            self.methods |= {HttpMethod.POST}
+        self.respect_retry_after = respect_retry_after
+        self.max_retry_after = max_retry_after
+
+        self._lock = threading.Lock()
+        #: Total number of retries made
+        self.retries = 0
+        #: Number of retries by reason (status code or exception class name)
+        self.retries_by_reason: 'collections.Counter[str]' = collections.Counter()
+        #: Number of requests that failed even after all attempts
+        self.exhausted = 0
+
+    def is_retryable(self, http_method: str, status: int=None) -> bool:
+        """
+        Can request with http_method that resulted in status (or a connection
+        error, if status is None) be retried.
+        """
+        if http_method.lower() not in self.methods:
+            return False
+        return status is None or status in self.statuses
+
+    def should_retry(self, http_method: str, attempt: int, status: int=None,
+                     exception: Exception=None) -> bool:
+        """
+        Decide whether to retry after attempt (starting from 1) failed and update
+        counters accordingly.
+        """
+        if not self.is_retryable(http_method, status):
+            return False
+        with self._lock:
+            if attempt >= self.attempts:
+                self.exhausted += 1
+                return False
+            self.retries += 1
+            self.retries_by_reason[str(status) if status else type(exception).__name__] += 1
+        return True
+
+    def delay(self, attempt: int, retry_after: str=None) -> float:
+        """
+        Return delay in seconds before next attempt.
+        """
+        if retry_after and self.respect_retry_after:
+            delay = self._parse_retry_after(retry_after)
+            if delay is not None:
+                return min(delay, self.max_retry_after)
+        delay = min(self.backoff_factor * 2 ** (attempt - 1), self.max_backoff)
+        return delay * (1 - self.jitter * random.random())
+
+    @staticmethod
+    def _parse_retry_after(value: str) -> Optional[float]:
+        try:
+            return max(float(value), 0.)
+        except ValueError:
+            pass
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            logger.warning('Invalid Retry-After header: %s', value)
+            return None
+        return max(retry_at.timestamp() - time.time(), 0.)
@@ -30,19 +30,35 @@ ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
 SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 """
 
+import asyncio
 import collections
+import contextvars
 import json
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
 from itertools import chain
-from typing import (TYPE_CHECKING, Set, Optional, Tuple, Dict, Union, Iterable,
-                    AsyncIterable, Awaitable, AsyncIterator, Iterator, List)
-from urllib.parse import ParseResult, urlparse
+from typing import (TYPE_CHECKING, Callable, Set, Optional, Tuple, Dict, Union,
+                    Iterable, AsyncIterable, Awaitable, AsyncIterator, Iterator, List,
+                    Sequence)
+from urllib.parse import ParseResult, urlparse, parse_qsl
 
 import jsonschema
 
 from .common import jsonify_attribute_name, error_from_response, \
-    HttpStatus, HttpMethod
-from .exceptions import DocumentError, AsyncError
+    HttpStatus, HttpMethod, NormalizedUrlDict, NormalizedUrlWeakValueCache, \
+    WeakValueCache, execute_async
+from .exceptions import DocumentError, AsyncError, CommitError, DeadlineExceeded
+from . import deadline
+from .compression import accept_encoding, compress, TransferStats
+from .hooks import Event, Hooks
+from .tracing import Tracer
+from .profiling import Profiler
+from .nplusone import count_request
+from .columns import to_columns
+from .export import open_writer
 
 if TYPE_CHECKING:
     from asyncio import AbstractEventLoop
@@ -50,7 +66,19 @@ if TYPE_CHECKING:
     from .document import Document
     from .resourceobject import ResourceObject
     from .relationships import ResourceTuple
-    from .filter import Modifier
+    from .filter import Modifier, Page
+    from .cache import SharedCache
+    from .retry import RetryPolicy
+    from .ratelimit import RateLimiter
+    from .circuitbreaker import CircuitBreaker
+    from .nplusone import NPlusOneDetector
+    from .relationships import AbstractRelationship
+    from .columns import Column
+    from .export import Output
+    from .offline import OfflineStore, PathsOrGlob
+    from .snapshot import Snapshot, PathOrFile
+    import aiohttp
+    import requests
 
 logger = logging.getLogger(__name__)
 NOT_FOUND = object()
@@ -97,13 +125,18 @@ class Schema:
     def schema_for_model(self, model_type: str) -> dict:
         return self._schema_data.get(model_type) if self.is_enabled else {}
 
-    def validate(self, model_type: str, data: dict) -> None:
+    def validate(self, model_type: str, data: dict, partial: bool=False) -> None:
         """
         Validate model data against schema.
+
+        :param partial: Data contains only some of the fields (sparse fieldset),
+            so required fields are not checked.
         """
         schema = self.schema_for_model(model_type)
         if not schema:
             return
+        if partial:
+            schema = {key: value for key, value in schema.items() if key != 'required'}
         jsonschema.validate(data, schema)
 
 
@@ -116,43 +149,232 @@ class Session:
     :param schema: Schema in jsonschema format. See example from :ref:`usage-schema`.
     :param request_kwargs: Additional keyword arguments that are passed to requests.request or
         aiohttp.request functions (such as authentication object)
+    :param commit_workers: If greater than 1, commit dirty resources in parallel using
+        a thread pool of this size (sync mode only). Connection pool of the session
+        is shared by the worker threads.
+    :param thread_safe: Allow sharing the session between threads (sync mode only).
+        Concurrent fetches of the same document or resource are made only once,
+        other threads wait for the result and read it from the cache.
+    :param shared_cache: SharedCache instance that is shared with other Sessions.
+        Documents and resources missing from this session's cache are read from it
+        before fetching them from the server.
+    :param retry: RetryPolicy for retrying failed requests.
+    :param rate_limit: RateLimiter that keeps requests within given budgets.
+    :param circuit_breaker: CircuitBreaker that fails requests fast to endpoints
+        (host and resource type) that keep failing.
+    :param timeout: Timeout in seconds for each request, either a number or a tuple
+        (connect timeout, read timeout). See also Session.deadline.
+    :param compress_threshold: Compress POST and PATCH request bodies that are larger
+        than this many bytes with gzip. Bytes transferred are counted in
+        Session.transfer_stats.
+
+    :param tracer: OpenTelemetry tracer or :class:`jsonapi_client.tracing.Tracer`
+        for tracing spans. By default, global OpenTelemetry tracer is used if
+        opentelemetry is installed.
+    :param profile: Collect timings with a Profiler, see Session.profile_report.
+    :param n_plus_one: NPlusOneDetector that warns about (or in strict mode raises
+        on) relationships fetched one resource at a time.
+    :param offline_store: OfflineStore of saved documents that are read instead of
+        fetching them from the server. See also Session.read_many.
+    :param weak_cache: Hold cached resources and documents with weak references,
+        so that they are freed when the application no longer uses them. The
+        same (type, id) still gives the same ResourceObject while it is in use.
+        Modified resources are kept alive until they are committed, so that
+        Session.commit still sends them.
+    :param strong_cache_size: With weak_cache, number of most recently used
+        resources and documents (in each cache) that are kept alive.
+
+    Hooks for instrumentation can be registered with Session.on. See
+    :class:`jsonapi_client.hooks.Event` for events.
 
     """
+    #: Maximum number of ids in one filter[id] request when prefetching
+    prefetch_batch_size = 50
+
     def __init__(self, server_url: str=None,
                  enable_async: bool=False,
                  schema: dict=None,
                  request_kwargs: dict=None,
                  loop: 'AbstractEventLoop'=None,
-                 use_relationship_iterator: bool=False,) -> None:
+                 use_relationship_iterator: bool=False,
+                 commit_workers: int=None,
+                 thread_safe: bool=False,
+                 shared_cache: 'SharedCache'=None,
+                 retry: 'RetryPolicy'=None,
+                 rate_limit: 'RateLimiter'=None,
+                 circuit_breaker: 'CircuitBreaker'=None,
+                 timeout: 'Union[float, Tuple[float, float]]'=None,
+                 compress_threshold: int=None,
+                 tracer: 'Tracer'=None,
+                 profile: bool=False,
+                 n_plus_one: 'NPlusOneDetector'=None,
+                 offline_store: 'OfflineStore'=None,
+                 weak_cache: bool=False,
+                 strong_cache_size: int=1000) -> None:
         self._server: ParseResult
         self.enable_async = enable_async
 
         self._request_kwargs: dict = request_kwargs or {}
+        self.commit_workers = commit_workers
+        self._http_session = None
+        self._cache_lock = threading.RLock()
+        self.thread_safe = thread_safe
+        #: Per-key fetch locks and number of threads holding or waiting for them
+        self._fetch_locks: 'Dict[object, List]' = {}
+        self.shared_cache = shared_cache
+        self.retry_policy = retry
+        self.rate_limiter = rate_limit
+        self.circuit_breaker = circuit_breaker
+        self.timeout = timeout
+        self.compress_threshold = compress_threshold
+        self.transfer_stats = TransferStats()
+        self._accept_encoding = accept_encoding()
+        self.hooks = Hooks()
+        self.tracer = tracer if isinstance(tracer, Tracer) else Tracer(tracer)
+        self.profiler: 'Optional[Profiler]' = Profiler(self).attach() if profile else None
+        #: Profiler of the last Session.profile context, for profile_report
+        self._last_profiler: 'Optional[Profiler]' = None
+        self.n_plus_one = n_plus_one
+        self.offline_store = offline_store
+        self._snapshot: 'Optional[Snapshot]' = None
 
         if server_url:
             self._server = urlparse(server_url)
         else:
             self._server = None
 
-        self.resources_by_resource_identifier: \
-            'Dict[Tuple[str, str], ResourceObject]' = {}
-        self.resources_by_link: 'Dict[str, ResourceObject]' = {}
-        self.documents_by_link: 'Dict[str, Document]' = {}
+        self.weak_cache = weak_cache
+        self.strong_cache_size = strong_cache_size
+        #: Incremented by Session.invalidate. Cached objects remember the
+        #: generation they were cached in and are invalid if it has changed.
+        self._generation = 0
+        self._new_caches()
         self.schema: Schema = Schema(schema)
         if enable_async:
             import aiohttp
             self._aiohttp_session = aiohttp.ClientSession(loop=loop)
         self.use_relationship_iterator = use_relationship_iterator
 
+    def on(self, event: str, callback: 'Callable') -> None:
+        """
+        Register callback to be called as callback(event, **info) when event occurs.
+
+        :param event: One of :class:`jsonapi_client.hooks.Event` names.
+        :param callback: Callable that receives event name and event data as
+            keyword arguments.
+        """
+        self.hooks.add(event, callback)
+
+    def off(self, event: str, callback: 'Callable') -> None:
+        """
+        Remove callback registered with Session.on.
+        """
+        self.hooks.remove(event, callback)
+
+    @contextmanager
+    def profile(self, cprofile: bool=False) -> 'Iterator[Profiler]':
+        """
+        Collect timings of requests made within this context manager.
+        Yields Profiler. If the session was not created with profile=True,
+        report is available also afterwards from Session.profile_report.
+        Otherwise the profiler of the session is resumed afterwards.
+
+        :param cprofile: Profile Document parsing with cProfile.
+        """
+        previous = self.profiler
+        if previous is not None:
+            previous.detach()
+        profiler = self.profiler = Profiler(self, cprofile=cprofile).attach()
+        try:
+            yield profiler
+        finally:
+            profiler.detach()
+            self._last_profiler = profiler
+            self.profiler = previous.attach() if previous is not None else None
+
+    def profile_report(self) -> dict:
+        """
+        Return timings collected with Session(profile=True) or Session.profile:
+        request latency histograms per url template and resource type, parse
+        and validation time of documents, commit times, number of lazy
+        relationship fetches and optional cProfile statistics of parsing.
+        """
+        profiler = self.profiler or self._last_profiler
+        return profiler.report() if profiler is not None else {}
+
+    def _new_caches(self) -> None:
+        """
+        Replace caches with new, empty ones.
+        """
+        if self.weak_cache:
+            self.resources_by_resource_identifier: \
+                'Dict[Tuple[str, str], ResourceObject]' = \
+                WeakValueCache(self.strong_cache_size)
+            self.resources_by_link: 'Dict[str, ResourceObject]' = \
+                NormalizedUrlWeakValueCache(self.strong_cache_size)
+            self.documents_by_link: 'Dict[str, Document]' = \
+                NormalizedUrlWeakValueCache(self.strong_cache_size)
+        else:
+            self.resources_by_resource_identifier = {}
+            self.resources_by_link = NormalizedUrlDict()
+            self.documents_by_link = NormalizedUrlDict()
+        #: Cached resources with changes waiting for commit, kept alive in
+        #: weak_cache mode
+        self._pending: 'Set[ResourceObject]' = set()
+
     def add_resources(self, *resources: 'ResourceObject') -> None:
         """
         Add resources to session cache.
         """
-        for res in resources:
-            self.resources_by_resource_identifier[(res.type, res.id)] = res
-            lnk = res.links.self.url if res.links.self else res.url
-            if lnk:
-                self.resources_by_link[lnk] = res
+        with self._cache_lock:
+            for res in resources:
+                res._generation = self._generation
+                self.resources_by_resource_identifier[(res.type, res.id)] = res
+                lnk = res.links.self.url if res.links.self else res.url
+                if lnk:
+                    self.resources_by_link[lnk] = res
+
+    def keep_pending(self, res: 'ResourceObject') -> None:
+        """
+        Keep modified resource alive until it is committed (in weak_cache mode).
+        """
+        if not self.weak_cache:
+            return
+        with self._cache_lock:
+            if self.resources_by_resource_identifier.get((res.type, res.id)) is res:
+                self._pending.add(res)
+
+    def release_pending(self, res: 'ResourceObject') -> None:
+        """
+        Release resource that was kept alive by keep_pending.
+        """
+        if self._pending:
+            with self._cache_lock:
+                self._pending.discard(res)
+
+    @contextmanager
+    def _single_fetch(self, key):
+        """
+        In thread safe mode, allow only one thread at a time to fetch with key.
+        Others wait and are expected to find the result from the cache.
+        """
+        if not self.thread_safe:
+            yield
+            return
+        with self._cache_lock:
+            entry = self._fetch_locks.get(key)
+            if entry is None:
+                entry = self._fetch_locks[key] = [threading.Lock(), 0]
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            # Lock is removed only when no thread holds it or waits for it
+            with self._cache_lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._fetch_locks[key]
 
     def remove_resource(self, res: 'ResourceObject') -> None:
         """
@@ -160,8 +382,23 @@ class Session:
 
         :param res: Resource to be removed
         """
-        del self.resources_by_resource_identifier[(res.type, res.id)]
-        del self.resources_by_link[res.url]
+        with self._cache_lock:
+            self.resources_by_resource_identifier.pop((res.type, res.id), None)
+            self.resources_by_link.pop(res.url, None)
+            self._pending.discard(res)
+        self.uncache_shared(res)
+        if self.hooks:
+            self.hooks.emit(Event.CACHE_EVICTION, kind='resource',
+                            key=(res.type, res.id), count=1)
+
+    def uncache_shared(self, res: 'ResourceObject') -> None:
+        """
+        Remove resource from shared cache (when it has been modified).
+
+        :param res: Resource to be removed
+        """
+        if self.shared_cache is not None and res.id:
+            self.shared_cache.invalidate_resource(res.type, res.id)
 
     @staticmethod
     def _value_to_dict(value: 'Union[ResourceObject, ResourceIdentifier, ResourceTuple]',
@@ -256,6 +493,15 @@ class Session:
         else:
             return self._create_and_commit_sync(type_, fields, **more_fields)
 
+    def deadline(self, seconds: float) -> 'deadline.Deadline':
+        """
+        Bound total time of requests made within the returned context manager
+        (with or async with). Raises DeadlineExceeded when time runs out.
+
+        :param seconds: Time budget in seconds.
+        """
+        return deadline.Deadline(seconds)
+
     def __enter__(self):
         self.assert_sync()
         logger.info('Entering session')
@@ -286,20 +532,26 @@ class Session:
         """
         if self.enable_async:
             self._aiohttp_session.close()
+        elif self._http_session is not None:
+            self._http_session.close()
+            self._http_session = None
         self.invalidate()
 
     def invalidate(self):
         """
         Invalidate resources and documents associated with this Session.
-        """
-        for resource in chain(self.documents_by_link.values(),
-                              self.resources_by_link.values(),
-                              self.resources_by_resource_identifier.values()):
-            resource.mark_invalid()
 
-        self.documents_by_link.clear()
-        self.resources_by_link.clear()
-        self.resources_by_resource_identifier.clear()
+        Takes constant time regardless of the size of caches: cached objects are
+        not visited, but they notice on next use that the generation of the
+        Session has changed (see AbstractJsonObject.is_invalid).
+        """
+        with self._cache_lock:
+            count = len(self.resources_by_resource_identifier)
+            self._generation += 1
+            self._new_caches()
+            self._snapshot = None
+        if self.hooks and count:
+            self.hooks.emit(Event.CACHE_EVICTION, kind='all', key=None, count=count)
 
     @property
     def server_url(self) -> str:
@@ -332,49 +584,95 @@ class Session:
             filter = None
         return resource_id, filter
 
-    def _get_sync(self, resource_type: str,
-                  resource_id_or_filter: 'Union[Modifier, str]'=None) -> 'Document':
+    def _get_url(self, resource_type: str,
+                 resource_id_or_filter: 'Union[Modifier, str]'=None,
+                 prefetch: 'Sequence[str]'=None) -> str:
+        from .filter import Inclusion
         resource_id, filter_ = self._resource_type_and_filter(
                                                                 resource_id_or_filter)
-        url = self._url_for_resource(resource_type, resource_id, filter_)
-        return self.fetch_document_by_url(url)
+        if prefetch:
+            inclusion = Inclusion(*self._prefetch_paths(prefetch))
+            filter_ = filter_ + inclusion if filter_ else inclusion
+        return self._url_for_resource(resource_type, resource_id, filter_)
+
+    def _get_sync(self, resource_type: str,
+                  resource_id_or_filter: 'Union[Modifier, str]'=None,
+                  prefetch: 'Sequence[str]'=None) -> 'Document':
+        url = self._get_url(resource_type, resource_id_or_filter, prefetch)
+        doc = self.fetch_document_by_url(url)
+        if prefetch:
+            self._prefetch_sync(doc.resources, prefetch)
+        return doc
 
     async def _get_async(self, resource_type: str,
-                         resource_id_or_filter: 'Union[Modifier, str]'=None) -> 'Document':
-        resource_id, filter_ = self._resource_type_and_filter(
-                                                                resource_id_or_filter)
-        url = self._url_for_resource(resource_type, resource_id, filter_)
-        return await self.fetch_document_by_url_async(url)
+                         resource_id_or_filter: 'Union[Modifier, str]'=None,
+                         prefetch: 'Sequence[str]'=None) -> 'Document':
+        url = self._get_url(resource_type, resource_id_or_filter, prefetch)
+        doc = await self.fetch_document_by_url_async(url)
+        if prefetch:
+            await self._prefetch_async(doc.resources, prefetch)
+        return doc
 
     def get(self, resource_type: str,
-                 resource_id_or_filter: 'Union[Modifier, str]'=None) \
+                 resource_id_or_filter: 'Union[Modifier, str]'=None,
+                 prefetch: 'Sequence[str]'=None) \
             -> 'Union[Awaitable[Document], Document]':
         """
         Request (GET) Document from server.
 
         :param resource_id_or_filter: Resource id or Modifier instance to filter
         resulting resources.
+        :param prefetch: Relationship paths (e.g. ['author', 'comments.author'])
+            whose resources are fetched before returning, so that accessing them
+            does not make requests. Related resources are requested with include
+            and, if server did not include them, fetched in batches with filter[id].
 
         If session is used with enable_async=True, this needs
         to be awaited.
         """
         if self.enable_async:
-            return self._get_async(resource_type, resource_id_or_filter)
+            return self._get_async(resource_type, resource_id_or_filter, prefetch)
         else:
-            return self._get_sync(resource_type, resource_id_or_filter)
+            return self._get_sync(resource_type, resource_id_or_filter, prefetch)
 
-    def _iterate_sync(self, resource_type: str, filter: 'Modifier'=None) \
+    def _iterate_sync(self, resource_type: str, filter: 'Modifier'=None,
+                      prefetch: 'Sequence[str]'=None, page: 'Page'=None) \
             -> 'Iterator[ResourceObject]':
-        doc = self.get(resource_type, filter)
-        yield from doc._iterator_sync()
-
-    async def _iterate_async(self, resource_type: str, filter: 'Modifier'=None) \
+        if page is not None:
+            filter = filter + page if filter else page
+        doc = self._get_sync(resource_type, filter, prefetch)
+        if not prefetch:
+            yield from doc._iterator_sync(page)
+            return
+        while True:
+            yield from doc.resources
+            url = doc.next_url(page)
+            if not url:
+                break
+            doc = self.fetch_document_by_url(url)
+            self._prefetch_sync(doc.resources, prefetch)
+
+    async def _iterate_async(self, resource_type: str, filter: 'Modifier'=None,
+                             prefetch: 'Sequence[str]'=None, page: 'Page'=None) \
             -> 'AsyncIterator[ResourceObject]':
-        doc = await self._get_async(resource_type, filter)
-        async for res in doc._iterator_async():
-            yield res
-
-    def iterate(self, resource_type: str, filter: 'Modifier'=None) \
+        if page is not None:
+            filter = filter + page if filter else page
+        doc = await self._get_async(resource_type, filter, prefetch)
+        if not prefetch:
+            async for res in doc._iterator_async(page):
+                yield res
+            return
+        while True:
+            for res in doc.resources:
+                yield res
+            url = doc.next_url(page)
+            if not url:
+                break
+            doc = await self.fetch_document_by_url_async(url)
+            await self._prefetch_async(doc.resources, prefetch)
+
+    def iterate(self, resource_type: str, filter: 'Modifier'=None,
+                prefetch: 'Sequence[str]'=None, page: 'Page'=None) \
             -> 'Union[AsyncIterator[ResourceObject], Iterator[ResourceObject]]':
         """
         Request (GET) Document from server and iterate through resources.
@@ -385,11 +683,243 @@ class Session:
         async for.
 
         :param filter: Modifier instance to filter resulting resources.
+        :param prefetch: Relationship paths to prefetch for each page, see Session.get.
+        :param page: Page modifier (Page, OffsetPage or CursorPage) that sets page
+            size etc. for the first request and finds the following pages.
+            Example: CursorPage(size=100)
+        """
+        if self.enable_async:
+            return self._iterate_async(resource_type, filter, prefetch, page)
+        else:
+            return self._iterate_sync(resource_type, filter, prefetch, page)
+
+    def _sparse_url(self, resource_type: str, fields: 'Optional[Sequence[str]]',
+                    filter: 'Modifier'=None) -> str:
+        """
+        Url of collection, requesting only attributes needed for fields.
+        """
+        from .filter import SparseFields
+        if not fields:
+            return self._url_for_resource(resource_type, None, filter)
+        names = {jsonify_attribute_name(field).split('.')[0] for field in fields}
+        sparse = SparseFields(**{resource_type: sorted(names - {'id', 'type'})})
+        return self._url_for_resource(resource_type, None,
+                                      filter + sparse if filter else sparse)
+
+    def _next_raw_url(self, json_data: dict) -> 'Optional[str]':
+        from .objects import Link
+        next_link = Link(self, (json_data.get('links') or {}).get('next'))
+        return next_link.url if next_link else None
+
+    def _iterate_columns_sync(self, resource_type: str, fields: 'Sequence[str]',
+                              chunk_size: int, filter: 'Modifier'=None,
+                              use_numpy: bool=False) -> 'Iterator[Dict[str, Column]]':
+        url = self._sparse_url(resource_type, fields, filter)
+        chunk: 'List[dict]' = []
+        while url:
+            json_data = self._fetch_json(url)
+            chunk.extend(json_data.get('data') or [])
+            while len(chunk) >= chunk_size:
+                yield to_columns(chunk[:chunk_size], fields, self.schema,
+                                 resource_type, use_numpy)
+                del chunk[:chunk_size]
+            url = self._next_raw_url(json_data)
+        if chunk:
+            yield to_columns(chunk, fields, self.schema, resource_type, use_numpy)
+
+    async def _iterate_columns_async(self, resource_type: str, fields: 'Sequence[str]',
+                                     chunk_size: int, filter: 'Modifier'=None,
+                                     use_numpy: bool=False) \
+            -> 'AsyncIterator[Dict[str, Column]]':
+        url = self._sparse_url(resource_type, fields, filter)
+        chunk: 'List[dict]' = []
+        while url:
+            json_data = await self._fetch_json_async(url)
+            chunk.extend(json_data.get('data') or [])
+            while len(chunk) >= chunk_size:
+                yield to_columns(chunk[:chunk_size], fields, self.schema,
+                                 resource_type, use_numpy)
+                del chunk[:chunk_size]
+            url = self._next_raw_url(json_data)
+        if chunk:
+            yield to_columns(chunk, fields, self.schema, resource_type, use_numpy)
+
+    def iterate_columns(self, resource_type: str, fields: 'Sequence[str]',
+                        chunk_size: int=1000, filter: 'Modifier'=None,
+                        use_numpy: bool=False) \
+            -> 'Union[AsyncIterator[Dict[str, Column]], Iterator[Dict[str, Column]]]':
+        """
+        Request (GET) resources from server page by page and iterate through their
+        attributes as columns, in chunks of chunk_size resources. Attributes are
+        read directly from the received JSON: no ResourceObjects are created and
+        resources are not cached. Only the needed attributes are requested
+        (sparse fieldset).
+
+        If session is used with enable_async=True, this needs to iterated with
+        async for.
+
+        :param fields: Attribute paths (e.g. 'title', 'author_info.first_name'),
+            'id' or 'type'
+        :param chunk_size: Number of resources in each chunk
+        :param filter: Modifier instance to filter resulting resources.
+        :param use_numpy: Return numeric columns as NumPy arrays instead of arrays
+        :return: Dictionaries from field to column. Columns are arrays (array
+            module) if schema says the attribute is numeric, otherwise lists.
         """
         if self.enable_async:
-            return self._iterate_async(resource_type, filter)
+            return self._iterate_columns_async(resource_type, fields, chunk_size,
+                                               filter, use_numpy)
         else:
-            return self._iterate_sync(resource_type, filter)
+            return self._iterate_columns_sync(resource_type, fields, chunk_size,
+                                              filter, use_numpy)
+
+    def _export_sync(self, resource_type: str, output: 'Output', format: str,
+                     fields: 'Sequence[str]'=None, filter: 'Modifier'=None) -> int:
+        url = self._sparse_url(resource_type, fields, filter)
+
+        def fetch(url):
+            return executor.submit(contextvars.copy_context().run, self._fetch_json, url)
+
+        with open_writer(output, format, fields) as writer, \
+                ThreadPoolExecutor(max_workers=1) as executor:
+            future = fetch(url)
+            while future is not None:
+                json_data = future.result()
+                url = self._next_raw_url(json_data)
+                # Next page is fetched while this page is written
+                future = fetch(url) if url else None
+                writer.write_page(json_data.get('data') or [])
+        return writer.count
+
+    async def _export_async(self, resource_type: str, output: 'Output', format: str,
+                            fields: 'Sequence[str]'=None,
+                            filter: 'Modifier'=None) -> int:
+        url = self._sparse_url(resource_type, fields, filter)
+        with open_writer(output, format, fields) as writer:
+            task = asyncio.ensure_future(self._fetch_json_async(url))
+            try:
+                while task is not None:
+                    json_data = await task
+                    url = self._next_raw_url(json_data)
+                    # Next page is fetched while this page is written
+                    task = asyncio.ensure_future(self._fetch_json_async(url)) if url \
+                        else None
+                    await execute_async(writer.write_page, json_data.get('data') or [])
+            finally:
+                if task is not None:
+                    task.cancel()
+        return writer.count
+
+    def export(self, resource_type: str, output: 'Output', format: str='ndjson',
+               fields: 'Sequence[str]'=None, filter: 'Modifier'=None) \
+            -> 'Union[Awaitable[int], int]':
+        """
+        Request (GET) resources from server page by page and write them to output
+        as they are received: each resource object of data straight from the
+        received JSON. No ResourceObjects are created and resources are not cached,
+        so memory use does not grow with the size of the collection. Next page is
+        fetched while the previous one is written.
+
+        If session is used with enable_async=True, this needs to be awaited.
+
+        :param output: File path or text file object
+        :param format: 'ndjson' (one JSON object per line) or 'csv'
+        :param fields: Attribute paths (e.g. 'title', 'author_info.first_name'),
+            'id' or 'type' to write as columns. By default whole resource objects
+            are written to NDJSON, and id and attributes to CSV.
+        :param filter: Modifier instance to filter resulting resources.
+        :return: Number of exported resources
+        """
+        if self.enable_async:
+            return self._export_async(resource_type, output, format, fields, filter)
+        else:
+            return self._export_sync(resource_type, output, format, fields, filter)
+
+    @staticmethod
+    def _prefetch_paths(prefetch: 'Sequence[str]') -> 'List[str]':
+        if isinstance(prefetch, str):
+            prefetch = [prefetch]
+        return ['.'.join(jsonify_attribute_name(name) for name in path.split('.'))
+                for path in prefetch]
+
+    def _prefetch_targets(self, resources: 'Iterable[ResourceObject]', name: str) \
+            -> 'Tuple[List[Tuple[str, str]], List[AbstractRelationship]]':
+        """
+        Return identifiers of related resources of relationship name of resources,
+        and relationships that can be resolved only by fetching their related link.
+        """
+        identifiers: 'Dict[Tuple[str, str], None]' = {}
+        linked = []
+        for res in resources:
+            rel = res._relationships.get(name)
+            if rel is None:
+                continue
+            res_ids = rel.resource_identifiers
+            if res_ids is None:
+                if not rel.is_fetched and rel.links.related:
+                    linked.append(rel)
+                continue
+            for res_id in res_ids:
+                identifiers[(res_id.type, res_id.id)] = None
+        return list(identifiers), linked
+
+    def _missing_batches(self, identifiers: 'List[Tuple[str, str]]') \
+            -> 'Iterator[Tuple[str, List[str]]]':
+        """
+        Yield (type, ids) batches of identifiers that are not in the session cache.
+        """
+        missing: 'Dict[str, List[str]]' = {}
+        for type_, id_ in identifiers:
+            if (type_, id_) not in self.resources_by_resource_identifier:
+                missing.setdefault(type_, []).append(id_)
+        size = self.prefetch_batch_size
+        for type_, ids in missing.items():
+            for i in range(0, len(ids), size):
+                yield type_, ids[i:i + size]
+
+    def _prefetched(self, identifiers: 'List[Tuple[str, str]]') -> 'List[ResourceObject]':
+        resources = []
+        for key in identifiers:
+            res = self.resources_by_resource_identifier.get(key)
+            if res is None:
+                logger.warning('Could not prefetch resource %s %s', *key)
+            else:
+                resources.append(res)
+        return resources
+
+    def _prefetch_sync(self, resources: 'Iterable[ResourceObject]',
+                       prefetch: 'Sequence[str]') -> None:
+        from .filter import Filter
+        for path in self._prefetch_paths(prefetch):
+            current = list(resources)
+            for name in path.split('.'):
+                identifiers, linked = self._prefetch_targets(current, name)
+                for type_, ids in self._missing_batches(identifiers):
+                    for _ in self._iterate_sync(type_, Filter(id=','.join(ids))):
+                        pass
+                current = self._prefetched(identifiers)
+                for rel in linked:
+                    rel._traced_fetch_sync()
+                    current.extend(rel._document.resources)
+
+    async def _prefetch_async(self, resources: 'Iterable[ResourceObject]',
+                              prefetch: 'Sequence[str]') -> None:
+        from .filter import Filter
+
+        async def fetch_batch(type_: str, ids: 'List[str]') -> None:
+            async for _ in self._iterate_async(type_, Filter(id=','.join(ids))):
+                pass
+
+        for path in self._prefetch_paths(prefetch):
+            current = list(resources)
+            for name in path.split('.'):
+                identifiers, linked = self._prefetch_targets(current, name)
+                await asyncio.gather(*[fetch_batch(type_, ids) for type_, ids
+                                       in self._missing_batches(identifiers)],
+                                     *[rel._traced_fetch_async() for rel in linked])
+                current = self._prefetched(identifiers)
+                for rel in linked:
+                    current.extend(rel._document.resources)
 
     def read(self, json_data: dict, url='', no_cache=False)-> 'Document':
         """
@@ -400,8 +930,24 @@ class Session:
         :param no_cache: do not store results into Session's cache.
         """
         from .document import Document
-        doc = self.documents_by_link[url] = Document(self, json_data, url,
-                                                     no_cache=no_cache)
+        profiler = self.profiler
+        with self.tracer.span('jsonapi.parse', {'http.url': url}), \
+                (profiler.profile_parse() if profiler is not None else nullcontext()):
+            if not self.hooks:
+                doc = Document(self, json_data, url, no_cache=no_cache)
+            else:
+                start = time.perf_counter()
+                doc = Document(self, json_data, url, no_cache=no_cache)
+                self.hooks.emit(Event.DOCUMENT_PARSED, url=url,
+                                duration=time.perf_counter() - start,
+                                resources=len(doc.resources) + len(doc.included))
+        with self._cache_lock:
+            doc._generation = self._generation
+            if no_cache:
+                # Resources are not cached, but are invalidated with the document
+                for res in chain(doc.resources, doc.included):
+                    res._generation = self._generation
+            self.documents_by_link[url] = doc
         return doc
 
     def fetch_resource_by_resource_identifier(
@@ -416,11 +962,17 @@ class Session:
         """
         type_, id_ = resource.type, resource.id
         new_res = not force and self.resources_by_resource_identifier.get((type_, id_))
+        if self.hooks:
+            self._emit_cache_lookup('resource', (type_, id_), new_res)
         if new_res:
             return new_res
         elif cache_only:
             return None
-        else:
+        with self._single_fetch((type_, id_)):
+            new_res = not force and (self.resources_by_resource_identifier.get((type_, id_))
+                                     or self._read_shared_resource(type_, id_, resource.url))
+            if new_res:
+                return new_res
             # Note: Document creation will add its resources to cache via .add_resources,
             # no need to do it manually here
             return self._ext_fetch_by_url(resource.url).resource
@@ -437,14 +989,18 @@ class Session:
         """
         type_, id_ = resource.type, resource.id
         new_res = not force and self.resources_by_resource_identifier.get((type_, id_))
+        if self.hooks:
+            self._emit_cache_lookup('resource', (type_, id_), new_res)
         if new_res:
             return new_res
         elif cache_only:
             return None
-        else:
-            # Note: Document creation will add its resources to cache via .add_resources,
-            # no need to do it manually here
-            return (await self._ext_fetch_by_url_async(resource.url)).resource
+        new_res = not force and self._read_shared_resource(type_, id_, resource.url)
+        if new_res:
+            return new_res
+        # Note: Document creation will add its resources to cache via .add_resources,
+        # no need to do it manually here
+        return (await self._ext_fetch_by_url_async(resource.url)).resource
 
     def fetch_document_by_url(self, url: str) -> 'Document':
         """
@@ -454,7 +1010,14 @@ class Session:
         """
 
         # TODO: should we try to guess type, id from url?
-        return self.documents_by_link.get(url) or self._ext_fetch_by_url(url)
+        doc = self.documents_by_link.get(url)
+        if self.hooks:
+            self._emit_cache_lookup('document', url, doc)
+        if doc:
+            return doc
+        with self._single_fetch(url):
+            return (self.documents_by_link.get(url) or self._read_shared_document(url)
+                    or self._ext_fetch_by_url(url))
 
     async def fetch_document_by_url_async(self, url: str) -> 'Document':
         """
@@ -464,56 +1027,446 @@ class Session:
         """
 
         # TODO: should we try to guess type, id from url?
-        return (self.documents_by_link.get(url) or
+        doc = self.documents_by_link.get(url)
+        if self.hooks:
+            self._emit_cache_lookup('document', url, doc)
+        return (doc or self._read_shared_document(url) or
                 await self._ext_fetch_by_url_async(url))
 
+    def _emit_cache_lookup(self, kind: str, key, found) -> None:
+        self.hooks.emit(Event.CACHE_HIT if found else Event.CACHE_MISS, kind=kind, key=key)
+
+    def _read_shared_document(self, url: str) -> 'Optional[Document]':
+        json_data = ((self._snapshot is not None and self._snapshot.get_document(url))
+                     or (self.shared_cache is not None
+                         and self.shared_cache.get_document(url)))
+        if json_data:
+            return self.read(json_data, url)
+
+    def _read_shared_resource(self, type_: str, id_: str, url: str) \
+            -> 'Optional[ResourceObject]':
+        res_data = ((self._snapshot is not None
+                     and self._snapshot.get_resource(type_, id_))
+                    or (self.shared_cache is not None
+                        and self.shared_cache.get_resource(type_, id_)))
+        if res_data:
+            return self.read({'data': res_data}, url).resource
+
+    def _read_offline(self, url: str) -> 'Optional[Document]':
+        json_data = self.offline_store is not None and self.offline_store.get(url)
+        if json_data:
+            return self.read(json_data, url)
+
+    def snapshot(self, path_or_file: 'PathOrFile') -> None:
+        """
+        Write cached resources and documents to a compact snapshot file
+        (zlib compressed raw JSON API data and link indexes), that can be
+        restored with Session.restore, for example to warm up caches of other
+        workers. Modified, new and partially loaded resources are left out.
+
+        :param path_or_file: File path or binary file object
+        """
+        from .snapshot import Snapshot
+        Snapshot.from_session(self).dump(path_or_file)
+
+    def restore(self, path_or_file: 'PathOrFile') -> None:
+        """
+        Restore snapshot written by Session.snapshot. Resources and documents are
+        built lazily: they are read from the snapshot when they are first looked
+        up, instead of fetching them from the server. Session.invalidate drops
+        the snapshot.
+
+        :param path_or_file: File path or binary file object
+        """
+        from .snapshot import Snapshot
+        self._snapshot = Snapshot.load(path_or_file)
+
+    def read_many(self, paths_or_glob: 'PathsOrGlob') -> 'Iterator[Document]':
+        """
+        Read saved documents (e.g. archived pages of API dumps) and iterate through
+        them. Files are read and decoded one document at a time.
+        Resources are added to the session cache, so relationships between
+        documents are resolved through it. Files are added to
+        Session.offline_store, so urls in them (such as pagination links.next) are
+        read from the store, and Document.iterator works as it would online.
+
+        :param paths_or_glob: Directory, glob pattern or list of paths of saved
+            JSON API documents. See OfflineStore.save for naming files by url.
+        """
+        from .offline import OfflineStore, expand_paths
+        if self.offline_store is None:
+            self.offline_store = OfflineStore()
+        store = self.offline_store
+        paths = expand_paths(paths_or_glob)
+        store.add(paths)
+        for path in paths:
+            doc = self.documents_by_link.get(self._offline_url(path))
+            if doc is None:
+                json_data = store.load(path)
+                if json_data is None:
+                    continue
+                doc = self.read(json_data, self._offline_url(path))
+            yield doc
+
+    def _offline_url(self, path: str) -> str:
+        url = self.offline_store.url(path)
+        if url.startswith('/') and self._server:
+            url = f'{self.server_url}{url}'
+        return url
+
     def _ext_fetch_by_url(self, url: str) -> 'Document':
+        doc = self._read_offline(url)
+        if doc is not None:
+            return doc
         json_data = self._fetch_json(url)
+        if self.shared_cache is not None:
+            self.shared_cache.put_document(url, json_data)
         return self.read(json_data, url)
 
     async def _ext_fetch_by_url_async(self, url: str) -> 'Document':
+        doc = self._read_offline(url)
+        if doc is not None:
+            return doc
         json_data = await self._fetch_json_async(url)
+        if self.shared_cache is not None:
+            self.shared_cache.put_document(url, json_data)
         return self.read(json_data, url)
 
-    def _fetch_json(self, url: str) -> dict:
+    @property
+    def http_session(self) -> 'requests.Session':
         """
         Internal use.
 
-        Fetch document raw json from server using requests library.
+        requests.Session that holds the connection pool used in sync mode.
         """
         self.assert_sync()
+        if self._http_session is None:
+            import requests
+            with self._cache_lock:
+                if self._http_session is None:
+                    http_session = requests.Session()
+                    pool_size = max(self.commit_workers or 0,
+                                    requests.adapters.DEFAULT_POOLSIZE)
+                    adapter = requests.adapters.HTTPAdapter(pool_maxsize=pool_size)
+                    http_session.mount('http://', adapter)
+                    http_session.mount('https://', adapter)
+                    self._http_session = http_session
+        return self._http_session
+
+    def _request_kwargs_with(self, **kwargs) -> dict:
+        headers = {'Accept-Encoding': self._accept_encoding,
+                   **self._request_kwargs.get('headers', {}),
+                   **kwargs.pop('headers', {})}
+        return {**self._request_kwargs, **kwargs, 'headers': headers}
+
+    def _encode_body(self, http_method: str, send_json: dict) -> dict:
+        """
+        Return keyword arguments (data, headers) to send send_json as request body,
+        compressed if it is large.
+        """
+        headers = {'Content-Type': 'application/vnd.api+json'}
+        body = json.dumps(send_json).encode()
+        size = len(body)
+        if (self.compress_threshold is not None and size > self.compress_threshold
+                and http_method in (HttpMethod.POST, HttpMethod.PATCH)):
+            body = compress(body)
+            headers['Content-Encoding'] = 'gzip'
+        self.transfer_stats.record_out(len(body), size)
+        return {'data': body, 'headers': headers}
+
+    def _record_received(self, headers, size: int) -> None:
+        transferred = size
+        if headers.get('Content-Encoding') and 'Content-Length' in headers:
+            transferred = int(headers['Content-Length'])
+        self.transfer_stats.record_in(transferred, size)
+
+    def _send(self, http_method: str, url: str, **kwargs) -> 'requests.Response':
+        """
+        Internal use.
+
+        Send request using requests library. Failed requests are retried according
+        to retry policy.
+        """
         import requests
+        count_request()
+        kwargs = self._request_kwargs_with(**kwargs)
+        attempt = 1
+        while True:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(http_method, url)
+            timeout = self._request_timeout()
+            if timeout is not None:
+                kwargs['timeout'] = timeout
+            endpoint = self._check_circuit(url)
+            hooks = self.hooks
+            if hooks:
+                start = self._emit_request_start(http_method, url, attempt)
+            try:
+                response = self.http_session.request(http_method, url, **kwargs)
+            except BaseException as exc:
+                if hooks:
+                    self._emit_request_end(http_method, url, attempt, start, exception=exc)
+                if not isinstance(exc, (requests.ConnectionError, requests.Timeout)):
+                    self._release_circuit(endpoint)
+                    raise
+                self._record_circuit(endpoint, failed=True)
+                deadline.remaining()
+                if not self._should_retry(http_method, attempt, exception=exc):
+                    raise
+                delay = self.retry_policy.delay(attempt)
+                logger.warning('%s %s failed (%s), retrying in %.2f s',
+                               http_method.upper(), url, exc, delay)
+            else:
+                size = len(response.content)
+                self._record_received(response.headers, size)
+                if hooks:
+                    self._emit_request_end(http_method, url, attempt, start,
+                                           status=response.status_code, size=size)
+                self._record_circuit(endpoint, status=response.status_code)
+                if not self._should_retry(http_method, attempt,
+                                          status=response.status_code):
+                    return response
+                delay = self.retry_policy.delay(attempt,
+                                                response.headers.get('Retry-After'))
+                logger.warning('%s %s returned %s, retrying in %.2f s',
+                               http_method.upper(), url, response.status_code, delay)
+                response.close()
+            self._check_delay(delay)
+            time.sleep(delay)
+            attempt += 1
+
+    async def _send_async(self, http_method: str, url: str, **kwargs) \
+            -> 'aiohttp.ClientResponse':
+        """
+        Internal use. Async version.
+
+        Send request using aiohttp library. Failed requests are retried according
+        to retry policy. Caller must release the returned response.
+        """
+        import aiohttp
+        count_request()
+        kwargs = self._request_kwargs_with(**kwargs)
+        attempt = 1
+        while True:
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire_async(http_method, url)
+            timeout = self._request_timeout()
+            if isinstance(timeout, tuple):
+                kwargs['timeout'] = aiohttp.ClientTimeout(sock_connect=timeout[0],
+                                                          sock_read=timeout[1])
+            elif timeout is not None:
+                kwargs['timeout'] = timeout
+            endpoint = self._check_circuit(url)
+            hooks = self.hooks
+            if hooks:
+                start = self._emit_request_start(http_method, url, attempt)
+            try:
+                response = await asyncio.wait_for(
+                    self._aiohttp_session.request(http_method, url, **kwargs),
+                    deadline.remaining())
+                size = len(await response.read())
+            except BaseException as exc:
+                if hooks:
+                    self._emit_request_end(http_method, url, attempt, start, exception=exc)
+                if not isinstance(exc, (aiohttp.ClientError, asyncio.TimeoutError)):
+                    self._release_circuit(endpoint)
+                    raise
+                self._record_circuit(endpoint, failed=True)
+                if not isinstance(exc, (aiohttp.ClientConnectionError, asyncio.TimeoutError)):
+                    raise
+                deadline.remaining()
+                if not self._should_retry(http_method, attempt, exception=exc):
+                    raise
+                delay = self.retry_policy.delay(attempt)
+                logger.warning('%s %s failed (%s), retrying in %.2f s',
+                               http_method.upper(), url, exc, delay)
+            else:
+                self._record_received(response.headers, size)
+                if hooks:
+                    self._emit_request_end(http_method, url, attempt, start,
+                                           status=response.status, size=size)
+                self._record_circuit(endpoint, status=response.status)
+                if not self._should_retry(http_method, attempt, status=response.status):
+                    return response
+                delay = self.retry_policy.delay(attempt,
+                                                response.headers.get('Retry-After'))
+                logger.warning('%s %s returned %s, retrying in %.2f s',
+                               http_method.upper(), url, response.status, delay)
+                response.release()
+            self._check_delay(delay)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def _request_timeout(self) -> 'Union[None, Tuple[float, float], aiohttp.ClientTimeout]':
+        """
+        Return (connect, read) timeout for next request, shortened to the time
+        remaining of the current deadline. If aiohttp.ClientTimeout is given in
+        request_kwargs (async mode), a shortened ClientTimeout is returned.
+        """
+        left = deadline.remaining()
+        timeout = self.timeout
+        if timeout is None:
+            if left is None:
+                return None
+            timeout = self._request_kwargs.get('timeout', left)
+            if not isinstance(timeout, (tuple, int, float)):
+                return self._client_timeout_within(timeout, left)
+        if not isinstance(timeout, tuple):
+            timeout = (timeout, timeout)
+        if left is not None:
+            timeout = tuple(left if t is None else min(t, left) for t in timeout)
+        return timeout
+
+    @staticmethod
+    def _client_timeout_within(timeout: 'aiohttp.ClientTimeout', left: float) \
+            -> 'aiohttp.ClientTimeout':
+        """
+        Return aiohttp.ClientTimeout with total time limited to left seconds.
+        """
+        import aiohttp
+
+        def within(seconds):
+            return seconds if seconds is None else min(seconds, left)
+        return aiohttp.ClientTimeout(total=min(timeout.total or left, left),
+                                     connect=within(timeout.connect),
+                                     sock_read=within(timeout.sock_read),
+                                     sock_connect=within(timeout.sock_connect))
+
+    @staticmethod
+    def _check_delay(delay: float) -> None:
+        left = deadline.remaining()
+        if left is not None and delay >= left:
+            raise DeadlineExceeded(f'Deadline exceeded (retry would take {delay:.2f} s)')
+
+    def _split_path(self, path: str) -> 'Tuple[str, List[str]]':
+        """
+        Split url path into server url path prefix and components after it.
+        """
+        prefix = self._server.path.rstrip('/') if self._server else ''
+        if prefix and path.startswith(prefix):
+            path = path[len(prefix):]
+        else:
+            prefix = ''
+        return prefix, path.strip('/').split('/')
+
+    def endpoint_for_url(self, url: str) -> 'Tuple[str, str]':
+        """
+        Return host and resource type (first path component after server url)
+        of url.
+        """
         parsed_url = urlparse(url)
-        logger.info('Fetching document from url %s', parsed_url)
-        response = requests.get(parsed_url.geturl(), **self._request_kwargs)
-        if response.status_code == HttpStatus.OK_200:
-            return response.json()
+        return parsed_url.netloc, self._split_path(parsed_url.path)[1][0]
+
+    def url_template(self, url: str) -> str:
+        """
+        Return url path with resource id replaced by {id} and query parameter
+        values left out, e.g. /api/articles/{id}/comments?include&page[size]
+        for grouping requests in instrumentation.
+        """
+        parsed_url = urlparse(url)
+        prefix, parts = self._split_path(parsed_url.path)
+        if len(parts) > 1:
+            parts[1] = '{id}'
+        template = f'{prefix}/{"/".join(parts)}'
+        if parsed_url.query:
+            names = dict.fromkeys(k for k, v in parse_qsl(parsed_url.query,
+                                                          keep_blank_values=True))
+            template = f'{template}?{"&".join(names)}'
+        return template
+
+    def _emit_request_start(self, http_method: str, url: str, attempt: int) -> float:
+        self.hooks.emit(Event.REQUEST_START, method=http_method, url=url,
+                        url_template=self.url_template(url), attempt=attempt)
+        return time.perf_counter()
+
+    def _emit_request_end(self, http_method: str, url: str, attempt: int, start: float,
+                          status: int=None, size: int=0,
+                          exception: BaseException=None) -> None:
+        self.hooks.emit(Event.REQUEST_END, method=http_method, url=url,
+                        url_template=self.url_template(url), attempt=attempt,
+                        status=status, bytes=size, latency=time.perf_counter() - start,
+                        exception=exception)
+
+    def _check_circuit(self, url: str) -> 'Optional[Tuple[str, str]]':
+        if self.circuit_breaker is None:
+            return None
+        endpoint = self.endpoint_for_url(url)
+        self.circuit_breaker.before_request(endpoint)
+        return endpoint
+
+    def _record_circuit(self, endpoint: 'Optional[Tuple[str, str]]', failed: bool=False,
+                        status: int=None) -> None:
+        """
+        Record result of request: transport failure (failed) or response status.
+        """
+        if endpoint is None:
+            return
+        if failed or status in self.circuit_breaker.failure_statuses:
+            self.circuit_breaker.record_failure(endpoint)
         else:
+            self.circuit_breaker.record_success(endpoint)
 
-            raise DocumentError(f'Error {response.status_code}: '
-                                f'{error_from_response(response)}',
-                                errors={'status_code': response.status_code},
-                                response=response)
+    def _release_circuit(self, endpoint: 'Optional[Tuple[str, str]]') -> None:
+        if endpoint is not None:
+            self.circuit_breaker.release(endpoint)
 
-    async def _fetch_json_async(self, url: str) -> dict:
+    def _should_retry(self, http_method: str, attempt: int, status: int=None,
+                      exception: Exception=None) -> bool:
+        if self.retry_policy is None:
+            return False
+        if status is not None and status < 400:
+            return False
+        return self.retry_policy.should_retry(http_method, attempt, status, exception)
+
+    def _fetch_json(self, url: str) -> dict:
         """
-        Internal use. Async version.
+        Internal use.
 
-        Fetch document raw json from server using aiohttp library.
+        Fetch document raw json from server using requests library.
         """
-        self.assert_async()
+        self.assert_sync()
         parsed_url = urlparse(url)
         logger.info('Fetching document from url %s', parsed_url)
-        async with self._aiohttp_session.get(parsed_url.geturl(),
-                                             **self._request_kwargs) as response:
-            if response.status == HttpStatus.OK_200:
-                return await response.json(content_type='application/vnd.api+json')
+        with self._request_span('jsonapi.fetch', HttpMethod.GET, url) as span:
+            response = self._send(HttpMethod.GET, parsed_url.geturl())
+            span.set_attribute('http.status_code', response.status_code)
+            if response.status_code == HttpStatus.OK_200:
+                return response.json()
             else:
+
                 raise DocumentError(f'Error {response.status_code}: '
                                     f'{error_from_response(response)}',
                                     errors={'status_code': response.status_code},
                                     response=response)
 
+    async def _fetch_json_async(self, url: str) -> dict:
+        """
+        Internal use. Async version.
+
+        Fetch document raw json from server using aiohttp library.
+        """
+        self.assert_async()
+        parsed_url = urlparse(url)
+        logger.info('Fetching document from url %s', parsed_url)
+        with self._request_span('jsonapi.fetch', HttpMethod.GET, url) as span:
+            async with await self._send_async(HttpMethod.GET,
+                                              parsed_url.geturl()) as response:
+                span.set_attribute('http.status_code', response.status)
+                if response.status == HttpStatus.OK_200:
+                    return await response.json(content_type='application/vnd.api+json')
+                else:
+                    raise DocumentError(f'Error {response.status}: '
+                                        f'{error_from_response(response)}',
+                                        errors={'status_code': response.status},
+                                        response=response)
+
+    def _request_span(self, name: str, http_method: str, url: str):
+        if not self.tracer.enabled:
+            return self.tracer.span(name)
+        return self.tracer.span(name, {'http.method': http_method.upper(),
+                                       'http.url': url,
+                                       'http.route': self.url_template(url)})
+
     def http_request(self, http_method: str, url: str, send_json: dict,
                      expected_statuses: List[str]=None) -> Tuple[int, dict, str]:
         """
@@ -522,21 +1475,21 @@ class Session:
         Method to make PATCH/POST requests to server using requests library.
         """
         self.assert_sync()
-        import requests
         logger.debug('%s request: %s', http_method.upper(), send_json)
         expected_statuses = expected_statuses or HttpStatus.ALL_OK
 
-        response = requests.request(http_method, url, json=send_json,
-                                    headers={'Content-Type': 'application/vnd.api+json'},
-                                    **self._request_kwargs)
+        with self._request_span('jsonapi.request', http_method, url) as span:
+            response = self._send(http_method, url,
+                                  **self._encode_body(http_method, send_json))
+            span.set_attribute('http.status_code', response.status_code)
 
-        if response.status_code not in expected_statuses:
-            raise DocumentError(f'Could not {http_method.upper()} '
-                                f'({response.status_code}): '
-                                f'{error_from_response(response)}',
-                                errors={'status_code': response.status_code},
-                                response=response,
-                                json_data=send_json)
+            if response.status_code not in expected_statuses:
+                raise DocumentError(f'Could not {http_method.upper()} '
+                                    f'({response.status_code}): '
+                                    f'{error_from_response(response)}',
+                                    errors={'status_code': response.status_code},
+                                    response=response,
+                                    json_data=send_json)
 
         return response.status_code, response.json() \
             if response.content \
@@ -559,22 +1512,23 @@ class Session:
         logger.debug('%s request: %s', http_method.upper(), send_json)
         expected_statuses = expected_statuses or HttpStatus.ALL_OK
         content_type = '' if http_method == HttpMethod.DELETE else 'application/vnd.api+json'
-        async with self._aiohttp_session.request(
-                http_method, url, data=json.dumps(send_json),
-                headers={'Content-Type':'application/vnd.api+json'},
-                **self._request_kwargs) as response:
-
-            if response.status not in expected_statuses:
-                raise DocumentError(f'Could not {http_method.upper()} '
-                                    f'({response.status}): '
-                                    f'{error_from_response(response)}',
-                                    errors={'status_code': response.status},
-                                    response=response,
-                                    json_data=send_json)
-
-            response_json = await response.json(content_type=content_type)
-
-            return response.status, response_json or {}, response.headers.get('Location')
+        with self._request_span('jsonapi.request', http_method, url) as span:
+            async with await self._send_async(
+                    http_method, url,
+                    **self._encode_body(http_method, send_json)) as response:
+                span.set_attribute('http.status_code', response.status)
+                if response.status not in expected_statuses:
+                    raise DocumentError(f'Could not {http_method.upper()} '
+                                        f'({response.status}): '
+                                        f'{error_from_response(response)}',
+                                        errors={'status_code': response.status},
+                                        response=response,
+                                        json_data=send_json)
+
+                response_json = await response.json(content_type=content_type)
+
+                return (response.status, response_json or {},
+                        response.headers.get('Location'))
 
     @property
     def dirty_resources(self) -> 'Set[ResourceObject]':
@@ -582,7 +1536,9 @@ class Session:
         Set of all resources in Session cache that are marked as dirty,
         i.e. waiting for commit.
         """
-        return {i for i in self.resources_by_resource_identifier.values() if i.is_dirty}
+        with self._cache_lock:
+            resources = [*self.resources_by_resource_identifier.values(), *self._pending]
+        return {i for i in resources if i.is_dirty}
 
     @property
     def is_dirty(self) -> bool:
@@ -591,14 +1547,45 @@ class Session:
     def _commit_sync(self) -> None:
         self.assert_sync()
         logger.info('Committing dirty resources')
-        for res in self.dirty_resources:
-            res.commit()
+        dirty_resources = self.dirty_resources
+        with self.tracer.span('jsonapi.commit', {'jsonapi.resources': len(dirty_resources)}):
+            if (self.commit_workers and self.commit_workers > 1
+                    and len(dirty_resources) > 1):
+                return self._commit_parallel(dirty_resources)
+            for res in dirty_resources:
+                res.commit()
+
+    def _commit_parallel(self, resources: 'Set[ResourceObject]') -> None:
+        """
+        Commit resources in a thread pool. Every resource is committed even if
+        some of the commits fail. Failures are raised afterwards in a CommitError.
+        """
+        committed = []
+        failures = []
+        self.http_session  # Create connection pool before the worker threads
+        with ThreadPoolExecutor(max_workers=self.commit_workers) as executor:
+            # Worker threads see the same deadline as the caller
+            futures = {executor.submit(contextvars.copy_context().run, res._commit_sync): res
+                       for res in resources}
+            for future, res in futures.items():
+                exc = future.exception()
+                if exc is None:
+                    committed.append(res)
+                else:
+                    logger.error('Could not commit %s: %s', res, exc)
+                    failures.append((res, exc))
+        if failures:
+            raise CommitError(f'Could not commit {len(failures)} of '
+                              f'{len(resources)} resources',
+                              failures=failures, committed=committed)
 
     async def _commit_async(self) -> None:
         self.assert_async()
         logger.info('Committing dirty resources')
-        for res in self.dirty_resources:
-            await res._commit_async()
+        dirty_resources = self.dirty_resources
+        with self.tracer.span('jsonapi.commit', {'jsonapi.resources': len(dirty_resources)}):
+            for res in dirty_resources:
+                await res._commit_async()
 
     def commit(self) -> Optional[Awaitable]:
         """
@@ -0,0 +1,212 @@
+"""
+JSON API Python client 
+https://github.com/qvantel/jsonapi-client
+
+(see JSON API specification in http://jsonapi.org/)
+
+Copyright (c) 2017, Qvantel
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the Qvantel nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL QVANTEL BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+Snapshots of Session caches. A snapshot contains raw resource objects (as JSON)
+and indexes of documents and resource links, compressed with zlib. No Python
+objects are pickled.
+"""
+
+import json
+import logging
+import zlib
+from typing import TYPE_CHECKING, BinaryIO, Dict, List, Optional, Union
+
+from .common import NormalizedUrlDict
+
+if TYPE_CHECKING:
+    from .document import Document
+    from .objects import Links
+    from .resourceobject import ResourceObject
+    from .session import Session
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'JSONAPI-SNAPSHOT\n'
+VERSION = 1
+
+PathOrFile = Union[str, BinaryIO]
+
+
+def links_json(links: 'Links') -> dict:
+    return {name: link.href for name, link in links._links.items() if link}
+
+
+def resource_json(res: 'ResourceObject') -> dict:
+    """
+    Raw JSON API resource object of resource.
+    """
+    from .relationships import SingleRelationship, MultiRelationship
+    relationships = {}
+    for name, rel in res._relationships.items():
+        rel_json = {}
+        if isinstance(rel, (SingleRelationship, MultiRelationship)):
+            rel_json['data'] = rel.as_json_resource_identifiers
+        rel_links = links_json(rel.links)
+        if rel_links:
+            rel_json['links'] = rel_links
+        if rel.meta.meta:
+            rel_json['meta'] = rel.meta.meta
+        relationships[name] = rel_json
+    return {'type': res.type, 'id': res.id, 'attributes': res._attributes,
+            'relationships': relationships, 'links': links_json(res.links),
+            'meta': res.meta.meta}
+
+
+class Snapshot:
+    """
+    Snapshot of Session caches, read with Snapshot.load.
+
+    Resources are kept as JSON strings and decoded only when they are read, so
+    loading even a large snapshot is fast. Session.restore uses Snapshot like a
+    SharedCache: documents and resources missing from the session cache are read
+    from the snapshot before fetching them from the server.
+
+    :param resources: List of [type, id, resource object as JSON string]
+    :param documents: Document url to document, where data and included are
+        indexes to resources
+    :param links: Resource url to index of resource
+    """
+    def __init__(self, resources: 'List[list]', documents: 'Dict[str, dict]',
+                 links: 'Dict[str, int]') -> None:
+        self._resources = resources
+        self._index = {(type_, id_): i for i, (type_, id_, _) in enumerate(resources)}
+        # Keys are normalized already when snapshot is written
+        self._documents = NormalizedUrlDict(documents)
+        self._links = NormalizedUrlDict(links)
+
+    def __len__(self):
+        return len(self._resources)
+
+    def _resource(self, index: int) -> dict:
+        return json.loads(self._resources[index][2])
+
+    def get_resource(self, type_: str, id_: str) -> 'Optional[dict]':
+        """
+        Return raw resource object, or None if it is not in the snapshot.
+        """
+        index = self._index.get((type_, id_))
+        return None if index is None else self._resource(index)
+
+    def get_document(self, url: str) -> 'Optional[dict]':
+        """
+        Return raw document of url, or None if it is not in the snapshot.
+        Urls of resources give single resource documents.
+        """
+        doc = self._documents.get(url)
+        if doc is None:
+            index = self._links.get(url)
+            return None if index is None else {'data': self._resource(index)}
+        data = doc['data']
+        json_data = {'data': ([self._resource(i) for i in data] if isinstance(data, list)
+                              else None if data is None else self._resource(data)),
+                     'included': [self._resource(i) for i in doc['included']]}
+        for key in ('links', 'meta'):
+            if doc.get(key):
+                json_data[key] = doc[key]
+        return json_data
+
+    @classmethod
+    def from_session(cls, session: 'Session') -> 'Snapshot':
+        """
+        Take snapshot of resources and documents in session cache. Modified,
+        new and partially loaded resources, and documents containing them, are
+        left out.
+        """
+        resources: 'List[list]' = []
+        index: 'Dict[int, int]' = {}
+
+        def add(res: 'ResourceObject') -> 'Optional[int]':
+            i = index.get(id(res))
+            if i is None and not (res.is_dirty or res.is_partial):
+                i = index[id(res)] = len(resources)
+                resources.append([res.type, res.id, json.dumps(resource_json(res))])
+            return i
+
+        with session._cache_lock:
+            cached = list(session.resources_by_resource_identifier.values())
+            resource_links = list(session.resources_by_link.items())
+            cached_documents = list(session.documents_by_link.items())
+        skipped = sum(add(res) is None for res in cached)
+        links = {url: i for url, i in ((url, add(res)) for url, res in resource_links)
+                 if i is not None}
+        documents = {}
+        for url, doc in cached_documents:
+            doc_json = cls._document_json(doc, add)
+            if doc_json is None:
+                skipped += 1
+            else:
+                documents[url] = doc_json
+        if skipped:
+            logger.info('Left out %s modified resources or documents from snapshot',
+                        skipped)
+        return cls(resources, documents, links)
+
+    @staticmethod
+    def _document_json(doc: 'Document', add) -> 'Optional[dict]':
+        data = [add(res) for res in doc.resources]
+        included = [add(res) for res in doc.included]
+        if None in data or None in included:
+            return None
+        if doc._single:
+            data = data[0] if data else None
+        return {'data': data, 'included': included, 'links': links_json(doc.links),
+                'meta': doc.meta.meta}
+
+    def dump(self, path_or_file: 'PathOrFile') -> None:
+        """
+        Write snapshot to file path or binary file object.
+        """
+        body = json.dumps({'version': VERSION, 'resources': self._resources,
+                           'documents': self._documents, 'links': self._links},
+                          separators=(',', ':')).encode()
+        data = MAGIC + zlib.compress(body)
+        if isinstance(path_or_file, str):
+            with open(path_or_file, 'wb') as f:
+                f.write(data)
+        else:
+            path_or_file.write(data)
+
+    @classmethod
+    def load(cls, path_or_file: 'PathOrFile') -> 'Snapshot':
+        """
+        Read snapshot from file path or binary file object.
+        """
+        if isinstance(path_or_file, str):
+            with open(path_or_file, 'rb') as f:
+                data = f.read()
+        else:
+            data = path_or_file.read()
+        if not data.startswith(MAGIC):
+            raise ValueError('Not a session snapshot')
+        body = json.loads(zlib.decompress(data[len(MAGIC):]))
+        if body.get('version') != VERSION:
+            raise ValueError(f'Unsupported snapshot version {body.get("version")}')
+        return cls(body['resources'], body['documents'], body['links'])
@@ -0,0 +1,534 @@
+"""
+JSON API Python client 
+https://github.com/qvantel/jsonapi-client
+
+(see JSON API specification in http://jsonapi.org/)
+
+Copyright (c) 2017, Qvantel
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the Qvantel nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL QVANTEL BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+Stand-in JSON API server for testing and load testing the client locally.
+
+Data is generated on the fly for a schema in the same format as Session uses.
+Run from command line:
+
+    python -m jsonapi_client.testserver schema.json --port 8080 --latency 0.05
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from itertools import count
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'application/vnd.api+json'
+
+#: Schema used when no schema is given: the example of jsonapi.org
+EXAMPLE_SCHEMA = {
+    'articles': {'properties': {
+        'title': {'type': 'string'},
+        'author': {'relation': 'to-one', 'resource': ['people']},
+        'comments': {'relation': 'to-many', 'resource': ['comments']},
+    }},
+    'people': {'properties': {
+        'first-name': {'type': 'string'},
+        'last-name': {'type': 'string'},
+        'twitter': {'type': ['null', 'string']},
+    }},
+    'comments': {'properties': {
+        'body': {'type': 'string'},
+        'author': {'relation': 'to-one', 'resource': ['people']},
+    }},
+}
+
+
+class StandInServer:
+    """
+    aiohttp based JSON API server that generates resources for schema on the fly.
+
+    Supports pagination (page[number], page[size]) with pagination links,
+    compound documents (include), sparse fieldsets (fields[type]), filtering
+    (filter[id]=1,2 and filter[attribute]=value), related resource and
+    relationship links, ETags (If-None-Match), POST, PATCH and DELETE, and
+    injected latency, errors and 202 Accepted responses.
+
+    :param schema: Schema in the format used by Session. Resource types that are
+        only referenced in relationships get resources without attributes.
+    :param resources: Number of resources generated for each resource type
+    :param page_size: Default page size of collections
+    :param fan_out: Number of resources in generated to-many relationships
+    :param url_prefix: Path prefix of the api
+    :param latency: Latency added to each response in seconds
+    :param latency_jitter: Random additional latency up to this many seconds
+    :param error_rate: Probability of responding with error_status instead
+    :param error_status: Status of injected errors
+    :param accepted_rate: Probability of responding to POST and PATCH with
+        202 Accepted
+    :param seed: Seed for generated data and injected errors
+    :param include: If False, include parameter is ignored like on servers that
+        do not support compound documents
+    :param pagination: 'page' for page[number] based pagination with pagination
+        links, or 'cursor' for page[after] / page[before] cursors (resource ids).
+        Cursor pages have no links, next cursor is given in meta
+        (page.next-cursor).
+    """
+    def __init__(self, schema: dict=None,
+                 resources: int=100,
+                 page_size: int=20,
+                 fan_out: int=3,
+                 url_prefix: str='/api',
+                 latency: float=0.,
+                 latency_jitter: float=0.,
+                 error_rate: float=0.,
+                 error_status: int=503,
+                 accepted_rate: float=0.,
+                 seed: int=0,
+                 include: bool=True,
+                 pagination: str='page') -> None:
+        self.schema = schema or EXAMPLE_SCHEMA
+        self.resources = resources
+        self.page_size = page_size
+        self.fan_out = fan_out
+        self.url_prefix = url_prefix.rstrip('/')
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.accepted_rate = accepted_rate
+        self.seed = seed
+        self.include = include
+        self.pagination = pagination
+        self.url = ''
+
+        #: Number of requests by HTTP method
+        self.requests: Counter = Counter()
+        #: Number of injected errors
+        self.errors = 0
+        #: Highest number of requests handled at the same time
+        self.max_concurrency = 0
+        self._concurrency = 0
+
+        self._random = random.Random(seed)
+        self._data: Dict[str, Dict[str, dict]] = {}
+        self._ids = count(resources + 1)
+        self._runner: Optional[web.AppRunner] = None
+
+    # Data generation
+
+    @property
+    def types(self) -> Set[str]:
+        types = set(self.schema)
+        for model in self.schema.values():
+            for spec in model.get('properties', {}).values():
+                types.update(spec.get('resource', []) if 'relation' in spec else [])
+        return types
+
+    def _value(self, rnd: random.Random, name: str, spec: dict, id_: str):
+        if 'default' in spec:
+            return spec['default']
+        if 'enum' in spec:
+            return rnd.choice(spec['enum'])
+        type_ = spec.get('type', 'string')
+        if isinstance(type_, list):
+            type_ = next((t for t in type_ if t != 'null'), 'null')
+        if type_ == 'object':
+            return {key: self._value(rnd, key, value, id_)
+                    for key, value in spec.get('properties', {}).items()
+                    if 'relation' not in value}
+        elif type_ == 'integer':
+            return rnd.randint(0, 1000)
+        elif type_ == 'number':
+            return round(rnd.uniform(0, 1000), 2)
+        elif type_ == 'boolean':
+            return rnd.random() < 0.5
+        elif type_ == 'array':
+            return []
+        elif type_ == 'null':
+            return None
+        elif spec.get('format') == 'date-time':
+            return (datetime(2019, 1, 1) + timedelta(minutes=rnd.randint(0, 10**6))
+                    ).isoformat() + 'Z'
+        return f'{name} {id_}'
+
+    def _generate(self, type_: str, id_: str) -> dict:
+        rnd = random.Random(f'{self.seed}/{type_}/{id_}')
+        attributes = {}
+        relationships = {}
+        properties = self.schema.get(type_, {}).get('properties', {})
+        for name, spec in properties.items():
+            if 'relation' not in spec:
+                attributes[name] = self._value(rnd, name, spec, id_)
+            elif spec['relation'] == 'to-one':
+                relationships[name] = self._identifier(rnd, spec['resource'])
+            else:
+                relationships[name] = [self._identifier(rnd, spec['resource'])
+                                       for _ in range(self.fan_out)]
+        return {'type': type_, 'id': id_, 'attributes': attributes,
+                'relationships': relationships}
+
+    def _identifier(self, rnd: random.Random, types: List[str]) -> dict:
+        return {'type': rnd.choice(types), 'id': str(rnd.randint(1, self.resources))}
+
+    def _collection(self, type_: str) -> Optional[Dict[str, dict]]:
+        if type_ not in self._data:
+            if type_ not in self.types:
+                return None
+            self._data[type_] = {str(i): self._generate(type_, str(i))
+                                 for i in range(1, self.resources + 1)}
+        return self._data[type_]
+
+    def _get(self, type_: str, id_: str) -> Optional[dict]:
+        collection = self._collection(type_)
+        return collection.get(id_) if collection is not None else None
+
+    # Serialization
+
+    def _resource_url(self, type_: str, id_: str) -> str:
+        return f'{self.url}/{type_}/{id_}'
+
+    def _serialize(self, res: dict, fields: Dict[str, Set[str]]) -> dict:
+        type_, id_ = res['type'], res['id']
+        url = self._resource_url(type_, id_)
+        type_fields = fields.get(type_)
+        relationships = {
+            name: {'links': {'self': f'{url}/relationships/{name}',
+                             'related': f'{url}/{name}'},
+                   'data': data}
+            for name, data in res['relationships'].items()
+            if type_fields is None or name in type_fields}
+        attributes = {name: value for name, value in res['attributes'].items()
+                      if type_fields is None or name in type_fields}
+        return {'type': type_, 'id': id_, 'attributes': attributes,
+                'relationships': relationships, 'links': {'self': url}}
+
+    def _included(self, primary: List[dict], include: List[str]) -> List[dict]:
+        seen: Set[Tuple[str, str]] = {(r['type'], r['id']) for r in primary}
+        included = []
+        for path in include:
+            current = primary
+            for name in path.split('.'):
+                related = []
+                for res in current:
+                    data = res['relationships'].get(name)
+                    for ident in (data if isinstance(data, list) else [data]):
+                        target = ident and self._get(ident['type'], ident['id'])
+                        if target is None:
+                            continue
+                        related.append(target)
+                        key = (target['type'], target['id'])
+                        if key not in seen:
+                            seen.add(key)
+                            included.append(target)
+                current = related
+        return included
+
+    def _document(self, request: web.Request, data, primary: List[dict], **extra) -> dict:
+        fields = {key[7:-1]: set(value.split(','))
+                  for key, value in request.query.items()
+                  if key.startswith('fields[') and key.endswith(']')}
+        if isinstance(data, list):
+            doc = {'data': [self._serialize(r, fields) for r in data]}
+        else:
+            doc = {'data': data and self._serialize(data, fields)}
+        include = request.query.get('include')
+        if include and self.include:
+            doc['included'] = [self._serialize(r, fields)
+                               for r in self._included(primary, include.split(','))]
+        doc.update(extra)
+        return doc
+
+    @staticmethod
+    def _json_response(doc: dict, status: int=200, headers: dict=None) -> web.Response:
+        return web.Response(body=json.dumps(doc).encode(), status=status,
+                            content_type=CONTENT_TYPE, headers=headers)
+
+    @staticmethod
+    def _error(status: int, title: str) -> web.Response:
+        return StandInServer._json_response(
+            {'errors': [{'status': str(status), 'title': title}]}, status)
+
+    def _get_response(self, request: web.Request, doc: dict) -> web.Response:
+        body = json.dumps(doc).encode()
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        if etag in request.headers.get('If-None-Match', ''):
+            return web.Response(status=304, headers={'ETag': etag})
+        return web.Response(body=body, content_type=CONTENT_TYPE, headers={'ETag': etag})
+
+    # Handlers
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler) -> web.StreamResponse:
+        self.requests[request.method] += 1
+        self._concurrency += 1
+        self.max_concurrency = max(self.max_concurrency, self._concurrency)
+        try:
+            if self.latency or self.latency_jitter:
+                await asyncio.sleep(self.latency
+                                    + self._random.uniform(0, self.latency_jitter))
+            if self.error_rate and self._random.random() < self.error_rate:
+                self.errors += 1
+                return self._error(self.error_status, 'Injected error')
+            response = await handler(request)
+            if (isinstance(response, web.Response) and response.body
+                    and 'gzip' in request.headers.get('Accept-Encoding', '')):
+                response.enable_compression(web.ContentCoding.gzip)
+            return response
+        finally:
+            self._concurrency -= 1
+
+    async def _collection_handler(self, request: web.Request) -> web.Response:
+        type_ = request.match_info['type']
+        collection = self._collection(type_)
+        if collection is None:
+            return self._error(404, f'Unknown resource type {type_}')
+        if request.method == 'POST':
+            return await self._create(request, type_, collection)
+        if request.method != 'GET':
+            return self._error(405, 'Method not allowed')
+
+        resources = list(collection.values())
+        for key, value in request.query.items():
+            if key == 'filter[id]':
+                ids = set(value.split(','))
+                resources = [r for r in resources if r['id'] in ids]
+            elif key.startswith('filter[') and key.endswith(']'):
+                name = key[7:-1]
+                resources = [r for r in resources
+                             if str(r['attributes'].get(name)) == value]
+
+        size = int(request.query.get('page[size]', self.page_size))
+        if self.pagination == 'cursor':
+            return self._cursor_page(request, resources, size)
+        number = int(request.query.get('page[number]', 1))
+        last = max(1, -(-len(resources) // size))
+        page = resources[(number - 1) * size:number * size]
+
+        def page_url(num):
+            query = dict(request.query)
+            query['page[number]'] = str(num)
+            query['page[size]'] = str(size)
+            return str(request.url.with_query(query))
+
+        links = {'self': page_url(number), 'first': page_url(1), 'last': page_url(last)}
+        if number < last:
+            links['next'] = page_url(number + 1)
+        if number > 1:
+            links['prev'] = page_url(number - 1)
+        doc = self._document(request, page, page, links=links,
+                             meta={'count': len(resources)})
+        return self._get_response(request, doc)
+
+    def _cursor_page(self, request: web.Request, resources: List[dict],
+                     size: int) -> web.Response:
+        ids = [r['id'] for r in resources]
+        after, before = request.query.get('page[after]'), request.query.get('page[before]')
+        start, end = 0, len(resources)
+        if after is not None:
+            start = ids.index(after) + 1 if after in ids else end
+        if before is not None:
+            end = ids.index(before) if before in ids else end
+            start = max(start, end - size)
+        page = resources[start:min(end, start + size)]
+        has_more = start + len(page) < len(resources)
+        meta = {'count': len(resources),
+                'page': {'next-cursor': page[-1]['id'] if page and has_more else None,
+                         'prev-cursor': page[0]['id'] if page and start else None}}
+        return self._get_response(request, self._document(request, page, page, meta=meta))
+
+    async def _resource_handler(self, request: web.Request) -> web.Response:
+        type_, id_ = request.match_info['type'], request.match_info['id']
+        res = self._get(type_, id_)
+        if res is None:
+            return self._error(404, f'Resource {type_} {id_} not found')
+        if request.method == 'GET':
+            return self._get_response(request, self._document(request, res, [res]))
+        elif request.method == 'PATCH':
+            data = (await request.json())['data']
+            self._update(res, data)
+            return self._write_response(request, res)
+        elif request.method == 'DELETE':
+            del self._data[type_][id_]
+            return web.Response(status=204)
+        return self._error(405, 'Method not allowed')
+
+    async def _related_handler(self, request: web.Request) -> web.Response:
+        type_, id_ = request.match_info['type'], request.match_info['id']
+        name = request.match_info['relationship']
+        res = self._get(type_, id_)
+        if res is None or name not in res['relationships']:
+            return self._error(404, f'Relationship {name} not found')
+        if request.method != 'GET':
+            return self._error(405, 'Method not allowed')
+        data = res['relationships'][name]
+        if isinstance(data, list):
+            related = [r for r in (self._get(i['type'], i['id']) for i in data) if r]
+        else:
+            related = data and self._get(data['type'], data['id'])
+        primary = related if isinstance(related, list) else [related] if related else []
+        return self._get_response(request, self._document(request, related, primary))
+
+    async def _relationship_handler(self, request: web.Request) -> web.Response:
+        type_, id_ = request.match_info['type'], request.match_info['id']
+        name = request.match_info['relationship']
+        res = self._get(type_, id_)
+        if res is None or name not in res['relationships']:
+            return self._error(404, f'Relationship {name} not found')
+        if request.method == 'PATCH':
+            res['relationships'][name] = (await request.json())['data']
+        elif request.method != 'GET':
+            return self._error(405, 'Method not allowed')
+        url = self._resource_url(type_, id_)
+        doc = {'data': res['relationships'][name],
+               'links': {'self': f'{url}/relationships/{name}',
+                         'related': f'{url}/{name}'}}
+        return self._get_response(request, doc)
+
+    async def _create(self, request: web.Request, type_: str,
+                      collection: Dict[str, dict]) -> web.Response:
+        data = (await request.json())['data']
+        id_ = data.get('id') or str(next(self._ids))
+        res = {'type': type_, 'id': id_, 'attributes': {}, 'relationships': {}}
+        self._update(res, data)
+        collection[id_] = res
+        return self._write_response(request, res, 201)
+
+    @staticmethod
+    def _update(res: dict, data: dict) -> None:
+        res['attributes'].update(data.get('attributes', {}))
+        for name, value in data.get('relationships', {}).items():
+            res['relationships'][name] = value['data']
+
+    def _write_response(self, request: web.Request, res: dict, status: int=200) \
+            -> web.Response:
+        if self.accepted_rate and self._random.random() < self.accepted_rate:
+            status = 202
+        return self._json_response(
+            {'data': self._serialize(res, {})}, status,
+            headers={'Location': self._resource_url(res['type'], res['id'])})
+
+    # Running
+
+    def app(self) -> web.Application:
+        """
+        Return aiohttp Application of this server.
+        """
+        app = web.Application(middlewares=[self._middleware])
+        prefix = self.url_prefix
+        app.router.add_route('*', prefix + '/{type}', self._collection_handler)
+        app.router.add_route('*', prefix + '/{type}/{id}', self._resource_handler)
+        app.router.add_route('*', prefix + '/{type}/{id}/relationships/{relationship}',
+                             self._relationship_handler)
+        app.router.add_route('*', prefix + '/{type}/{id}/{relationship}',
+                             self._related_handler)
+        return app
+
+    async def start(self, host: str='127.0.0.1', port: int=0) -> str:
+        """
+        Start serving in the running event loop. Return url of the api
+        (to be used as Session server_url).
+
+        :param port: Port to listen. By default, a free port is chosen.
+        """
+        self._runner = web.AppRunner(self.app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        host, port = self._runner.addresses[0][:2]
+        self.url = f'http://{host}:{port}{self.url_prefix}'
+        logger.info('Serving at %s', self.url)
+        return self.url
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    @contextmanager
+    def serve_in_thread(self, host: str='127.0.0.1', port: int=0) -> Iterator[str]:
+        """
+        Serve in a background thread with its own event loop (e.g. for testing
+        sync sessions). Yields url of the api.
+        """
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+        try:
+            yield asyncio.run_coroutine_threadsafe(self.start(host, port), loop).result()
+        finally:
+            asyncio.run_coroutine_threadsafe(self.stop(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+
+
+def main(args: List[str]=None) -> None:
+    parser = argparse.ArgumentParser(description='Stand-in JSON API server')
+    parser.add_argument('schema', nargs='?',
+                        help='Schema JSON file (default: jsonapi.org example schema)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--prefix', default='/api', help='Url path prefix')
+    parser.add_argument('--resources', type=int, default=100,
+                        help='Number of resources of each type')
+    parser.add_argument('--page-size', type=int, default=20)
+    parser.add_argument('--fan-out', type=int, default=3,
+                        help='Size of generated to-many relationships')
+    parser.add_argument('--latency', type=float, default=0., help='Latency in seconds')
+    parser.add_argument('--latency-jitter', type=float, default=0.)
+    parser.add_argument('--error-rate', type=float, default=0.)
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--accepted-rate', type=float, default=0.)
+    parser.add_argument('--seed', type=int, default=0)
+    options = parser.parse_args(args)
+
+    schema = None
+    if options.schema:
+        with open(options.schema) as f:
+            schema = json.load(f)
+    server = StandInServer(schema, resources=options.resources,
+                           page_size=options.page_size, fan_out=options.fan_out,
+                           url_prefix=options.prefix, latency=options.latency,
+                           latency_jitter=options.latency_jitter,
+                           error_rate=options.error_rate,
+                           error_status=options.error_status,
+                           accepted_rate=options.accepted_rate, seed=options.seed)
+    server.url = f'http://{options.host}:{options.port}{server.url_prefix}'
+    web.run_app(server.app(), host=options.host, port=options.port)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,88 @@
+"""
+JSON API Python client 
+https://github.com/qvantel/jsonapi-client
+
+(see JSON API specification in http://jsonapi.org/)
+
+Copyright (c) 2017, Qvantel
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the Qvantel nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL QVANTEL BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+
+from typing import Any
+
+try:
+    from opentelemetry import trace
+except ImportError:
+    trace = None
+
+
+class NoopSpan:
+    """
+    Span used when tracing is not available.
+    """
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+
+NOOP_SPAN = NoopSpan()
+
+
+class Tracer:
+    """
+    Creates tracing spans around fetching, parsing, relationship resolution and
+    commits. Spans are started as current span, so spans started within
+    another span (e.g. fetches made while resolving a relationship) become its
+    children.
+
+    :param tracer: OpenTelemetry compatible tracer (having start_as_current_span).
+        By default, tracer from opentelemetry global tracer provider is used if
+        opentelemetry is installed. Otherwise spans are no-ops.
+    """
+    def __init__(self, tracer=None) -> None:
+        if tracer is None and trace is not None:
+            tracer = trace.get_tracer('jsonapi_client')
+        self._tracer = tracer
+
+    @property
+    def enabled(self) -> bool:
+        return self._tracer is not None
+
+    def span(self, name: str, attributes: dict=None):
+        """
+        Return context manager for a new span, that yields the span.
+
+        :param name: Span name
+        :param attributes: Span attributes. Attributes with value None are left out.
+        """
+        if self._tracer is None:
+            return NOOP_SPAN
+        attributes = {k: v for k, v in (attributes or {}).items() if v is not None}
+        return self._tracer.start_as_current_span(name, attributes=attributes)
@@ -1,3 +1,5 @@
+import asyncio
+from asyncio import sleep as asyncio_sleep
 from unittest.mock import Mock
 from urllib.parse import urlparse
 
@@ -10,7 +12,7 @@ from jsonapi_client import ResourceTuple
 import jsonapi_client.objects
 import jsonapi_client.relationships
 import jsonapi_client.resourceobject
-from jsonapi_client.exceptions import DocumentError, AsyncError
+from jsonapi_client.exceptions import DocumentError, AsyncError, CommitError
 from jsonapi_client.filter import Filter
 from jsonapi_client.session import Session
 from unittest import mock
@@ -724,7 +726,7 @@ class SuccessfullResponse:
 
 
 def test_patching(mocker, mocked_fetch, api_schema, mock_update_resource):
-    mock_patch = mocker.patch('requests.request')
+    mock_patch = mocker.patch('requests.Session.request')
     mock_patch.return_value = SuccessfullResponse
 
     s = Session('http://localhost:80801/api', schema=api_schema)
@@ -780,7 +782,7 @@ def test_patching(mocker, mocked_fetch, api_schema, mock_update_resource):
     assert len(mock_patch.mock_calls) == 1
     d1.commit()
     assert len(mock_patch.mock_calls) == 2
-    actual_data = mock_patch.mock_calls[1][2]['json']['data']
+    actual_data = json.loads(mock_patch.mock_calls[1][2]['data'])['data']
     expected_data = {
         'id': 'qvantel-lease1',
         'type': 'leases',
@@ -1490,3 +1492,1343 @@ def test_relationship_manipulation_alternative_api(mock_req, mocked_fetch, artic
     mock_req.reset_mock()
 
     #assert article.relationships.comments.value == ['7', '6']
+
+
+def test_commit_parallel(mock_req, mocked_fetch, article_schema, mock_update_resource):
+    s = Session('http://localhost:80801/', schema=article_schema, commit_workers=4)
+    articles = s.get('articles').resources
+    for i, article in enumerate(articles):
+        article.title = f'Title {i}'
+    assert len(s.dirty_resources) == 3
+
+    s.commit()
+    assert mock_req.call_count == 3
+    ids = {call[0][2]['data']['id'] for call in mock_req.call_args_list}
+    assert ids == {'1', '2', '3'}
+    assert not s.is_dirty
+
+
+
+def test_commit_parallel_fresh_session(mocker):
+    import requests
+    import time
+    created = []
+
+    class CountingSession(requests.Session):
+        def __init__(self):
+            super().__init__()
+            created.append(self)
+            time.sleep(0.01)  # Widen the window for racing threads
+
+        def request(self, method, url, **kwargs):
+            time.sleep(0.01)
+            return MockResponse(204)
+
+    mocker.patch('requests.Session', CountingSession)
+    s = Session('http://localhost:8080/api', commit_workers=4)
+    doc = s.read({'data': [{'type': 'articles', 'id': str(i), 'attributes': {'title': ''}}
+                           for i in range(8)]}, 'http://localhost:8080/api/articles')
+    for article in doc.resources:
+        article.title = 'Changed'
+    s.commit()
+    assert not s.is_dirty
+    assert len(created) == 1
+    s.close()
+
+def test_commit_parallel_failures(mock_req, mocked_fetch, article_schema, mock_update_resource):
+    def http_request(http_method, url, send_json):
+        if send_json['data']['id'] == '2':
+            raise DocumentError('Conflict', errors={'status_code': 409})
+        return 201, {}, 'location'
+    mock_req.side_effect = http_request
+
+    s = Session('http://localhost:80801/', schema=article_schema, commit_workers=4)
+    articles = s.get('articles').resources
+    for article in articles:
+        article.title = 'New title'
+
+    with pytest.raises(CommitError) as e:
+        s.commit()
+    assert mock_req.call_count == 3
+    assert len(e.value.committed) == 2
+    [(failed_resource, exc)] = e.value.failures
+    assert failed_resource.id == '2'
+    assert exc.errors['status_code'] == 409
+    assert s.dirty_resources == {failed_resource}
+
+
+def test_thread_safe_session(mocker, article_schema):
+    import threading
+    import time
+    fetched_urls = []
+
+    def fetch_json(url):
+        fetched_urls.append(url)
+        time.sleep(0.01)
+        parsed_url = urlparse(url)
+        return load(parsed_url.path[1:])
+
+    mocker.patch('jsonapi_client.session.Session._fetch_json', side_effect=fetch_json)
+    s = Session('http://localhost:8080', schema=article_schema, thread_safe=True)
+    comment = s.get('articles').resource.comments[0]
+
+    authors = []
+    barrier = threading.Barrier(8)
+
+    def worker():
+        barrier.wait()
+        authors.append(comment.author)
+        authors.append(s.get('articles').resource.comments[0].author)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(authors) == 16
+    assert all(a is authors[0] for a in authors)
+    assert authors[0].first_name == 'Dan 2'
+    assert fetched_urls == ['http://localhost:8080/articles',
+                            'http://localhost:8080/people/2']
+
+
+
+def test_single_fetch_lock_kept_for_waiters():
+    import threading
+    import time
+    s = Session('http://localhost:8080', thread_safe=True)
+    inside = threading.Semaphore(0)
+    done = {'a': threading.Event(), 'b': threading.Event()}
+    order = []
+
+    def fetch(name):
+        with s._single_fetch('key'):
+            order.append(name)
+            inside.release()
+            done[name].wait(5)
+
+    a = threading.Thread(target=fetch, args=('a',))
+    a.start()
+    inside.acquire(timeout=5)
+    b = threading.Thread(target=fetch, args=('b',))
+    b.start()
+    while s._fetch_locks['key'][1] < 2:
+        time.sleep(0.001)
+    done['a'].set()
+    a.join()
+    inside.acquire(timeout=5)
+    # b still holds the lock, so a new caller has to wait for it
+    assert s._fetch_locks['key'][0].locked()
+    c = threading.Thread(target=fetch, args=('c',))
+    done['c'] = threading.Event()
+    c.start()
+    time.sleep(0.05)
+    assert order == ['a', 'b']
+    done['b'].set()
+    done['c'].set()
+    b.join()
+    c.join()
+    assert order == ['a', 'b', 'c']
+    assert not s._fetch_locks
+
+def test_shared_cache(mocker, article_schema, mock_req, mock_update_resource):
+    from jsonapi_client import SharedCache
+    fetch_json = mocker.patch('jsonapi_client.session.Session._fetch_json',
+                              side_effect=lambda url: load(urlparse(url).path[1:]))
+    cache = SharedCache()
+    s1 = Session('http://localhost:8080', schema=article_schema, shared_cache=cache)
+    article1 = s1.get('articles').resource
+    assert fetch_json.call_count == 1
+    assert cache.misses == 1
+
+    s2 = Session('http://localhost:8080', schema=article_schema, shared_cache=cache)
+    article2 = s2.get('articles').resource
+    assert fetch_json.call_count == 1
+    assert cache.hits == 1
+    assert article2 is not article1
+    assert article2.title == article1.title
+
+    # Resources are served also by resource identifier
+    s3 = Session('http://localhost:8080', schema=article_schema, shared_cache=cache)
+    comment_id = jsonapi_client.objects.ResourceIdentifier(s3, {'id': '5', 'type': 'comments'})
+    comment = s3.fetch_resource_by_resource_identifier(comment_id)
+    assert comment.body == 'First!'
+    assert fetch_json.call_count == 1
+
+    # Modifications do not leak between sessions
+    article2.title = 'Changed'
+    assert article1.title != 'Changed'
+    assert not s1.is_dirty
+    assert s2.is_dirty
+
+    # Committed resource and documents containing it are dropped from shared cache
+    s2.commit()
+    s4 = Session('http://localhost:8080', schema=article_schema, shared_cache=cache)
+    s4.get('articles')
+    assert fetch_json.call_count == 2
+
+
+def test_shared_cache_eviction():
+    from jsonapi_client import SharedCache
+    cache = SharedCache(max_size=3)
+    data = load('articles')
+    cache.put_document('http://localhost:8080/articles', data)
+    assert len(cache) == 3
+    assert cache.evictions == 4
+    assert cache.get_document('http://localhost:8080/articles') is None
+    assert cache.get_resource('articles', '1') is None
+    assert cache.get_resource('people', '9')['attributes']['first-name'] == 'Dan'
+    assert cache.stats()['hit_rate'] == 1 / 3
+
+
+def test_shared_cache_index_cleanup(mocker):
+    from jsonapi_client import SharedCache
+    now = mocker.patch('time.monotonic', return_value=100.)
+    cache = SharedCache(max_size=5, ttl=10)
+    for i in range(50):
+        cache.put_document(f'http://localhost:8080/articles/{i}',
+                           {'data': {'type': 'articles', 'id': str(i),
+                                     'attributes': {'title': str(i)}}})
+    # Evicted documents are removed from the resource index
+    assert len(cache._resources_by_document) <= 5
+    assert len(cache._documents_by_resource) <= 5
+    assert cache.get_document('http://localhost:8080/articles/49') is not None
+
+    now.return_value = 200.
+    for i in range(45, 50):
+        assert cache.get_document(f'http://localhost:8080/articles/{i}') is None
+    assert not cache._resources_by_document
+    assert not cache._documents_by_resource
+
+
+class MockResponse:
+    def __init__(self, status_code, json_data=None, headers=None):
+        self.status_code = self.status = status_code
+        self._json_data = json_data
+        self.headers = headers or {}
+        self.content = json.dumps(json_data).encode() if json_data is not None else b''
+        self.closed = False
+
+    def json(self):
+        return self._json_data
+
+    def close(self):
+        self.closed = True
+
+
+class MockResponseAsync(MockResponse):
+    async def read(self):
+        return self.content
+
+    async def json(self, content_type=None):
+        return self._json_data
+
+    def release(self):
+        self.closed = True
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+
+def test_retry(mocker):
+    from jsonapi_client.retry import RetryPolicy
+    sleep = mocker.patch('time.sleep')
+    request = mocker.patch('requests.Session.request')
+    request.side_effect = [MockResponse(503),
+                           MockResponse(429, headers={'Retry-After': '7'}),
+                           MockResponse(200, load('articles'))]
+    policy = RetryPolicy(attempts=3, backoff_factor=1, jitter=0)
+    s = Session('http://localhost:8080', retry=policy)
+    doc = s.get('articles')
+    assert len(doc.resources) == 3
+    assert request.call_count == 3
+    assert [c[0][0] for c in sleep.call_args_list] == [1, 7]
+    assert policy.retries == 2
+    assert policy.retries_by_reason == {'503': 1, '429': 1}
+
+    request.side_effect = [MockResponse(503)] * 3
+    with pytest.raises(DocumentError) as e:
+        s.get('people')
+    assert e.value.errors['status_code'] == 503
+    assert policy.exhausted == 1
+    assert policy.retries == 4
+
+
+def test_retry_post_not_retried(mocker):
+    from jsonapi_client.retry import RetryPolicy
+    mocker.patch('time.sleep')
+    request = mocker.patch('requests.Session.request')
+    request.side_effect = [MockResponse(503), MockResponse(201, {})]
+    s = Session('http://localhost:8080', retry=RetryPolicy())
+    with pytest.raises(DocumentError):
+        s.http_request('post', 'http://localhost:8080/articles', {})
+    assert request.call_count == 1
+
+    request.side_effect = [MockResponse(503), MockResponse(201, {})]
+    s = Session('http://localhost:8080', retry=RetryPolicy(retry_post=True))
+    assert s.http_request('post', 'http://localhost:8080/articles', {})[0] == 201
+    assert request.call_count == 3
+
+
+def test_retry_delay():
+    from jsonapi_client.retry import RetryPolicy
+    policy = RetryPolicy(backoff_factor=1, max_backoff=5, jitter=0.5)
+    for attempt, full_delay in [(1, 1), (2, 2), (3, 4), (4, 5)]:
+        delay = policy.delay(attempt)
+        assert full_delay / 2 <= delay <= full_delay
+    assert policy.delay(1, 'Wed, 21 Oct 2015 07:28:00 GMT') == 0
+    assert policy.delay(1, '500') == policy.max_retry_after
+
+
+@pytest.mark.asyncio
+async def test_retry_async(mocker):
+    from jsonapi_client.retry import RetryPolicy
+    sleep = mocker.patch('asyncio.sleep')
+    sleep.side_effect = lambda delay: asyncio_sleep(0)
+    responses = [MockResponseAsync(502), MockResponseAsync(200, load('articles'))]
+
+    async def request(*args, **kwargs):
+        return responses.pop(0)
+
+    policy = RetryPolicy(backoff_factor=1, jitter=0)
+    s = Session('http://localhost:8080', enable_async=True, retry=policy)
+    mocker.patch.object(s._aiohttp_session, 'request', side_effect=request)
+    doc = await s.get('articles')
+    assert len(doc.resources) == 3
+    assert policy.retries_by_reason == {'502': 1}
+    sleep.assert_called_once_with(1)
+    s.close()
+
+
+def test_rate_limiter():
+    from jsonapi_client.ratelimit import RateLimiter
+    limiter = RateLimiter(read_rate=(10, 2), host_write_rate=(1, 1))
+    assert limiter.reserve('get', 'http://a/x') == 0
+    assert limiter.reserve('get', 'http://b/x') == 0
+    assert limiter.reserve('get', 'http://a/x') == pytest.approx(0.1, abs=0.01)
+    assert limiter.delayed == 1
+
+    assert limiter.reserve('patch', 'http://a/x') == 0
+    assert limiter.reserve('post', 'http://b/x') == 0
+    assert limiter.reserve('delete', 'http://a/x') == pytest.approx(1, abs=0.01)
+
+
+def test_rate_limited_session(mocker):
+    from jsonapi_client.ratelimit import RateLimiter
+    sleep = mocker.patch('time.sleep')
+    request = mocker.patch('requests.Session.request')
+    request.side_effect = lambda method, url, **kwargs: MockResponse(200, load('articles'))
+    s = Session('http://localhost:8080', rate_limit=RateLimiter(rate=(5, 1)))
+    s.get('articles')
+    sleep.assert_not_called()
+    s.get('articles', Filter(title='x'))
+    [(delay,), _] = sleep.call_args
+    assert delay == pytest.approx(0.2, abs=0.01)
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_session_async(mocker):
+    from jsonapi_client.ratelimit import RateLimiter
+    sleep = mocker.patch('asyncio.sleep')
+    sleep.side_effect = lambda delay: asyncio_sleep(0)
+
+    async def request(*args, **kwargs):
+        return MockResponseAsync(200, load('articles'))
+
+    s = Session('http://localhost:8080', enable_async=True,
+                rate_limit=RateLimiter(host_read_rate=(5, 1)))
+    mocker.patch.object(s._aiohttp_session, 'request', side_effect=request)
+    await s.get('articles')
+    await s.get('articles', Filter(title='x'))
+    assert sleep.call_count == 1
+    s.close()
+
+
+def test_circuit_breaker(mocker):
+    from jsonapi_client.circuitbreaker import CircuitBreaker, CircuitState
+    from jsonapi_client.exceptions import CircuitOpenError
+    now = mocker.patch('time.monotonic', return_value=100.)
+    changes = []
+    breaker = CircuitBreaker(failure_threshold=2, window=10, recovery_timeout=30)
+    breaker.add_listener(lambda *args: changes.append(args))
+
+    breaker.record_failure('a')
+    now.return_value = 111.
+    breaker.record_failure('a')  # first failure is outside of window
+    assert breaker.state('a') == CircuitState.CLOSED
+    breaker.record_failure('a')
+    assert breaker.state('a') == CircuitState.OPEN
+    with pytest.raises(CircuitOpenError) as e:
+        breaker.before_request('a')
+    assert e.value.retry_after == 30
+    breaker.before_request('b')
+
+    now.return_value = 141.
+    breaker.before_request('a')  # probe
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request('a')
+    breaker.record_failure('a')
+    assert breaker.state('a') == CircuitState.OPEN
+
+    now.return_value = 171.
+    breaker.before_request('a')
+    breaker.record_success('a')
+    assert breaker.states() == {'a': CircuitState.CLOSED, 'b': CircuitState.CLOSED}
+    assert changes == [('a', 'closed', 'open'), ('a', 'open', 'half-open'),
+                       ('a', 'half-open', 'open'), ('a', 'open', 'half-open'),
+                       ('a', 'half-open', 'closed')]
+
+
+def test_circuit_breaker_session(mocker):
+    from jsonapi_client.circuitbreaker import CircuitBreaker
+    from jsonapi_client.exceptions import CircuitOpenError
+    request = mocker.patch('requests.Session.request')
+    request.side_effect = lambda method, url, **kwargs: (
+        MockResponse(503) if '/people' in url else MockResponse(200, load('articles')))
+    s = Session('http://localhost:8080/api',
+                circuit_breaker=CircuitBreaker(failure_threshold=2))
+    for _ in range(2):
+        with pytest.raises(DocumentError):
+            s.get('people', '1')
+    with pytest.raises(CircuitOpenError) as e:
+        s.get('people', '2')
+    assert e.value.endpoint == ('localhost:8080', 'people')
+    assert request.call_count == 2
+    s.get('articles')
+    assert request.call_count == 3
+
+
+def test_circuit_breaker_counts_only_transport_errors(mocker):
+    import requests
+    from jsonapi_client.circuitbreaker import CircuitBreaker, CircuitState
+    now = mocker.patch('time.monotonic', return_value=100.)
+    request = mocker.patch('requests.Session.request')
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=30)
+    s = Session('http://localhost:8080/api', circuit_breaker=breaker)
+    endpoint = ('localhost:8080', 'people')
+
+    # Programming errors, interrupts and non-retryable statuses are not failures
+    for error in [requests.exceptions.InvalidURL('bad'), KeyboardInterrupt()]:
+        request.side_effect = error
+        with pytest.raises(type(error)):
+            s.get('people', '1')
+    request.side_effect = [MockResponse(500)]
+    with pytest.raises(DocumentError):
+        s.get('people', '1')
+    assert breaker.state(endpoint) == CircuitState.CLOSED
+
+    request.side_effect = requests.ConnectionError('refused')
+    with pytest.raises(requests.ConnectionError):
+        s.get('people', '1')
+    assert breaker.state(endpoint) == CircuitState.OPEN
+
+    # Cancelled half-open probe does not reopen the circuit, and frees the probe
+    now.return_value = 131.
+    request.side_effect = KeyboardInterrupt()
+    with pytest.raises(KeyboardInterrupt):
+        s.get('people', '1')
+    assert breaker.state(endpoint) == CircuitState.HALF_OPEN
+    request.side_effect = [MockResponse(200, load('people/2'))]
+    s.get('people', '2')
+    assert breaker.state(endpoint) == CircuitState.CLOSED
+
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_cancelled_async(mocker):
+    import aiohttp
+    from jsonapi_client.circuitbreaker import CircuitBreaker, CircuitState
+    breaker = CircuitBreaker(failure_threshold=1)
+    endpoint = ('localhost:8080', 'articles')
+    errors = [asyncio.CancelledError(), aiohttp.ClientConnectionError('refused')]
+
+    async def request(*args, **kwargs):
+        raise errors.pop(0)
+
+    s = Session('http://localhost:8080', enable_async=True, circuit_breaker=breaker)
+    mocker.patch.object(s._aiohttp_session, 'request', side_effect=request)
+    with pytest.raises(asyncio.CancelledError):
+        await s.get('articles')
+    assert breaker.state(endpoint) == CircuitState.CLOSED
+    with pytest.raises(aiohttp.ClientConnectionError):
+        await s.get('articles')
+    assert breaker.state(endpoint) == CircuitState.OPEN
+    await s._aiohttp_session.close()
+
+def test_timeout_and_deadline(mocker):
+    from jsonapi_client.exceptions import DeadlineExceeded
+    request = mocker.patch('requests.Session.request')
+    request.side_effect = lambda method, url, **kwargs: MockResponse(200, load('articles'))
+    s = Session('http://localhost:8080', timeout=(3, 10))
+    s.get('articles')
+    assert request.call_args[1]['timeout'] == (3, 10)
+
+    now = mocker.patch('time.monotonic', return_value=100.)
+    with s.deadline(5) as d:
+        assert d.expires_at == 105
+        now.return_value = 102.
+        s.get('articles', Filter(title='1'))
+        assert request.call_args[1]['timeout'] == (3, 3)
+        with s.deadline(10):
+            s.get('articles', Filter(title='2'))
+            assert request.call_args[1]['timeout'] == (3, 3)
+        now.return_value = 106.
+        with pytest.raises(DeadlineExceeded):
+            s.get('articles', Filter(title='3'))
+    assert request.call_count == 3
+    s.get('articles', Filter(title='4'))
+    assert request.call_args[1]['timeout'] == (3, 10)
+
+
+def test_deadline_stops_retrying(mocker):
+    from jsonapi_client.exceptions import DeadlineExceeded
+    from jsonapi_client.retry import RetryPolicy
+    sleep = mocker.patch('time.sleep')
+    request = mocker.patch('requests.Session.request')
+    request.return_value = MockResponse(503, headers={'Retry-After': '30'})
+    s = Session('http://localhost:8080', retry=RetryPolicy())
+    with pytest.raises(DeadlineExceeded):
+        with s.deadline(10):
+            s.get('articles')
+    assert request.call_count == 1
+    sleep.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_deadline_async(mocker):
+    import asyncio
+    from jsonapi_client.exceptions import DeadlineExceeded
+    started = []
+
+    async def request(*args, **kwargs):
+        started.append(args[1])
+        await asyncio.sleep(10)
+
+    s = Session('http://localhost:8080', enable_async=True)
+    mocker.patch.object(s._aiohttp_session, 'request', side_effect=request)
+    with pytest.raises(DeadlineExceeded):
+        async with s.deadline(0.05):
+            await asyncio.gather(s.get('articles'), s.get('people'))
+    assert len(started) == 2
+
+    with pytest.raises(DeadlineExceeded):
+        async with s.deadline(0.05):
+            await asyncio.shield(s.get('comments'))
+    s.close()
+
+
+
+@pytest.mark.asyncio
+async def test_deadline_async_client_timeout(mocker):
+    import aiohttp
+    timeouts = []
+
+    async def request(*args, **kwargs):
+        timeouts.append(kwargs['timeout'])
+        return MockResponseAsync(200, load('articles'))
+
+    client_timeout = aiohttp.ClientTimeout(total=60, sock_read=30)
+    s = Session('http://localhost:8080', enable_async=True,
+                request_kwargs={'timeout': client_timeout})
+    mocker.patch.object(s._aiohttp_session, 'request', side_effect=request)
+    await s.get('articles')
+    async with s.deadline(5):
+        await s.get('people')
+    assert timeouts[0] is client_timeout
+    assert isinstance(timeouts[1], aiohttp.ClientTimeout)
+    assert 0 < timeouts[1].total <= 5 and 0 < timeouts[1].sock_read <= 5
+    assert timeouts[1].connect is None
+    await s._aiohttp_session.close()
+
+def test_compression(mocker):
+    import gzip
+    request = mocker.patch('requests.Session.request')
+    s = Session('http://localhost:8080', compress_threshold=100)
+
+    request.return_value = MockResponse(200, {}, headers={'Content-Encoding': 'gzip',
+                                                          'Content-Length': '20'})
+    small = {'data': {'type': 'articles', 'attributes': {'title': 'short'}}}
+    s.http_request('post', 'http://localhost:8080/articles', small)
+    kwargs = request.call_args[1]
+    assert 'Content-Encoding' not in kwargs['headers']
+    assert json.loads(kwargs['data']) == small
+    assert 'gzip' in kwargs['headers']['Accept-Encoding']
+
+    large = {'data': {'type': 'articles', 'attributes': {'title': 'long' * 100}}}
+    s.http_request('patch', 'http://localhost:8080/articles/1', large)
+    kwargs = request.call_args[1]
+    assert kwargs['headers']['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(kwargs['data'])) == large
+
+    # DELETE is never compressed
+    s.http_request('delete', 'http://localhost:8080/articles/1', large)
+    assert 'Content-Encoding' not in request.call_args[1]['headers']
+
+    stats = s.transfer_stats
+    raw_size = len(json.dumps(small)) + 2 * len(json.dumps(large))
+    assert stats.bytes_out_uncompressed == raw_size
+    assert stats.bytes_out < raw_size - 300
+    assert stats.bytes_in == 3 * 20
+    assert stats.bytes_in_uncompressed == 3 * len(b'{}')
+
+
+def test_hooks(mocker, article_schema):
+    from jsonapi_client.hooks import Event
+    request = mocker.patch('requests.Session.request')
+    request.side_effect = [MockResponse(200, load('articles'))]
+    s = Session('http://localhost:8080/api', schema=article_schema)
+    events = []
+    for event in Event.ALL:
+        s.on(event, lambda event, **info: events.append((event, info)))
+
+    doc = s.get('articles', Filter(title='Dippadai'))
+    assert [e for e, info in events if e.startswith('request')] == \
+        ['request_start', 'request_end']
+    info = next(info for e, info in events if e == Event.REQUEST_END)
+    assert info['method'] == 'get'
+    assert info['url_template'] == '/api/articles?filter[title]'
+    assert info['status'] == 200
+    assert info['bytes'] == len(json.dumps(load('articles')))
+    assert info['latency'] >= 0
+    parsed = next(info for e, info in events if e == Event.DOCUMENT_PARSED)
+    assert parsed['resources'] == 6  # 3 articles and 3 included resources
+    assert sum(e == Event.VALIDATE for e, info in events) == 6
+
+    events.clear()
+    s.fetch_document_by_url(doc.url)
+    s.fetch_resource_by_resource_identifier(ResourceTuple('1', 'articles'))
+    s.fetch_resource_by_resource_identifier(ResourceTuple('99', 'people'), cache_only=True)
+    assert [(e, info['kind']) for e, info in events] == \
+        [('cache_hit', 'document'), ('cache_hit', 'resource'), ('cache_miss', 'resource')]
+
+    events.clear()
+    s.invalidate()
+    assert events == [('cache_eviction', {'kind': 'all', 'key': None, 'count': 6})]
+
+    # Failing hooks do not break requests
+    s.on(Event.REQUEST_START, Mock(side_effect=RuntimeError))
+    request.side_effect = [MockResponse(200, load('articles'))]
+    assert len(s.get('articles').resources) == 3
+
+    with pytest.raises(ValueError):
+        s.on('unknown', print)
+
+
+def test_url_template():
+    s = Session('http://localhost:8080/api')
+    assert s.url_template('http://localhost:8080/api/articles') == '/api/articles'
+    assert s.url_template('http://localhost:8080/api/articles/1/relationships/author') == \
+        '/api/articles/{id}/relationships/author'
+    assert s.url_template('http://localhost:8080/api/articles?include=author'
+                          '&page[number]=2&page[size]=10&include=comments') == \
+        '/api/articles?include&page[number]&page[size]'
+
+
+def test_tracing(mocker):
+    sdk_trace = pytest.importorskip('opentelemetry.sdk.trace')
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+    exporter = InMemorySpanExporter()
+    provider = sdk_trace.TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    request = mocker.patch('requests.Session.request')
+    request.return_value = MockResponse(200, load('people/2'))
+
+    s = Session('http://localhost:8080', tracer=provider.get_tracer('test'))
+    doc = s.read({'data': {'type': 'articles', 'id': '1', 'attributes': {},
+                           'relationships': {'author': {'data': {'type': 'people',
+                                                                 'id': '2'}}}}})
+    assert doc.resource.author.type == 'people'
+
+    spans = {span.name: span for span in exporter.get_finished_spans()}
+    relationship = spans['jsonapi.relationship.fetch']
+    fetch = spans['jsonapi.fetch']
+    assert fetch.parent.span_id == relationship.context.span_id
+    assert fetch.attributes['http.route'] == '/people/{id}'
+    assert fetch.attributes['http.status_code'] == 200
+    assert [span.name for span in exporter.get_finished_spans()
+            if span.parent and span.parent.span_id == relationship.context.span_id] == \
+        ['jsonapi.fetch', 'jsonapi.parse']
+
+
+def test_testserver():
+    from jsonapi_client import Inclusion
+    from jsonapi_client.testserver import StandInServer, EXAMPLE_SCHEMA
+    server = StandInServer(resources=30, page_size=7)
+    with server.serve_in_thread() as url:
+        s = Session(url, schema=EXAMPLE_SCHEMA)
+        articles = list(s.iterate('articles'))
+        assert len(articles) == 30
+        assert articles[0].title == 'title 1'
+        assert articles[0].author.type == 'people'
+        assert len(articles[0].comments) == 3
+
+        doc = s.get('articles', Inclusion('author', 'comments'))
+        assert len(doc.resources) == 7
+        assert {r.type for r in doc.included} == {'people', 'comments'}
+        assert [r.id for r in s.get('articles', Filter(id='2,3')).resources] == ['2', '3']
+
+        articles[1].title = 'Changed'
+        articles[1].commit()
+        person = s.create_and_commit('people', first_name='New', last_name='Person')
+        assert person.id == '31'
+        assert server.requests['PATCH'] == 1
+        assert server.requests['POST'] == 1
+        s.close()
+
+        s = Session(url)
+        assert s.get('articles', '2').resource.title == 'Changed'
+        s.close()
+
+
+@pytest.mark.asyncio
+async def test_testserver_async():
+    from jsonapi_client.exceptions import DocumentError
+    from jsonapi_client.testserver import StandInServer
+    server = StandInServer(resources=10, latency=0.01, error_rate=0.5, seed=1)
+    url = await server.start()
+    s = Session(url, enable_async=True)
+    results = await asyncio.gather(*[s.get('people', str(i)) for i in range(1, 11)],
+                                   return_exceptions=True)
+    errors = [r for r in results if isinstance(r, DocumentError)]
+    assert len(errors) == server.errors > 0
+    assert errors[0].errors['status_code'] == 503
+    assert server.max_concurrency > 1
+    await s._aiohttp_session.close()
+    await server.stop()
+
+
+def test_profiling():
+    from jsonapi_client.testserver import StandInServer, EXAMPLE_SCHEMA
+    server = StandInServer(resources=10, page_size=5)
+    with server.serve_in_thread() as url:
+        s = Session(url, schema=EXAMPLE_SCHEMA, profile=True)
+        authors = set()
+        for article in s.iterate('articles'):
+            authors.add(article.author.id)
+        article.title = 'Changed'
+        article.commit()
+
+        report = s.profile_report()
+        requests = report['requests']['by_url_template']
+        assert requests['GET /api/articles']['count'] == 1
+        assert requests['GET /api/articles?page[number]&page[size]']['count'] == 1
+        assert report['requests']['by_resource_type']['people']['count'] == len(authors)
+        assert report['documents']['/api/articles']['resources'] == 5
+        assert report['documents']['/api/articles']['validate']['count'] == 1
+        assert report['commits']['PATCH articles']['count'] == 1
+        assert report['relationship_fetches']['articles.author'] == 10
+        assert report['cprofile'] == []
+
+        with s.profile(cprofile=True) as profiler:
+            s.get('people')
+        assert list(profiler.report()['documents']) == ['/api/people']
+        assert any('_handle_data' in row['function']
+                   for row in profiler.report()['cprofile'])
+        assert profiler.requests_by_resource_type['people'].percentile(50) > 0
+
+        # Profiler of the session is resumed
+        s.get('comments')
+        report = s.profile_report()
+        assert '/api/people' not in report['documents']
+        assert '/api/comments' in report['documents']
+        assert report['commits']['PATCH articles']['count'] == 1
+        s.close()
+
+        s = Session(url, schema=EXAMPLE_SCHEMA)
+        with s.profile(cprofile=True):
+            s.get('people')
+        report = s.profile_report()
+        assert list(report['documents']) == ['/api/people']
+        # Profiling stops when the context ends
+        assert s.profiler is None
+        s.get('comments')
+        assert s.profile_report() == report
+        s.close()
+
+
+def test_n_plus_one_detector(caplog):
+    from jsonapi_client import Inclusion
+    from jsonapi_client.exceptions import NPlusOneError
+    from jsonapi_client.nplusone import NPlusOneDetector
+    from jsonapi_client.testserver import StandInServer, EXAMPLE_SCHEMA
+    server = StandInServer(resources=10, page_size=10)
+    with server.serve_in_thread() as url:
+        detector = NPlusOneDetector(threshold=3)
+        s = Session(url, schema=EXAMPLE_SCHEMA, n_plus_one=detector)
+        doc = s.get('articles')
+        for article in doc.resources:
+            article.comments
+        assert detector.detections == {'articles.comments': 1}
+        assert 'Inclusion(\'comments\')' in caplog.text
+
+        # Included resources are not fetched separately
+        s = Session(url, schema=EXAMPLE_SCHEMA, n_plus_one=NPlusOneDetector(threshold=3))
+        for article in s.get('articles', Inclusion('author')).resources:
+            article.author
+        assert not s.n_plus_one.detections
+
+        s = Session(url, schema=EXAMPLE_SCHEMA,
+                    n_plus_one=NPlusOneDetector(threshold=3, strict=True))
+        with pytest.raises(NPlusOneError) as e:
+            for article in s.get('articles').resources:
+                article.comments
+        assert e.value.relationship == 'comments'
+        assert e.value.document.url == f'{url}/articles'
+
+
+@pytest.mark.parametrize('include', [True, False])
+def test_prefetch(include):
+    from jsonapi_client.testserver import StandInServer, EXAMPLE_SCHEMA
+    server = StandInServer(resources=10, page_size=5, include=include)
+    with server.serve_in_thread() as url:
+        s = Session(url, schema=EXAMPLE_SCHEMA)
+        doc = s.get('articles', prefetch=['author', 'comments.author'])
+        assert len(doc.resources) == 5
+        requests = sum(server.requests.values())
+        # Without include: one filter[id] request per type and level
+        assert requests == (1 if include else 4)
+        for article in doc.resources:
+            assert article.author.type == 'people'
+            for comment in article.comments:
+                assert comment.author.type == 'people'
+        assert sum(server.requests.values()) == requests
+
+        s = Session(url, schema=EXAMPLE_SCHEMA)
+        s.prefetch_batch_size = 2
+        articles = list(s.iterate('articles', prefetch='author'))
+        assert len(articles) == 10
+        requests = sum(server.requests.values())
+        assert all(article.author for article in articles)
+        assert sum(server.requests.values()) == requests
+
+
+def test_prefetch_async():
+    from jsonapi_client.testserver import StandInServer, EXAMPLE_SCHEMA
+    server = StandInServer(resources=10, page_size=5, include=False)
+
+    async def run():
+        await server.start()
+        try:
+            s = Session(server.url, schema=EXAMPLE_SCHEMA, enable_async=True)
+            doc = await s.get('articles', prefetch=['comments.author'])
+            requests = sum(server.requests.values())
+            assert requests == 3
+            for article in doc.resources:
+                for comment in await article.comments.fetch():
+                    assert (await comment.author.fetch())[0].type == 'people'
+            assert sum(server.requests.values()) == requests
+            await s._aiohttp_session.close()
+        finally:
+            await server.stop()
+    asyncio.run(run())
+
+
+
+def test_sparse_fields_shared_cache():
+    from jsonapi_client import Inclusion, SharedCache, SparseFields
+    from jsonapi_client.testserver import StandInServer, EXAMPLE_SCHEMA
+    server = StandInServer(resources=5)
+    with server.serve_in_thread() as url:
+        cache = SharedCache()
+        s1 = Session(url, schema=EXAMPLE_SCHEMA, shared_cache=cache)
+        modifier = Inclusion('author') + SparseFields(people='first-name')
+        doc = s1.get('articles', modifier)
+        assert doc.resources[0].author.is_partial
+
+        # Partially fetched resources are not served as complete ones
+        s2 = Session(url, schema=EXAMPLE_SCHEMA, shared_cache=cache)
+        author = s2.get('articles').resources[0].author
+        assert not author.is_partial
+        assert author.last_name == doc.resources[0].author.last_name
+
+        # Sparse document itself is cached, and read as partial
+        s3 = Session(url, schema=EXAMPLE_SCHEMA, shared_cache=cache)
+        requests = server.requests['GET']
+        assert s3.get('articles', modifier).resources[0].author.is_partial
+        assert server.requests['GET'] == requests
+
+def test_sparse_fields():
+    from jsonapi_client import Inclusion, Filter, SparseFields
+    from jsonapi_client.testserver import StandInServer, EXAMPLE_SCHEMA
+    assert (SparseFields(articles=['title', 'author'], people='first_name')
+            .url_with_modifiers('articles')
+            == 'articles?fields[articles]=author,title&fields[people]=first-name')
+    modifier = Filter(title='x') + Inclusion('author') + SparseFields(articles='title')
+    assert (modifier.url_with_modifiers('articles')
+            == 'articles?fields[articles]=title&filter[title]=x&include=author')
+
+    server = StandInServer(resources=10, page_size=5)
+    with server.serve_in_thread() as url:
+        s = Session(url, schema=EXAMPLE_SCHEMA)
+        doc = s.get('articles', Inclusion('author')
+                    + SparseFields(articles=['title', 'author'], people='first-name'))
+        requests = sum(server.requests.values())
+        article = doc.resources[0]
+        assert article.is_partial
+        assert article.title == 'title 1'
+        assert list(article._attributes) == ['title']
+        author = article.author
+        assert author.is_partial
+        article.title = 'changed'
+        assert sum(server.requests.values()) == requests
+
+        # All partial articles of the document are completed in one request
+        assert len(article.relationships.comments.resource_identifiers) == 3
+        assert sum(server.requests.values()) == requests + 1
+        assert not any(res.is_partial for res in doc.resources)
+        assert article.title == 'changed'
+        assert article._attributes.diff == {'title': 'changed'}
+        assert s.resources_by_resource_identifier[('articles', article.id)] is article
+
+        assert author.last_name == f'last-name {author.id}'
+        assert not author.is_partial
+        assert sum(server.requests.values()) == requests + 2
+
+
+def test_commit_patch_response_without_location(mocker):
+    request = mocker.patch('requests.Session.request')
+    article = {'type': 'articles', 'id': '1', 'attributes': {'title': 'old'}}
+    updated = {'type': 'articles', 'id': '1', 'attributes': {'title': 'new'}}
+    request.side_effect = [MockResponse(200, {'data': article}),
+                           MockResponse(200, {'data': updated})]
+    s = Session('http://localhost:8080/api')
+    res = s.get('articles', '1').resource
+    res.title = 'new'
+    res.commit()
+    assert request.call_args[0][0] == 'patch'
+    assert res.title == 'new'
+    assert not res.is_dirty
+
+
+def test_canonical_modifiers():
+    from jsonapi_client import Inclusion, Filter, SparseFields
+    from jsonapi_client.testserver import StandInServer, EXAMPLE_SCHEMA
+    f1 = Filter(title='a b/c', id=['3', '1', '2'])
+    f2 = Filter(id=('1', '2', '3'), title='a b/c')
+    assert f1.appended_query() == 'filter[id]=1,2,3&filter[title]=a%20b%2Fc'
+    assert f1 == f2 and hash(f1) == hash(f2)
+    assert Filter(published=True).appended_query() == 'filter[published]=true'
+    assert Inclusion('b', 'a', 'b') == Inclusion('a', 'b')
+    assert (Filter(title='x') + Inclusion('author')
+            == Inclusion('author') + Filter(title='x'))
+    assert len({f1, f2, Inclusion('a'), Inclusion('a')}) == 2
+    f1.appended_query()
+    with pytest.raises(AttributeError):
+        f1._filter_kwargs = {}
+
+    server = StandInServer(resources=10, page_size=5)
+    with server.serve_in_thread() as url:
+        s = Session(url, schema=EXAMPLE_SCHEMA)
+        s.get('articles', Inclusion('author', 'comments') + SparseFields(articles='title'))
+        requests = sum(server.requests.values())
+        s.get('articles', SparseFields(articles=['title']) + Inclusion('comments', 'author'))
+        assert sum(server.requests.values()) == requests
+
+
+def test_normalize_url():
+    from jsonapi_client.common import normalize_url
+    from jsonapi_client.testserver import StandInServer
+    assert (normalize_url('HTTP://Example.COM:80/api//articles/./1/?b=2&a=1#x')
+            == 'http://example.com/api/articles/1?a=1&b=2')
+    assert normalize_url('https://example.com:443/a/../b') == 'https://example.com/b'
+    assert normalize_url('http://example.com:8080/') == 'http://example.com:8080/'
+    assert (normalize_url('/api/articles?filter[title]=a b&include=author')
+            == normalize_url('/api/articles?include=author&filter%5Btitle%5D=a%20b'))
+
+    server = StandInServer(resources=5)
+    with server.serve_in_thread() as url:
+        s = Session(url, schema=None)
+        doc = s.fetch_document_by_url(f'{url}/articles/1')
+        requests = sum(server.requests.values())
+        assert s.fetch_document_by_url(f'{url}/articles/1/') is doc
+        assert s.fetch_document_by_url(
+            url.replace('http://', 'HTTP://') + '/articles//1') is doc
+        assert s.resources_by_link[f'{url}/articles/1/'] is doc.resource
+        assert sum(server.requests.values()) == requests
+
+
+def test_pagination():
+    from jsonapi_client import Page, OffsetPage, CursorPage
+    from jsonapi_client.testserver import StandInServer
+    assert Page(number=2, size=10).appended_query() == 'page[number]=2&page[size]=10'
+    assert OffsetPage(offset=20, limit=10).appended_query() == 'page[limit]=10&page[offset]=20'
+    assert CursorPage(size=5, after='a b').appended_query() == 'page[after]=a%20b&page[size]=5'
+
+    server = StandInServer(resources=23, page_size=10)
+    with server.serve_in_thread() as url:
+        s = Session(url)
+        ids = [r.id for r in s.iterate('articles', page=Page(size=5))]
+        assert ids == [str(i) for i in range(1, 24)]
+        assert server.requests['GET'] == 5
+
+    server = StandInServer(resources=23, page_size=10, pagination='cursor')
+    with server.serve_in_thread() as url:
+        s = Session(url)
+        ids = [r.id for r in s.iterate('articles', page=CursorPage(size=5))]
+        assert ids == [str(i) for i in range(1, 24)]
+        assert server.requests['GET'] == 5
+        doc = s.get('articles', CursorPage(size=5, after='20'))
+        assert [r.id for r in doc.iterator(CursorPage())] == ['21', '22', '23']
+        # Without cursor pager, only links.next would be followed
+        doc = s.get('articles', CursorPage(size=5))
+        assert len(list(doc.iterator())) == 5
+
+
+def test_columns():
+    from array import array
+    from jsonapi_client.testserver import StandInServer
+    schema = {'products': {'properties': {
+        'name': {'type': 'string'},
+        'price': {'type': 'number'},
+        'stock': {'type': 'integer'},
+        'size-info': {'type': 'object', 'properties': {'weight': {'type': 'number'}}},
+    }}}
+    server = StandInServer(schema=schema, resources=25, page_size=10)
+    with server.serve_in_thread() as url:
+        s = Session(url, schema=schema)
+        doc = s.get('products')
+        columns = doc.to_columns(['id', 'name', 'price', 'stock', 'size_info__weight'])
+        assert columns['id'] == [str(i) for i in range(1, 11)]
+        assert columns['name'] == [f'name {i}' for i in range(1, 11)]
+        assert isinstance(columns['price'], array) and columns['price'].typecode == 'd'
+        assert list(columns['stock']) == [r.stock for r in doc.resources]
+        assert list(columns['size_info__weight']) == [r.size_info.weight
+                                                      for r in doc.resources]
+
+        s = Session(url, schema=schema)
+        chunks = list(s.iterate_columns('products', ['id', 'stock'], chunk_size=7))
+        assert [len(c['id']) for c in chunks] == [7, 7, 7, 4]
+        assert chunks[0]['stock'].typecode == 'q'
+        assert [i for c in chunks for i in c['id']] == [str(i) for i in range(1, 26)]
+        # Resources were not created
+        assert not s.resources_by_resource_identifier
+
+
+def test_typed_column_mixed_values():
+    from jsonapi_client.columns import to_columns, typed_column
+    from jsonapi_client.session import Schema
+    column = typed_column([1, 3.0, 2], 'integer')
+    assert column.typecode == 'd' and list(column) == [1.0, 3.0, 2.0]
+    assert typed_column([1, 2 ** 70], 'integer').typecode == 'd'
+    assert typed_column([1, 'many'], 'integer') == [1, 'many']
+    assert typed_column([True, 'yes'], 'boolean') == [True, 'yes']
+    assert typed_column([1, 2], 'integer').typecode == 'q'
+
+    schema = Schema({'products': {'properties': {'stock': {'type': 'integer'}}}})
+    resources = [{'id': str(i), 'type': 'products', 'attributes': {'stock': stock}}
+                 for i, stock in enumerate([1, 2.5, 3])]
+    columns = to_columns(resources, ['stock'], schema, 'products')
+    assert list(columns['stock']) == [1.0, 2.5, 3.0]
+
+
+def test_columns_numpy():
+    from jsonapi_client.columns import to_columns
+    from jsonapi_client.session import Schema
+    numpy = pytest.importorskip('numpy')
+    schema = Schema({'products': {'properties': {'price': {'type': 'number'},
+                                                 'stock': {'type': 'integer'}}}})
+    resources = [{'id': '1', 'attributes': {'price': 1.5, 'stock': 2}},
+                 {'id': '2', 'attributes': {'price': None, 'stock': 3}}]
+    columns = to_columns(resources, ['price', 'stock'], schema, 'products',
+                         use_numpy=True)
+    assert columns['price'].dtype == numpy.float64
+    assert numpy.isnan(columns['price'][1])
+    assert columns['stock'].tolist() == [2, 3]
+
+
+def test_export(tmp_path):
+    import csv
+    import io
+    from jsonapi_client.testserver import StandInServer, EXAMPLE_SCHEMA
+    server = StandInServer(resources=25, page_size=10)
+    with server.serve_in_thread() as url:
+        s = Session(url, schema=EXAMPLE_SCHEMA)
+        path = str(tmp_path / 'articles.ndjson')
+        assert s.export('articles', path) == 25
+        with open(path) as f:
+            lines = [json.loads(line) for line in f]
+        assert [line['id'] for line in lines] == [str(i) for i in range(1, 26)]
+        assert lines[0]['attributes'] == {'title': 'title 1'}
+        assert lines[0]['relationships']['author']['data']['type'] == 'people'
+        assert server.requests['GET'] == 3
+        assert not s.resources_by_resource_identifier
+
+        output = io.StringIO()
+        s.export('people', output, fields=['id', 'first_name'])
+        first = json.loads(output.getvalue().splitlines()[0])
+        assert first == {'id': '1', 'first_name': 'first-name 1'}
+
+        output = io.StringIO()
+        assert s.export('people', output, format='csv') == 25
+        rows = list(csv.reader(io.StringIO(output.getvalue())))
+        assert rows[0] == ['id', 'first-name', 'last-name', 'twitter']
+        assert rows[1][:2] == ['1', 'first-name 1']
+        assert len(rows) == 26
+
+        with pytest.raises(ValueError):
+            s.export('people', output, format='xml')
+
+
+def test_export_async():
+    import io
+    from jsonapi_client.testserver import StandInServer
+    server = StandInServer(resources=25, page_size=10, latency=0.01)
+
+    async def run():
+        await server.start()
+        try:
+            s = Session(server.url, enable_async=True)
+            output = io.StringIO()
+            assert await s.export('comments', output, format='csv',
+                                  fields=['id', 'type', 'body']) == 25
+            rows = output.getvalue().splitlines()
+            assert rows[:2] == ['id,type,body', '1,comments,body 1']
+            await s._aiohttp_session.close()
+        finally:
+            await server.stop()
+    asyncio.run(run())
+
+
+def test_offline_store(tmp_path):
+    from jsonapi_client import Inclusion
+    from jsonapi_client.offline import OfflineStore, filename_for_url
+    from jsonapi_client.testserver import StandInServer, EXAMPLE_SCHEMA
+    assert (filename_for_url('http://example.com/api/articles?page[number]=2')
+            == '%2Fapi%2Farticles%3Fpage%5Bnumber%5D%3D2.json')
+    server = StandInServer(resources=25, page_size=10)
+    with server.serve_in_thread() as url:
+        s = Session(url, schema=EXAMPLE_SCHEMA)
+        page_url = f'{url}/articles?include=author'
+        while page_url:
+            json_data = s._fetch_json(page_url)
+            OfflineStore.save(str(tmp_path), page_url, json_data)
+            page_url = s._next_raw_url(json_data)
+        # Document without url in its file name is found by links.self
+        people = s._fetch_json(f'{url}/people/3')
+        with open(tmp_path / 'person.json', 'w') as f:
+            json.dump(people, f)
+        requests = server.requests['GET']
+
+        s = Session(url, schema=EXAMPLE_SCHEMA)
+        docs = list(s.read_many(str(tmp_path)))
+        assert len(docs) == 4
+        assert sum(len(doc.resources) for doc in docs) == 26
+        first = s.fetch_document_by_url(f'{url}/articles?include=author')
+        assert first is next(doc for doc in docs if len(doc.resources) == 10
+                             and doc.resources[0].id == '1')
+        assert [r.id for r in first.iterator()] == [str(i) for i in range(1, 26)]
+        assert first.resources[0].author.type == 'people'
+
+        s = Session(url, schema=EXAMPLE_SCHEMA,
+                    offline_store=OfflineStore(str(tmp_path / '*.json')))
+        assert s.get('people', '3').resource.first_name == 'first-name 3'
+        assert len(list(s.get('articles', Inclusion('author')).iterator())) == 25
+        s.offline_store.close()
+        assert server.requests['GET'] == requests
+
+
+def test_offline_store_unreadable_files(tmp_path):
+    from jsonapi_client.offline import OfflineStore
+    (tmp_path / 'empty.json').write_text('')
+    (tmp_path / 'corrupt.json').write_text('{"data": ')
+    with open(tmp_path / 'person.json', 'w') as f:
+        json.dump({'data': {'type': 'people', 'id': '1', 'attributes': {},
+                            'links': {'self': 'http://localhost:8080/api/people/1'}}}, f)
+    store = OfflineStore(str(tmp_path))
+    assert store.get('http://localhost:8080/api/people/2') is None
+    assert store.get('http://localhost:8080/api/people/1')['data']['id'] == '1'
+    assert store.load(str(tmp_path / 'corrupt.json')) is None
+    assert [data['data']['id'] for url, data in store.documents()] == ['1']
+
+
+def test_offline_store_many_files(tmp_path):
+    resource = pytest.importorskip('resource')
+    from jsonapi_client.offline import OfflineStore
+
+    url = 'http://localhost:8080/api'
+    for i in range(1, 201):
+        OfflineStore.save(str(tmp_path), f'{url}/articles/{i}',
+                          {'data': {'type': 'articles', 'id': str(i),
+                                    'attributes': {'title': f'title {i}'}}})
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    open_files = len(os.listdir('/proc/self/fd')) if os.path.isdir('/proc/self/fd') else 64
+    try:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (open_files + 50, hard))
+        s = Session(url)
+        docs = list(s.read_many(str(tmp_path)))
+    finally:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+    assert len(docs) == 200
+    assert s.get('articles', '200').resource.title == 'title 200'
+
+
+def test_snapshot(tmp_path):
+    import io
+    from jsonapi_client import Inclusion
+    from jsonapi_client.testserver import StandInServer, EXAMPLE_SCHEMA
+    server = StandInServer(resources=25, page_size=10)
+    with server.serve_in_thread() as url:
+        s = Session(url, schema=EXAMPLE_SCHEMA)
+        articles = list(s.iterate('articles', Inclusion('author')))
+        s.get('people', '20')
+        articles[24].title = 'modified'
+        path = str(tmp_path / 'cache.snapshot')
+        s.snapshot(path)
+        requests = server.requests['GET']
+
+        s2 = Session(url, schema=EXAMPLE_SCHEMA)
+        s2.restore(path)
+        assert not s2.resources_by_resource_identifier
+        doc = s2.get('articles', Inclusion('author'))
+        assert doc.resources[0].title == 'title 1'
+        assert doc.resources[0].author.first_name == articles[0].author.first_name
+        assert s2.get('people', '20').resource.last_name == 'last-name 20'
+        assert server.requests['GET'] == requests
+        # Modified resources (and documents containing them) are not in the snapshot
+        assert s2.fetch_resource_by_resource_identifier(articles[24]).title == 'title 25'
+        assert server.requests['GET'] == requests + 1
+
+        s2.invalidate()
+        s2.get('people', '20')
+        assert server.requests['GET'] == requests + 2
+
+        with pytest.raises(ValueError):
+            s2.restore(io.BytesIO(b'not a snapshot'))
+
+
+def test_weak_cache():
+    import gc
+    from jsonapi_client import Page
+    from jsonapi_client.common import WeakValueCache
+    from jsonapi_client.testserver import StandInServer, EXAMPLE_SCHEMA
+
+    class Value:
+        pass
+    cache = WeakValueCache(strong_size=2)
+    values = [Value() for _ in range(4)]
+    for i, value in enumerate(values):
+        cache[i] = value
+    kept = values[0]
+    del values, value
+    gc.collect()
+    assert sorted(cache.keys()) == [0, 2, 3]
+    assert cache.get(0) is kept
+
+    # setdefault and update keep values alive like item assignment does
+    from jsonapi_client.common import NormalizedUrlWeakValueCache
+    urls = NormalizedUrlWeakValueCache(strong_size=2)
+    urls.setdefault('HTTP://example.com:80/a', Value())
+    urls.update({'http://example.com/b': Value()})
+    gc.collect()
+    assert sorted(urls.keys()) == ['http://example.com/a', 'http://example.com/b']
+
+    server = StandInServer(resources=30, page_size=10)
+    with server.serve_in_thread() as url:
+        s = Session(url, schema=EXAMPLE_SCHEMA, weak_cache=True, strong_cache_size=1)
+        article = s.get('articles', Page(number=1)).resources[0]
+        for page in range(2, 4):
+            s.get('articles', Page(number=page))
+        gc.collect()
+        # Last page (most recently used) and article (used here) are kept
+        assert len(s.documents_by_link) == 1
+        assert len(s.resources_by_resource_identifier) == 11
+        assert s.resources_by_resource_identifier[('articles', '1')] is article
+        assert s.fetch_resource_by_resource_identifier(
+            ResourceTuple('1', 'articles')) is article
+
+        # Modified resources are kept until committed, even if not used anymore
+        s = Session(url, schema=EXAMPLE_SCHEMA, weak_cache=True, strong_cache_size=1)
+        article = s.get('articles', '1').resource
+        article.title = 'changed'
+        del article
+        s.get('articles', '2')
+        s.get('articles', '3')
+        gc.collect()
+        assert [r.id for r in s.dirty_resources] == ['1']
+        s.commit()
+        assert server.requests['PATCH'] == 1
+        assert not s.dirty_resources
+        assert not s._pending
+        s.invalidate()
+        assert s.get('articles', '1').resource.title == 'changed'
+
+
+def test_invalidate_generation(tmp_path):
+    from jsonapi_client.exceptions import DocumentInvalid
+    from jsonapi_client.testserver import StandInServer, EXAMPLE_SCHEMA
+
+    server = StandInServer(resources=5)
+    with server.serve_in_thread() as url:
+        s = Session(url, schema=EXAMPLE_SCHEMA)
+        article = s.get('articles', '1').resource
+        new = s.create('articles')
+        article.title = 'changed'
+        assert article.json['attributes']['title'] == 'changed'
+
+        s.invalidate()
+        assert not s.documents_by_link and not s.resources_by_resource_identifier
+        assert article.is_invalid
+        assert not new.is_invalid
+        with pytest.raises(DocumentInvalid):
+            article.json
+        with pytest.raises(DocumentInvalid):
+            article.create_map('extra')
+
+        # Resources fetched after invalidation belong to the new generation
+        fresh = s.get('articles', '1').resource
+        assert fresh is not article
+        assert not fresh.is_invalid
+        assert fresh.json['attributes']['title'] == 'title 1'
+
+        # Plain attribute access is not checked, as before
+        assert article.title == 'changed'
+        assert fresh.title == 'title 1'
+        assert fresh.fields.title == 'title 1'
+
+        # Resources restored from a snapshot after invalidation are valid
+        other = s.get('articles', '2').resource
+        path = str(tmp_path / 'cache.snapshot')
+        s.snapshot(path)
+        s.invalidate()
+        s.restore(path)
+        requests = server.requests['GET']
+        restored = s.get('articles', '2').resource
+        assert server.requests['GET'] == requests
+        assert restored is not other
+        assert other.is_invalid and not restored.is_invalid
+        assert restored.title == 'title 2'
+        assert restored.json['attributes']['title'] == 'title 2'
+        restored.title = 'restored'
+        assert restored.json['attributes']['title'] == 'restored'
+        with pytest.raises(DocumentInvalid):
+            other.json
+
+        # Resources of documents read with no_cache are invalidated too
+        uncached = s.read({'data': {'type': 'articles', 'id': '9',
+                                    'attributes': {'title': 'x'}}},
+                          f'{url}/articles/9', no_cache=True).resource
+        assert ('articles', '9') not in s.resources_by_resource_identifier
+        assert uncached.json['attributes']['title'] == 'x'
+        s.invalidate()
+        assert uncached.is_invalid
+        with pytest.raises(DocumentInvalid):
+            uncached.json
+
+
+BENCHMARK_SCENARIOS = ['parse', 'parse-no-schema', 'validate', 'attributes',
+                       'iterate', 'resolve', 'commit']
+
+
+@pytest.mark.parametrize('scenario', BENCHMARK_SCENARIOS)
+def test_benchmark_scenarios(scenario, capsys):
+    from benchmarks.run import SCENARIOS, main
+    assert list(SCENARIOS) == BENCHMARK_SCENARIOS
+    results = main([scenario, '--resources', '20', '--page-size', '5',
+                    '--repeat', '1', '--include'])
+    assert [r.name for r in results] == [scenario]
+    assert scenario in capsys.readouterr().out